@@ -0,0 +1,62 @@
+"""Micro-benchmark for `Formula.generate_formula_data`.
+
+Renders a formula with every optional section enabled (the worst case for the template) over
+and over and reports the sustained renders per second, eg:
+
+    python benchmarks/formula_render.py --renders 5000
+"""
+
+import argparse
+import time
+
+from brewtap.checksum import ArchiveChecksum
+from brewtap.formula import Formula
+
+
+CHECKSUM = '0' * 64
+BASE_URL = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0'
+FORMULA_DATA = {
+    'owner': 'm-dzianishchyts',
+    'repo_name': 'mock-repo',
+    'repository': {'description': 'A tool to release scripts to GitHub.', 'license': {'spdx_id': 'MIT'}},
+    'checksums': [
+        ArchiveChecksum('mock-repo-1.0.0.tar.gz', CHECKSUM, f'{BASE_URL}/v1.0.0.tar.gz'),
+        *(
+            ArchiveChecksum(
+                filename=f'mock-repo-1.0.0-{target}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'{BASE_URL}/mock-repo-1.0.0-{target}.tar.gz',
+                target=target.replace('-', '_'),
+            )
+            for target in ('darwin-amd64', 'darwin-arm64', 'linux-amd64', 'linux-arm64')
+        ),
+    ],
+    'install': 'bin.install "mock-repo"\nohai "Installed successfully."',
+    'tar_url': 'https://github.com/m-dzianishchyts/mock-repo/archive/refs/tags/v1.0.0.tar.gz',
+    'depends_on': '"bash" => :build\n"gcc"',
+    'test': 'assert_match("mock output", shell_output("mock-repo"))',
+    'caveats': 'This package requires `something` to be installed.',
+    'download_strategy': 'CurlDownloadStrategy',
+    'custom_require': 'custom_download_strategy',
+    'formula_includes': 'include Language::Python::Virtualenv',
+    'version': '1.0.0',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=2000, help='number of formulas to render')
+    args = parser.parse_args()
+
+    Formula.generate_formula_data(**FORMULA_DATA)  # Warm up (eg: template caches)
+
+    start = time.perf_counter()
+    for _ in range(args.renders):
+        Formula.generate_formula_data(**FORMULA_DATA)
+    elapsed = time.perf_counter() - start
+
+    print(f'{args.renders} renders in {elapsed:.3f}s ({args.renders / elapsed:,.0f} renders/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,43 +1,129 @@
+import asyncio
 import os
-from typing import Optional
+import re
+import time
+from dataclasses import (
+    asdict,
+    dataclass,
+    fields,
+    replace,
+)
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 
 import woodchips
 
 from brewtap._version import __version__
-from brewtap.checksum import Checksum
+from brewtap.asset_watcher import AssetWatcher
+from brewtap.checksum import (
+    ArchiveChecksum,
+    Checksum,
+)
+from brewtap.checksum_cache import ChecksumCache
+from brewtap.config import (
+    FORMULA_OPTIONS,
+    RELEASE_OPTIONS,
+    Config,
+)
 from brewtap.constants import (
-    CAVEATS,
+    CHECKSUM_CACHE_TOKEN,
     CHECKSUM_FILE,
-    COMMIT_EMAIL,
-    COMMIT_OWNER,
-    CUSTOM_REQUIRE,
     DEBUG,
-    DEPENDS_ON,
-    DOWNLOAD_STRATEGY,
-    FORMULA_FOLDER,
-    FORMULA_INCLUDES,
+    FRAGMENT_SECRET,
     GITHUB_BASE_URL,
-    GITHUB_OWNER,
-    GITHUB_REPO,
-    GITHUB_TOKEN,
-    HOMEBREW_OWNER,
-    HOMEBREW_TAP,
-    INSTALL,
+    GITHUB_SERVER_URL,
     LOGGER_NAME,
-    SKIP_COMMIT,
-    TARGET,
-    TARGET_DARWIN_AMD64,
-    TARGET_DARWIN_ARM64,
-    TARGET_LINUX_AMD64,
-    TARGET_LINUX_ARM64,
-    TEST,
-    UPDATE_README_TABLE,
-    VERSION,
+    MIRROR_ACCESS_KEY,
+    MIRROR_SECRET_KEY,
+    MIRROR_SESSION_TOKEN,
+    README_TABLE_LAYOUTS,
+    RELEASES_PAGE_SIZE,
+    TASK_TIMEOUT,
 )
 from brewtap.formula import Formula
+from brewtap.fragments import ChecksumFragment
 from brewtap.git import Git
-from brewtap.readme_updater import ReadmeUpdater
-from brewtap.utils import Utils
+from brewtap.journal import RunJournal
+from brewtap.mirror import AssetMirror
+from brewtap.readme_updater import (
+    PAGES_FOLDER,
+    ReadmeUpdater,
+)
+from brewtap.tap_index import (
+    TAP_INDEX_FILE,
+    TapIndex,
+)
+from brewtap.targets import (
+    BOTTLE_ASSET_PATTERN,
+    BOTTLE_PREFIX,
+    BOTTLE_TAG_PATTERN,
+    RESOURCE_PREFIX,
+    TARGETS,
+)
+from brewtap.utils import (
+    BrewtapError,
+    Utils,
+)
+
+
+# The `major[.minor]` version of a release tag, eg: `v1.2.3` -> `1.2`
+VERSION_PATTERN = re.compile(r'(\d+)(?:\.(\d+))?')
+
+
+@dataclass
+class HashedRelease:
+    """A release whose archives were downloaded and hashed, shared by every tap it is published to."""
+
+    release: Dict[str, Any]
+    version: str
+    checksums: List[ArchiveChecksum]  # Every archive once, as listed in `checksum.txt`
+    checksum_file: str
+    formula_checksums: Dict[str, List[ArchiveChecksum]]  # The archives of each formula by name, `default` first
+
+    def to_journal(self) -> Dict[str, Any]:
+        """The checksums of the release as journaled by `RunJournal` (the release itself is fetched again)."""
+        return {
+            'version': self.version,
+            'checksums': [asdict(checksum) for checksum in self.checksums],
+            'formula_checksums': {
+                formula_name: [asdict(checksum) for checksum in checksums]
+                for formula_name, checksums in self.formula_checksums.items()
+            },
+        }
+
+    @staticmethod
+    def from_journal(release: Dict[str, Any], checksum_file: str, journaled: Dict[str, Any]) -> 'HashedRelease':
+        return HashedRelease(
+            release,
+            journaled['version'],
+            [ArchiveChecksum(**checksum) for checksum in journaled['checksums']],
+            checksum_file,
+            {
+                formula_name: [ArchiveChecksum(**checksum) for checksum in checksums]
+                for formula_name, checksums in journaled['formula_checksums'].items()
+            },
+        )
+
+
+@dataclass
+class PublishedFormula:
+    """A formula written to a tap, along with what the rest of its publish needs."""
+
+    config: Config
+    hashed_release: HashedRelease
+    formula_path: str
+    template: str
+    checksums: List[ArchiveChecksum]  # The checksums rendered into the formula (see `HashedRelease.formula_checksums`)
+
+    @property
+    def release_name(self) -> Tuple[str, str]:
+        """The `(name, version)` of the formula as it appears in the commit message."""
+        return self.config.formula_name or self.config.github_repo, self.hashed_release.version
 
 
 class App:
@@ -45,164 +131,988 @@ class App:
     def run_github_action():
         """Runs the complete GitHub Action workflow.
 
-        1. Setup logging
-        2. Grab the details about the tap
-        3. Download the archive(s)
-        4. Generate checksum(s)
-        5. Generate the new formula
-        6. Update README table (optional)
-        7. Add, commit, and push updated formula to GitHub
+        This is a thin synchronous wrapper that sets up logging and drives
+        `App.run_github_action_async` on a fresh event loop.
         """
         App.setup_logger()
+
+        try:
+            asyncio.run(App.run_github_action_async())
+        except BrewtapError as error:
+            raise SystemExit(error)
+
+    @staticmethod
+    async def run_github_action_async(config: Optional[Config] = None):
+        """Runs the complete GitHub Action workflow as a coroutine.
+
+        1. Grab the details about the tap(s) (while cloning the tap(s))
+        2. Download the archive(s)
+        3. Generate checksum(s)
+        4. Generate the new formula
+        5. Update the tap index and README table (optional)
+        6. Add, commit, and push updated formula to GitHub
+
+        HTTP requests, hashing and file IO run in the default thread pool and git runs as asyncio
+        subprocesses, so several publishes (each with its own `config`) can share one event loop.
+        Failures are raised as `BrewtapError` and cancel the sibling tasks of the failed step.
+
+        With `additional_taps`, the release is downloaded and hashed once and steps 4 to 6 run for every
+        tap concurrently. A failed tap does not stop the others, the outcome of each tap is reported at the end
+        (after `checksum.txt` is uploaded).
+
+        With `resume`, every completed step is journaled (see `RunJournal`) and a re-run of a failed publish of the
+        same release skips them: the downloads and hashing, then per tap the rendering, commit and push.
+        """
+        config = config or Config.from_env()
         logger = woodchips.get(LOGGER_NAME)
 
+        if config.backfill_releases:
+            return await App.run_backfill_async(config)
+
         logger.info(f'Starting Brewtap {__version__}...')
-        App.check_required_env_variables()
-
-        logger.info('Setting up git environment...')
-        Git.setup(COMMIT_OWNER, COMMIT_EMAIL, HOMEBREW_OWNER, HOMEBREW_TAP)
-
-        logger.info(f'Collecting data about {GITHUB_REPO}...')
-        repository = Utils.make_github_get_request(url=f'{GITHUB_BASE_URL}/repos/{GITHUB_OWNER}/{GITHUB_REPO}').json()
-        release = Utils.make_github_get_request(
-            url=f'https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{f"tags/{VERSION}" if VERSION else 'latest'}'  # noqa
-        ).json()
-        assets = release['assets']
-        version = VERSION or release['tag_name']
-        version_no_v = version.lstrip('v')
-        logger.info(f'Latest release ({version}) successfully identified!')
+        Utils.trap_exit(App.check_required_env_variables, config)
+        Utils.trap_exit(App.formula_configs, config)
+        tap_configs = Utils.trap_exit(App.tap_configs, config)
+
+        journal = Utils.trap_exit(RunJournal.open, config)
+
+        logger.info(f'Setting up git environment and collecting data about {config.github_repo}...')
+        release_task = asyncio.ensure_future(App.hash_release(config, journal))
+        outcomes = await asyncio.gather(
+            *(App.publish_to_tap(tap_config, release_task, journal) for tap_config in tap_configs),
+            return_exceptions=True,
+        )
+        # Every tap may have failed before needing the release
+        release_task.cancel()
+        if len(tap_configs) == 1 and isinstance(outcomes[0], BaseException):
+            raise outcomes[0]
+
+        # The archives are hashed and the other taps published even if a tap failed, so the checksums go out first
+        release_hashed = release_task.done() and not release_task.cancelled() and release_task.exception() is None
+        if release_hashed and config.skip_commit:
+            logger.info(f'Skipping upload of checksum.txt to {config.github_repo}.')
+        elif release_hashed and not journal.get('checksum_uploaded'):
+            logger.info(f'Attempting to upload checksum.txt to the latest release of {config.github_repo}...')
+            await App.upload_checksum_file(config, release_task.result()[1])
+            journal.record(True, 'checksum_uploaded')
+        App.report_tap_outcomes(tap_configs, outcomes)
+
+        if not config.skip_commit:
+            logger.info(
+                f'Successfully released {release_task.result()[1].version} of {config.github_repo} to'
+                f' {", ".join(tap_config.homebrew_tap for tap_config in tap_configs)}!'  # type: ignore
+            )
+        journal.complete()
+
+    @staticmethod
+    async def run_batch_async(configs: List[Config]):
+        """Publishes the formulas of several repositories to one tap as a single commit.
+
+        The tap is cloned once and every release is collected, downloaded and hashed concurrently on the
+        same event loop (sharing the HTTP session and thread pool). The tap index and README table are then
+        updated once for all formulas, and the tap is pushed once. Tap-wide options (the tap, committer,
+        README and index options) are taken from the first config.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        logger.info(f'Starting Brewtap {__version__} for {len(configs)} repositories...')
+        Utils.trap_exit(App.check_batch_configs, configs)
+        tap_config = configs[0]
+
+        logger.info(f'Setting up git environment and collecting data about {len(configs)} repositories...')
+        _, *hashed_releases = await Utils.run_concurrently(
+            App.setup_tap(tap_config, App.batch_sparse_paths(configs)),
+            *(App.hash_release(config) for config in configs),
+        )
+
+        published_formulas = [
+            published_formula
+            for repository_formulas in await Utils.run_concurrently(
+                *(
+                    App.write_formulas(config, repository, hashed_release)
+                    for config, (repository, hashed_release) in zip(configs, hashed_releases)
+                )
+            )
+            for published_formula in repository_formulas
+        ]
+        await App.update_tap_metadata(tap_config, published_formulas)
+
+        await Git.add_async(tap_config.homebrew_tap)  # type: ignore
+        await Git.commit_batch_async(
+            tap_config.homebrew_tap,  # type: ignore
+            [published_formula.release_name for published_formula in published_formulas],
+        )
+
+        if tap_config.skip_commit:
+            logger.info(f'Skipping upload of checksum.txt files and push to {tap_config.homebrew_tap}.')
+        else:
+            logger.info(f'Attempting to upload checksum.txt files and to push to {tap_config.homebrew_tap}...')
+            await Utils.run_concurrently(
+                *(
+                    App.upload_checksum_file(config, hashed_release)
+                    for config, (_, hashed_release) in zip(configs, hashed_releases)
+                ),
+                Git.push_async(
+                    tap_config.homebrew_tap, tap_config.homebrew_owner, tap_config.github_token  # type: ignore
+                ),
+            )
+            logger.info(f'Successfully released {len(configs)} formulas to {tap_config.homebrew_tap}!')
+
+    @staticmethod
+    async def hash_release(
+        config: Config, journal: Optional[RunJournal] = None
+    ) -> Tuple[Dict[str, Any], HashedRelease]:
+        """Collects the repository and release, then downloads and hashes the assets of the release
+        (see `App.hash_assets`), unless the `journal` of a previous run of the same release has their checksums.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        repository, release = await App.collect_release_data(config)
+        logger.info(
+            f'Latest release of {config.github_repo} ({config.version or release["tag_name"]}) successfully identified!'
+        )
+        if journal is None or not journal.enabled:
+            return repository, await App.hash_assets(config, repository, release)
+
+        journal.start(release['id'])
+        journaled = journal.get('hashed')
+        if journaled:
+            logger.info(f'Resuming with the checksums of {config.github_repo} journaled by a previous run.')
+            hashed_release = HashedRelease.from_journal(release, App._work_path(config, CHECKSUM_FILE), journaled)
+            await App.write_checksum_file(config, hashed_release.checksums)
+        else:
+            hashed_release = await App.hash_assets(config, repository, release)
+            journal.record(hashed_release.to_journal(), 'hashed')
+
+        return repository, hashed_release
+
+    @staticmethod
+    async def hash_assets(config: Config, repository: Dict[str, Any], release: Dict[str, Any]) -> HashedRelease:
+        """Downloads and hashes the archives of every formula of a release (and writes their `checksum.txt`)."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        version = config.version or release['tag_name']
+        logger.info(f'Generating tar archive checksum(s) of {config.github_repo}...')
+        formula_archive_urls = {
+            formula_config.formula_name
+            or repository['name']: App.build_archive_urls(formula_config, repository, version)
+            for formula_config in App.formula_configs(config)
+        }
+        # Formulas sharing an archive (eg: the source tarball) only download and hash it once
+        archive_urls: Dict[str, str] = {}
+        for formula_urls, _ in formula_archive_urls.values():
+            for archive_type, archive_url in formula_urls.items():
+                archive_urls.setdefault(archive_url, archive_type)
+        auto_generated_urls = next(iter(formula_archive_urls.values()))[1]
+        checksums = await App.generate_checksums(
+            [(archive_type, archive_url) for archive_url, archive_type in archive_urls.items()],
+            auto_generated_urls,
+            release['assets'],
+            config,
+            (
+                Utils.trap_exit(ChecksumFragment.load, config.checksum_fragments, FRAGMENT_SECRET)
+                if config.checksum_fragments
+                else None
+            ),
+            AssetWatcher(config, release, config.wait_for_assets) if config.wait_for_assets else None,
+        )
+        logger.debug("checksums = %s", checksums)
+        checksum_file = await App.write_checksum_file(config, checksums)
+
+        checksums_by_url = {checksum.url: checksum for checksum in checksums}
+        formula_checksums = {
+            formula_name: [
+                replace(checksums_by_url[archive_url], target=archive_type)
+                for archive_type, archive_url in formula_urls.items()
+                if archive_url in checksums_by_url
+            ]
+            for formula_name, (formula_urls, _) in formula_archive_urls.items()
+        }
+
+        return HashedRelease(release, version, checksums, checksum_file, formula_checksums)
+
+    @staticmethod
+    async def write_checksum_file(config: Config, checksums: List[ArchiveChecksum]) -> str:
+        """Writes the `checksum.txt` of a release, returns its path."""
+        checksum_file = App._work_path(config, CHECKSUM_FILE)
+        archive_checksum_entries = ''.join(f'{checksum.checksum} {checksum.filename}\n' for checksum in checksums)
+        await Utils.run_blocking(Utils.write_file, checksum_file, archive_checksum_entries)
+
+        return checksum_file
+
+    @staticmethod
+    async def run_backfill_async(config: Config):
+        """Publishes a versioned formula (eg: `foo@1.2`) for each of the last `backfill_releases` releases.
+
+        Releases are listed (newest first, skipping drafts and pre-releases) while the tap is cloned, the
+        newest release of each `major.minor` version gets a formula. Every release is then downloaded and hashed
+        concurrently, and all formulas are committed together. `checksum.txt` is not uploaded to past releases.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        logger.info(f'Starting Brewtap {__version__} backfill of {config.github_repo}...')
+        Utils.trap_exit(App.check_required_env_variables, config)
+
+        logger.info(f'Setting up git environment and listing the releases of {config.github_repo}...')
+        _, (repository, releases) = await Utils.run_concurrently(
+            App.setup_tap(config, App.sparse_paths(config)),
+            App.collect_backfill_releases(config),
+        )
+        if not releases:
+            raise BrewtapError(f'{config.github_repo} has no release to backfill.')
+        logger.info(f'Backfilling {len(releases)} releases of {config.github_repo}...')
+
+        started_at = time.monotonic()
+        progress = {'releases': 0, 'archives': 0}
+
+        async def publish_release(formula_name: str, release: Dict[str, Any]) -> PublishedFormula:
+            release_config = replace(
+                config,
+                formula_name=formula_name,
+                version=release['tag_name'],
+                work_dir=os.path.join(config.work_dir or '', release['tag_name']),
+            )
+            hashed_release = await App.hash_assets(release_config, repository, release)
+            published_formula = await App.write_formula(release_config, repository, hashed_release)
+
+            progress['releases'] += 1
+            progress['archives'] += len(hashed_release.checksums)
+            logger.info(f'[{progress["releases"]}/{len(releases)}] {formula_name} ({release["tag_name"]}) rendered.')
+
+            return published_formula
+
+        published_formulas = await Utils.run_concurrently(
+            *(publish_release(formula_name, release) for formula_name, release in releases)
+        )
+        elapsed = max(time.monotonic() - started_at, 0.001)
+        logger.info(
+            f'Hashed {progress["archives"]} archives of {len(releases)} releases in {elapsed:.1f}s'
+            f' ({len(releases) / elapsed:.2f} releases/s, {progress["archives"] / elapsed:.2f} archives/s).'
+        )
+        await App.update_tap_metadata(config, published_formulas)
+
+        await Git.add_async(config.homebrew_tap)  # type: ignore
+        await Git.commit_batch_async(
+            config.homebrew_tap,  # type: ignore
+            [published_formula.release_name for published_formula in published_formulas],
+        )
+
+        if config.skip_commit:
+            logger.info(f'Skipping push to {config.homebrew_tap}.')
+        else:
+            await Git.push_async(config.homebrew_tap, config.homebrew_owner, config.github_token)  # type: ignore
+            logger.info(f'Successfully backfilled {len(releases)} releases of {config.github_repo}!')
+
+    @staticmethod
+    async def collect_backfill_releases(config: Config) -> Tuple[Dict[str, Any], List[Tuple[str, Dict[str, Any]]]]:
+        """Fetches the repository and the `(versioned formula name, release)` of the releases to backfill.
+
+        Releases are requested a page at a time until `backfill_releases` versioned formulas are found.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        repository_url = f'{GITHUB_BASE_URL}/repos/{config.github_owner}/{config.github_repo}'
+        repository_response = await Utils.run_blocking(
+            Utils.make_github_get_request, url=repository_url, token=config.github_token, timeout=TASK_TIMEOUT
+        )
+        repository = repository_response.json()
+
+        versioned_releases: Dict[str, Dict[str, Any]] = {}
+        page = 1
+        while len(versioned_releases) < config.backfill_releases:
+            releases_response = await Utils.run_blocking(
+                Utils.make_github_get_request,
+                url=f'{repository_url}/releases?per_page={RELEASES_PAGE_SIZE}&page={page}',
+                token=config.github_token,
+                timeout=TASK_TIMEOUT,
+            )
+            releases = releases_response.json()
+            for release in releases:
+                if release['draft'] or release['prerelease']:
+                    continue
+                formula_name = App.versioned_formula_name(
+                    config.formula_name or repository['name'], release['tag_name']
+                )
+                if formula_name is None:
+                    logger.warning(f'Skipping release {release["tag_name"]}, its tag is not a version.')
+                    continue
+                # Releases are listed newest first, so each version keeps its latest patch release
+                versioned_releases.setdefault(formula_name, release)
+                if len(versioned_releases) == config.backfill_releases:
+                    break
+            if len(releases) < RELEASES_PAGE_SIZE:
+                break
+            page += 1
+
+        return repository, list(versioned_releases.items())
+
+    @staticmethod
+    def versioned_formula_name(formula_name: str, tag: str) -> Optional[str]:
+        """The name of the versioned formula of a release, eg: `foo` and `v1.2.3` -> `foo@1.2`.
+
+        `None` if the tag does not hold a version.
+        """
+        version = VERSION_PATTERN.search(tag)
+        if version is None:
+            return None
+
+        return f'{formula_name}@{".".join(part for part in version.groups() if part is not None)}'
+
+    @staticmethod
+    async def publish_to_tap(
+        config: Config,
+        release_task: 'asyncio.Future[Tuple[Dict[str, Any], HashedRelease]]',
+        journal: Optional[RunJournal] = None,
+    ):
+        """Clones a tap (while the release is being hashed), then writes, commits and pushes the formula to it.
+
+        With a `journal`, the steps a previous run completed for this tap are skipped as long as its clone is left
+        as that run left it: the push of a journaled commit still checked out is retried, and formulas matching the
+        journaled renders are committed as they are.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+        journal = journal or RunJournal(None, '')
+        tap: str = config.homebrew_tap  # type: ignore
+        tap_journal = journal.get('taps', tap) or {}
+
+        if tap_journal.get('pushed'):
+            await release_task
+            logger.info(f'Skipping {tap}, a previous run already pushed to it.')
+            return
+
+        resumed_commit = await App.resumed_commit(tap, tap_journal)
+        if not resumed_commit:
+            if App.resumed_render(tap, tap_journal):
+                logger.info(f'Resuming with the formulas rendered to {tap} by a previous run.')
+                await release_task
+                release_names = [tuple(release_name) for release_name in tap_journal['release_names']]
+            else:
+                await App.setup_tap(config, App.sparse_paths(config), resuming=journal.enabled)
+                repository, hashed_release = await release_task
+
+                published_formulas = await App.write_formulas(config, repository, hashed_release)
+                await App.update_tap_metadata(config, published_formulas)
+                release_names = [published_formula.release_name for published_formula in published_formulas]
+                if journal.enabled:
+                    journal.record(
+                        {
+                            'formulas': {
+                                published_formula.formula_path: RunJournal.hash_file(published_formula.formula_path)
+                                for published_formula in published_formulas
+                            },
+                            'release_names': release_names,
+                        },
+                        'taps',
+                        tap,
+                    )
+
+            # Although users can skip a commit, still commit (and don't push) to dry-run a commit
+            await Git.add_async(tap)
+            if len(release_names) == 1:
+                await Git.commit_async(tap, *release_names[0])
+            else:
+                await Git.commit_batch_async(tap, release_names)  # type: ignore
+            if journal.enabled:
+                journal.record(await Git.head_async(tap), 'taps', tap, 'commit')
+        else:
+            logger.info(f'Resuming with the commit {resumed_commit} of a previous run to {tap}.')
+
+        _, hashed_release = await release_task
+        if config.skip_commit:
+            logger.info(f'Skipping push to {tap}.')
+        else:
+            logger.info(f'Attempting to release {hashed_release.version} of {config.github_repo} to {tap}...')
+            await Git.push_async(tap, config.homebrew_owner, config.github_token)  # type: ignore
+            journal.record(True, 'taps', tap, 'pushed')
+
+    @staticmethod
+    async def resumed_commit(homebrew_tap: str, tap_journal: Dict[str, Any]) -> Optional[str]:
+        """The journaled commit of a tap, if its clone still has it checked out."""
+        commit = tap_journal.get('commit')
+        if not commit or not os.path.isdir(os.path.join(homebrew_tap, '.git')):
+            return None
+
+        return commit if await Git.head_async(homebrew_tap) == commit else None
+
+    @staticmethod
+    def resumed_render(homebrew_tap: str, tap_journal: Dict[str, Any]) -> bool:
+        """Whether the clone of a tap still holds the (uncommitted) formulas journaled by a previous run."""
+        formulas = tap_journal.get('formulas')
+        if not formulas or not os.path.isdir(os.path.join(homebrew_tap, '.git')):
+            return False
+
+        return all(
+            os.path.isfile(formula_path) and RunJournal.hash_file(formula_path) == checksum
+            for formula_path, checksum in formulas.items()
+        )
+
+    @staticmethod
+    async def setup_tap(config: Config, sparse_paths: Optional[List[str]] = None, resuming: bool = False):
+        """Clones the tap of `config`, or refreshes the clone left by a previous publish with `reuse_clone` (or by
+        the failed run a publish is `resuming`).
+        """
+        setup = (
+            Git.refresh_async
+            if (config.reuse_clone or resuming)
+            and os.path.isdir(os.path.join(config.homebrew_tap, '.git'))  # type: ignore
+            else Git.setup_async
+        )
+
+        await setup(
+            config.commit_owner,
+            config.commit_email,
+            config.homebrew_owner,  # type: ignore
+            config.homebrew_tap,  # type: ignore
+            config.github_token,
+            sparse_paths,
+        )
+
+    @staticmethod
+    async def write_formulas(
+        config: Config, repository: Dict[str, Any], hashed_release: HashedRelease
+    ) -> List[PublishedFormula]:
+        """Writes every formula (see `App.formula_configs`) of a hashed release to the tap of `config`."""
+        return await Utils.run_concurrently(
+            *(
+                App.write_formula(formula_config, repository, hashed_release)
+                for formula_config in App.formula_configs(config)
+            )
+        )
+
+    @staticmethod
+    async def write_formula(
+        config: Config, repository: Dict[str, Any], hashed_release: HashedRelease
+    ) -> PublishedFormula:
+        """Writes the formula of a hashed release to the tap of `config`."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        formula_name = config.formula_name or repository['name']
+        formula_path = os.path.join(
+            config.homebrew_tap,  # type: ignore
+            App.formula_folder(config, formula_name),
+            f'{formula_name}.rb',
+        )
+        checksums = hashed_release.formula_checksums[formula_name]
+        tar_url = next(checksum.url for checksum in checksums if checksum.target == 'default')
+        template = None
+        if config.patch_formula:
+            logger.info(f'Patching the existing Homebrew formula {formula_name}...')
+            template = await App.patch_formula(formula_path, checksums, tar_url, config)
+        if template is None:
+            logger.info(f'Generating Homebrew formula {formula_name}...')
+            template = App.generate_formula(repository, checksums, tar_url, config)
+
+        await Utils.run_blocking(Utils.write_file, formula_path, template, 'w')
+
+        return PublishedFormula(config, hashed_release, formula_path, template, checksums)
+
+    @staticmethod
+    async def update_tap_metadata(config: Config, published_formulas: List[PublishedFormula]):
+        """Updates the tap index and README table (if enabled by `config`) with the published formulas.
+
+        A single formula only updates its own README row, several formulas rebuild the table once.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        if config.update_tap_index:
+            index_path = os.path.join(config.homebrew_tap, TAP_INDEX_FILE)  # type: ignore
+            if config.sparse_checkout and not os.path.isfile(index_path):
+                # The index is built from every formula of the tap the first time around
+                logger.info(f'Checking out the whole tap to build {TAP_INDEX_FILE}...')
+                await Git.disable_sparse_checkout_async(config.homebrew_tap)  # type: ignore
+            logger.info(f'Updating the tap index ({TAP_INDEX_FILE})...')
+            # Every update rewrites the index, so they run one after the other
+            for published in published_formulas:
+                await Utils.run_blocking(
+                    TapIndex.update,
+                    config.homebrew_tap,
+                    published.formula_path,
+                    published.template,
+                    published.hashed_release.version,
+                    published.checksums,
+                    config.formula_folder,
+                )
+
+        if config.update_readme_table:
+            logger.info('Attempting to update the README\'s project table...')
+            await Utils.run_blocking(
+                ReadmeUpdater.update_readme,
+                config.homebrew_tap,
+                config.formula_folder,
+                config.homebrew_owner,
+                published_formulas[0].formula_path if len(published_formulas) == 1 else None,
+                config.readme_full_rebuild,
+                config.readme_table_layout,
+                config.update_tap_index,
+                config.readme_parse_processes,
+            )
+        else:
+            logger.debug('Skipping update to project README.')
+
+    @staticmethod
+    async def upload_checksum_file(config: Config, hashed_release: HashedRelease):
+        """Uploads the `checksum.txt` of a hashed release to the release."""
+        await Utils.run_blocking(
+            Checksum.upload_checksum_file,
+            hashed_release.release,
+            config.github_owner,
+            config.github_repo,
+            config.github_token,
+            hashed_release.checksum_file,
+            timeout=TASK_TIMEOUT,
+        )
+
+    @staticmethod
+    async def collect_release_data(config: Config) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Fetches the repository and the release (tagged or latest) metadata concurrently."""
+        repository_url = f'{GITHUB_BASE_URL}/repos/{config.github_owner}/{config.github_repo}'
+        release_url = f'{repository_url}/releases/{f"tags/{config.version}" if config.version else "latest"}'
+        repository_response, release_response = await Utils.run_concurrently(
+            Utils.run_blocking(
+                Utils.make_github_get_request, url=repository_url, token=config.github_token, timeout=TASK_TIMEOUT
+            ),
+            Utils.run_blocking(
+                Utils.make_github_get_request, url=release_url, token=config.github_token, timeout=TASK_TIMEOUT
+            ),
+        )
+
+        return repository_response.json(), release_response.json()
+
+    @staticmethod
+    def formula_shard(formula_name: str) -> str:
+        """The shard folder of a formula in a sharded formula folder, following Homebrew's own taps:
+        `lib*` formulas go to `lib`, any other formula to its lowercased first character (eg: `Formula/b/brewtap.rb`).
+        """
+        formula_name = formula_name.lower()
+
+        return 'lib' if formula_name.startswith('lib') else formula_name[:1]
+
+    @staticmethod
+    def formula_folder(config: Config, formula_name: str) -> str:
+        """The folder (relative to the tap) the formula is written to."""
+        if config.sharded_formula_folder:
+            return os.path.join(config.formula_folder, App.formula_shard(formula_name))
+
+        return config.formula_folder
+
+    @staticmethod
+    def sparse_paths(config: Config) -> Optional[List[str]]:
+        """The folders of the tap to check out (on top of the files in its root) when `sparse_checkout` is set.
+
+        Formulas are named after the repository unless named explicitly, so their shards are known before the
+        repository metadata is fetched.
+        """
+        if not config.sparse_checkout:
+            return None
+
+        sparse_paths = [
+            App.formula_folder(config, formula_config.formula_name or config.github_repo)
+            for formula_config in App.formula_configs(config)
+        ]
+        if config.update_readme_table and config.readme_table_layout == 'pages':
+            sparse_paths.append(PAGES_FOLDER)
+
+        return list(dict.fromkeys(sparse_paths))
+
+    @staticmethod
+    def tap_configs(config: Config) -> List[Config]:
+        """The config of every tap the release is published to: the main tap, then the `additional_taps`
+        (each the main config with its overrides applied).
+        """
+        tap_configs = [replace(config, additional_taps=[])]
+        for overrides in config.additional_taps:
+            release_options = sorted(overrides.keys() & set(RELEASE_OPTIONS))
+            if release_options:
+                raise SystemExit(
+                    f'The "additional_taps" cannot override {", ".join(release_options)}, '
+                    'the release is shared by every tap.'
+                )
+            unknown_options = sorted(overrides.keys() - {config_field.name for config_field in fields(Config)})
+            if unknown_options:
+                raise SystemExit(f'Unknown options in the "additional_taps": {", ".join(unknown_options)}.')
+            tap_configs.append(replace(config, additional_taps=[], **overrides))
+
+        for tap_config in tap_configs[1:]:
+            App.check_required_env_variables(tap_config)
+        taps = [tap_config.homebrew_tap for tap_config in tap_configs]
+        if len(set(taps)) < len(taps):
+            raise SystemExit('Every tap of "additional_taps" must have a different "homebrew_tap" name.')
+
+        return tap_configs
+
+    @staticmethod
+    def formula_configs(config: Config) -> List[Config]:
+        """The config of every formula rendered from the release: the `formulas` (each the config with its
+        overrides applied), or the formula of the config itself when there are none.
+        """
+        if not config.formulas:
+            return [config]
+
+        formula_configs = []
+        for overrides in config.formulas:
+            if not overrides.get('name'):
+                raise SystemExit('Every formula of "formulas" must have a "name".')
+            unknown_options = sorted(overrides.keys() - {'name', *FORMULA_OPTIONS})
+            if unknown_options:
+                raise SystemExit(f'Unknown options in the "formulas": {", ".join(unknown_options)}.')
+            options = {key: value for key, value in overrides.items() if key != 'name'}
+            formula_configs.append(replace(config, formulas=[], formula_name=overrides['name'], **options))
+
+        names = [formula_config.formula_name for formula_config in formula_configs]
+        if len(set(names)) < len(names):
+            raise SystemExit('Every formula of "formulas" must have a different "name".')
+
+        return formula_configs
+
+    @staticmethod
+    def report_tap_outcomes(tap_configs: List[Config], outcomes: List[Any]):
+        """Logs whether the publish to each tap succeeded, raising a `BrewtapError` if any of them failed."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        failed_taps = []
+        for tap_config, outcome in zip(tap_configs, outcomes):
+            tap = f'{tap_config.homebrew_owner}/{tap_config.homebrew_tap}'
+            if isinstance(outcome, BaseException):
+                failed_taps.append(tap)
+                logger.error(f'{tap}: failed ({outcome})')
+            else:
+                logger.info(f'{tap}: published')
+
+        if failed_taps:
+            raise BrewtapError(f'Could not publish to {", ".join(failed_taps)}.')
+
+    @staticmethod
+    def batch_sparse_paths(configs: List[Config]) -> Optional[List[str]]:
+        """The folders of the tap to check out for every formula of a batch (see `App.sparse_paths`)."""
+        if not configs[0].sparse_checkout:
+            return None
+        sparse_paths = [
+            sparse_path
+            for config in configs
+            for sparse_path in App.sparse_paths(replace(config, sparse_checkout=True)) or []
+        ]
+
+        return sorted(set(sparse_paths))
+
+    @staticmethod
+    async def patch_formula(
+        formula_path: str, checksums: List[ArchiveChecksum], tar_url: str, config: Config
+    ) -> Optional[str]:
+        """Patches the formula already in the tap, `None` if there is none or it cannot be patched."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        existing_formula = await Utils.run_blocking(Utils.read_file, formula_path)
+        patched_formula = (
+            Formula.patch_formula_data(
+                existing_formula,
+                checksums=checksums,
+                tar_url=tar_url,
+                version=config.version.lstrip('v') if config.version else None,
+            )
+            if existing_formula
+            else None
+        )
+        if patched_formula is None:
+            logger.info('The existing formula is missing or does not match the requested targets, rendering it.')
+
+        return patched_formula
+
+    @staticmethod
+    def generate_formula(
+        repository: Dict[str, Any], checksums: List[ArchiveChecksum], tar_url: str, config: Config
+    ) -> str:
+        """Renders the complete formula from the config of the publish."""
+        return Formula.generate_formula_data(
+            owner=config.github_owner,
+            repo_name=config.github_repo,
+            repository=repository,
+            checksums=checksums,
+            install=config.install,  # type: ignore
+            tar_url=tar_url,
+            depends_on=config.depends_on,
+            test=config.test,
+            caveats=config.caveats,
+            download_strategy=config.download_strategy,
+            custom_require=config.custom_require,
+            formula_includes=config.formula_includes,
+            version=config.version.lstrip('v') if config.version else None,
+            formula_name=config.formula_name,
+            # Versioned formulas would conflict with the links of the unversioned one
+            keg_only=':versioned_formula' if config.formula_name and '@' in config.formula_name else None,
+            bottle_cellar=config.bottle_cellar,
+        )
+
+    @staticmethod
+    def build_archive_urls(
+        config: Config, repository: Dict[str, Any], version: str
+    ) -> Tuple[Dict[str, str], Tuple[str, str]]:
+        """Builds the URL of each archive that goes into the formula along with the
+        auto-generated release tarball and zipball URLs.
+        """
+        logger = woodchips.get(LOGGER_NAME)
 
-        logger.info('Generating tar archive checksum(s)...')
         archive_urls = dict()
-        archive_checksum_entries = ''
+        version_no_v = version.lstrip('v')
+        # A versioned formula (eg: `foo@1.2`) is published from the same release assets as `foo`
+        asset_repo = (config.formula_name or config.github_repo).partition('@')[0]
 
         # Auto-generated tar URL must come first for later use (order is important)
         if repository["private"]:
             logger.info('Repository is private. Using auto-generated release tarball and zipball REST API endpoints.')
-            archive_base_url = f'{GITHUB_BASE_URL}/repos/{GITHUB_OWNER}/{GITHUB_REPO}'
+            archive_base_url = f'{GITHUB_BASE_URL}/repos/{config.github_owner}/{config.github_repo}'
             auto_generated_release_tar = f'{archive_base_url}/tarball/{version}'
             auto_generated_release_zip = f'{archive_base_url}/zipball/{version}'
         else:
             logger.info('Repository is public. Using auto-generated release tarball and zipball public URLs.')
-            archive_base_url = f'https://github.com/{GITHUB_OWNER}/{GITHUB_REPO}/archive/refs/tags/{version}'
+            archive_base_url = (
+                f'{GITHUB_SERVER_URL}/{config.github_owner}/{config.github_repo}/archive/refs/tags/{version}'
+            )
             auto_generated_release_tar = f'{archive_base_url}.tar.gz'
             auto_generated_release_zip = f'{archive_base_url}.zip'
 
         archive_urls['default'] = auto_generated_release_tar
 
         target_browser_download_base_url = (
-            f'https://github.com/{GITHUB_OWNER}/{GITHUB_REPO}/releases/download/{version}/'
+            f'{GITHUB_SERVER_URL}/{config.github_owner}/{config.github_repo}/releases/download/{version}/'
         )
-        default_target_prefix = f'{GITHUB_REPO}-{version_no_v}'
-        if isinstance(TARGET, str):
-            archive_urls['default'] = f'{target_browser_download_base_url}{TARGET}'
+        if isinstance(config.target, str):
+            archive_urls['default'] = f'{target_browser_download_base_url}{config.target}'
             logger.debug('Target overridden (default): %s', archive_urls['default'])
-        if TARGET_DARWIN_AMD64:
-            archive_urls['darwin_amd64'] = (
-                f'{target_browser_download_base_url}{(
-                    TARGET_DARWIN_AMD64 if isinstance(TARGET_DARWIN_AMD64, str)
-                    else f'{default_target_prefix}-darwin-amd64.tar.gz'
-                )}'
-            )
-            logger.debug('Target overridden (darwin_amd64): %s', archive_urls['darwin_amd64'])
-        if TARGET_DARWIN_ARM64:
-            archive_urls['darwin_arm64'] = (
-                f'{target_browser_download_base_url}{(
-                    TARGET_DARWIN_ARM64 if isinstance(TARGET_DARWIN_ARM64, str)
-                    else f'{default_target_prefix}-darwin-arm64.tar.gz'
-                )}'
-            )
-            logger.debug('Target overridden (darwin_arm64): %s', archive_urls['darwin_arm64'])
-        if TARGET_LINUX_AMD64:
-            archive_urls['linux_amd64'] = (
-                f'{target_browser_download_base_url}{(
-                    TARGET_LINUX_AMD64 if isinstance(TARGET_LINUX_AMD64, str)
-                    else f'{default_target_prefix}-linux-amd64.tar.gz'
-                )}'
-            )
-            logger.debug('Target overridden (linux_amd64): %s', archive_urls['linux_amd64'])
-        if TARGET_LINUX_ARM64:
-            archive_urls['linux_arm64'] = (
-                f'{target_browser_download_base_url}{(
-                    TARGET_LINUX_ARM64 if isinstance(TARGET_LINUX_ARM64, str)
-                    else f'{default_target_prefix}-linux-arm64.tar.gz'
-                )}'
-            )
-            logger.debug('Target overridden (linux_arm64): %s', archive_urls['linux_arm64'])
-
-        checksums = []
-        for archive_type, archive_url in archive_urls.items():
-            if not assets:
-                assets = [0]  # TODO: This is a dumb hack to ensure we enter here even when we don't have any assets
-            for asset in assets:
-                # Download the asset url so private repos work but use the brower URL for name and path in formula
-                if archive_url == auto_generated_release_tar or archive_url == auto_generated_release_zip:
-                    download_url = archive_url
-                else:
-                    download_url = asset['url']
-
-                if (
-                    archive_url == auto_generated_release_tar
-                    or archive_url == auto_generated_release_zip
-                    or archive_url == asset['browser_download_url']
-                ):
-                    # For REST API requests, we should not stream archive file, but it is fine for browser URLs
-                    stream = False if archive_url.find("api.github.com") != -1 else True
-                    downloaded_filename = App.download_archive(download_url, stream)
-                    checksum = Checksum.get_checksum(downloaded_filename)
-                    archive_filename = Utils.get_filename_from_path(archive_url)
-                    archive_checksum_entries += f'{checksum} {archive_filename}\n'
-                    checksums.append(
-                        {archive_filename: {'checksum': checksum, 'url': archive_url, 'type': archive_type}},
-                    )
-                    break
+        for target in TARGETS:
+            target_asset = config.targets.get(target.name)
+            if target_asset:
+                archive_urls[target.name] = (
+                    f'{target_browser_download_base_url}{(
+                        target_asset if isinstance(target_asset, str)
+                        else target.asset_name(asset_repo, version_no_v)
+                    )}'
+                )
+                logger.debug('Target overridden (%s): %s', target.name, archive_urls[target.name])
+        for resource_name, resource in config.resources.items():
+            # Resources are release assets (`{repo}` and `{version}` are filled in like for targets) or any URL
+            archive_urls[f'{RESOURCE_PREFIX}{resource_name}'] = (
+                resource
+                if '://' in resource
+                else target_browser_download_base_url + resource.format(repo=asset_repo, version=version_no_v)
+            )
+        for tag in config.bottles:
+            archive_urls[f'{BOTTLE_PREFIX}{tag}'] = target_browser_download_base_url + BOTTLE_ASSET_PATTERN.format(
+                name=asset_repo, version=version_no_v, tag=tag
+            )
 
-        logger.debug("checksums = %s", checksums)
-        Utils.write_file(CHECKSUM_FILE, archive_checksum_entries)
+        return archive_urls, (auto_generated_release_tar, auto_generated_release_zip)
 
-        logger.info(f'Generating Homebrew formula for {GITHUB_REPO}...')
-        template = Formula.generate_formula_data(
-            owner=GITHUB_OWNER,
-            repo_name=GITHUB_REPO,
-            repository=repository,
-            checksums=checksums,
-            install=INSTALL,
-            tar_url=archive_urls['default'],
-            depends_on=DEPENDS_ON,
-            test=TEST,
-            caveats=CAVEATS,
-            download_strategy=DOWNLOAD_STRATEGY,
-            custom_require=CUSTOM_REQUIRE,
-            formula_includes=FORMULA_INCLUDES,
-            version=version_no_v if VERSION else None,
+    @staticmethod
+    async def generate_checksums(
+        archive_urls: List[Tuple[str, str]],
+        auto_generated_urls: Tuple[str, str],
+        assets: List[Dict[str, Any]],
+        config: Config,
+        fragments: Optional[Dict[str, ChecksumFragment]] = None,
+        asset_watcher: Optional[AssetWatcher] = None,
+    ) -> List[ArchiveChecksum]:
+        """Downloads and hashes every `(archive type, URL)` archive concurrently.
+
+        Checksums are returned in the order of `archive_urls` regardless of which download finishes first,
+        so `checksum.txt` and the formula are identical to a sequential run. Archives with a checksum `fragment`
+        (keyed by filename, hashed for their archive type) are neither downloaded nor required to be uploaded to the
+        release yet, unless they are mirrored. Archives hosted
+        outside the release (eg: a `resources` URL) are downloaded as is, like the auto-generated ones. With an
+        `asset_watcher`, the archives whose asset is still being uploaded are each hashed as soon as it is uploaded.
+        The archives missing from the release are left out, except for `resources` which fail the publish.
+        """
+        fragments = fragments or {}
+        cache = (
+            ChecksumCache(config.checksum_cache_url, config.checksum_cache_read_only, CHECKSUM_CACHE_TOKEN)
+            if config.checksum_cache_url
+            else None
         )
+        release_download_url = f'{GITHUB_SERVER_URL}/{config.github_owner}/{config.github_repo}/releases/download/'
+        if not asset_watcher:
+            # A formula can't be installed without its resources, unlike the targets missing from the release
+            asset_urls = {asset['browser_download_url'] for asset in assets}
+            missing_resources = [
+                Utils.get_filename_from_path(archive_url)
+                for archive_type, archive_url in archive_urls
+                if archive_type.startswith(RESOURCE_PREFIX)
+                and archive_url.startswith(release_download_url)
+                and archive_url not in asset_urls
+                and Utils.get_filename_from_path(archive_url) not in fragments
+            ]
+            if missing_resources:
+                raise BrewtapError(f'Resources missing from the release assets: {", ".join(missing_resources)}.')
+        downloads = []
+        for archive_type, archive_url in archive_urls:
+            fragment = fragments.get(Utils.get_filename_from_path(archive_url))
+            if fragment:
+                downloads.append(
+                    App._fragment_checksum(archive_type, archive_url, fragment, config, assets, asset_watcher)
+                )
+                continue
+            # Download the asset url so private repos work but use the brower URL for name and path in formula
+            matching_asset = None
+            if archive_url in auto_generated_urls or not archive_url.startswith(release_download_url):
+                download_url = archive_url
+            elif asset_watcher:
+                downloads.append(
+                    App._uploaded_checksum_archive(archive_type, archive_url, config, cache, asset_watcher)
+                )
+                continue
+            else:
+                matching_asset = next(
+                    (asset for asset in assets if asset['browser_download_url'] == archive_url),
+                    None,
+                )
+                if matching_asset is None:
+                    continue
+                download_url = matching_asset['url']
+            downloads.append(
+                App._checksum_archive(archive_type, archive_url, download_url, config, cache, matching_asset)
+            )
 
-        Utils.write_file(os.path.join(HOMEBREW_TAP, FORMULA_FOLDER, f'{repository["name"]}.rb'), template, 'w')
+        return await Utils.run_concurrently(*downloads)
 
-        if UPDATE_README_TABLE:
-            logger.info('Attempting to update the README\'s project table...')
-            ReadmeUpdater.update_readme(HOMEBREW_TAP)
+    @staticmethod
+    async def _uploaded_checksum_archive(
+        archive_type: str,
+        archive_url: str,
+        config: Config,
+        cache: Optional[ChecksumCache],
+        asset_watcher: AssetWatcher,
+    ) -> ArchiveChecksum:
+        """Waits for the asset of an archive to be uploaded, then downloads and hashes it."""
+        asset = await asset_watcher.wait(archive_url)
+
+        return await App._checksum_archive(archive_type, archive_url, asset['url'], config, cache, asset)
+
+    @staticmethod
+    async def _fragment_checksum(
+        archive_type: str,
+        archive_url: str,
+        fragment: ChecksumFragment,
+        config: Config,
+        assets: List[Dict[str, Any]],
+        asset_watcher: Optional[AssetWatcher] = None,
+    ) -> ArchiveChecksum:
+        """The checksum of an archive hashed ahead of time by `brewtap hash`.
+
+        The (signed) target of the fragment must be the type of the archive, so the fragment of an asset can't stand
+        in for the asset of another target that happens to have the same filename. With `mirror_url`, the archive is
+        mirrored like a hashed one: it is downloaded (once uploaded to the release) unless the bucket already holds it.
+        """
+        if fragment.target != archive_type:
+            raise BrewtapError(
+                f'The checksum fragment of {fragment.filename} was hashed for the {fragment.target} target, '
+                f'not {archive_type}.'
+            )
+        woodchips.get(LOGGER_NAME).debug(f'Using the checksum fragment of {fragment.filename} ({fragment.target}).')
+        archive_checksum = ArchiveChecksum(fragment.filename, fragment.sha256, archive_url, archive_type)
+
+        if config.mirror_url:
+            asset = None
+            if asset_watcher:
+                asset = await asset_watcher.wait(archive_url)
+            else:
+                asset = next(
+                    (release_asset for release_asset in assets if release_asset['browser_download_url'] == archive_url),
+                    None,
+                )
+            download_url = asset['url'] if asset else archive_url
+            archive_checksum = await App._mirror_archive(
+                archive_checksum, None, download_url, not archive_url.startswith(GITHUB_BASE_URL), config
+            )
+
+        return archive_checksum
+
+    @staticmethod
+    async def _checksum_archive(
+        archive_type: str,
+        archive_url: str,
+        download_url: str,
+        config: Config,
+        cache: Optional[ChecksumCache] = None,
+        asset: Optional[Dict[str, Any]] = None,
+    ) -> ArchiveChecksum:
+        """Downloads a single archive and hashes it, each step bounded by `TASK_TIMEOUT`.
+
+        With a `cache`, the checksum of an archive another runner already hashed is used as is, and the checksums
+        of the archives hashed here are stored for the next runners. With `mirror_url`, the archive is then mirrored.
+        """
+        archive_filename = Utils.get_filename_from_path(archive_url)
+        size = asset.get('size') if asset else None
+        cache_key = ChecksumCache.key(download_url, asset)
+        # For REST API requests, we should not stream archive file, but it is fine for browser URLs
+        stream = not archive_url.startswith(GITHUB_BASE_URL)
+        downloaded_filename = None
+        cached_checksum = (
+            await Utils.run_blocking(cache.get, cache_key, archive_url, size, timeout=TASK_TIMEOUT) if cache else None
+        )
+
+        if cached_checksum:
+            archive_checksum = ArchiveChecksum(archive_filename, cached_checksum, archive_url, archive_type)
         else:
-            logger.debug('Skipping update to project README.')
+            downloaded_filename = await Utils.run_blocking(
+                App.download_archive, download_url, stream, config.github_token, config.work_dir, timeout=TASK_TIMEOUT
+            )
+            checksum = await Utils.run_blocking(Checksum.get_checksum, downloaded_filename, timeout=TASK_TIMEOUT)
+            if cache:
+                await Utils.run_blocking(cache.put, cache_key, archive_url, checksum, size, timeout=TASK_TIMEOUT)
+            archive_checksum = ArchiveChecksum(archive_filename, checksum, archive_url, archive_type)
+
+        if config.mirror_url:
+            archive_checksum = await App._mirror_archive(
+                archive_checksum, downloaded_filename, download_url, stream, config
+            )
 
-        # Although users can skip a commit, still commit (and don't push) to dry-run a commit
-        Git.add(HOMEBREW_TAP)
-        Git.commit(HOMEBREW_TAP, GITHUB_REPO, version)
+        return archive_checksum
+
+    @staticmethod
+    async def _mirror_archive(
+        archive_checksum: ArchiveChecksum,
+        downloaded_filename: Optional[str],
+        download_url: str,
+        stream: bool,
+        config: Config,
+    ) -> ArchiveChecksum:
+        """Copies an archive to the bucket of `mirror_url` unless a previous publish did (see `AssetMirror`).
+
+        An archive whose checksum came from the checksum cache (or a checksum fragment) is downloaded first, unless it
+        is already mirrored. Its upload then fails if the downloaded bytes do not match that checksum.
+        """
+        mirror = AssetMirror(
+            config.mirror_url,  # type: ignore
+            config.mirror_public_url,
+            config.mirror_region,
+            MIRROR_ACCESS_KEY,
+            MIRROR_SECRET_KEY,
+            MIRROR_SESSION_TOKEN,
+        )
+        key = AssetMirror.object_key(
+            config.github_owner, config.github_repo, archive_checksum.checksum, archive_checksum.filename
+        )
 
-        if SKIP_COMMIT:
-            logger.info(f'Skipping upload of checksum.txt to {HOMEBREW_TAP}.')
-            logger.info(f'Skipping push to {HOMEBREW_TAP}.')
+        if await Utils.run_blocking(mirror.mirrored, key, archive_checksum.checksum, timeout=TASK_TIMEOUT):
+            woodchips.get(LOGGER_NAME).debug(f'{key} is already mirrored.')
         else:
-            logger.info(f'Attempting to upload checksum.txt to the latest release of {GITHUB_REPO}...')
-            Checksum.upload_checksum_file(release)
-            logger.info(f'Attempting to release {version} of {GITHUB_REPO} to {HOMEBREW_TAP}...')
-            Git.push(HOMEBREW_TAP, HOMEBREW_OWNER)
-            logger.info(f'Successfully released {version} of {GITHUB_REPO} to {HOMEBREW_TAP}!')
+            if downloaded_filename is None:
+                downloaded_filename = await Utils.run_blocking(
+                    App.download_archive,
+                    download_url,
+                    stream,
+                    config.github_token,
+                    config.work_dir,
+                    timeout=TASK_TIMEOUT,
+                )
+            await Utils.run_blocking(
+                mirror.mirror_file, key, downloaded_filename, archive_checksum.checksum, timeout=TASK_TIMEOUT
+            )
+
+        return replace(archive_checksum, mirror=mirror.object_url(key, public=True))
 
     @staticmethod
-    def setup_logger():
+    def setup_logger(debug: bool = False):
         """Setup a `woodchips` logger instance."""
-        logging_level = 'DEBUG' if DEBUG else 'INFO'
+        logging_level = 'DEBUG' if debug or DEBUG else 'INFO'
 
         logger = woodchips.Logger(
             name=LOGGER_NAME,
@@ -211,15 +1121,16 @@ class App:
         logger.log_to_console(formatter='%(asctime)s - %(levelname)s - %(message)s')
 
     @staticmethod
-    def check_required_env_variables():
+    def check_required_env_variables(config: Optional[Config] = None):
         """Checks that all required env variables are set."""
         logger = woodchips.get(LOGGER_NAME)
 
+        config = config or Config.from_env()
         required_env_variables = [
-            GITHUB_TOKEN,
-            HOMEBREW_OWNER,
-            HOMEBREW_TAP,
-            INSTALL,
+            config.github_token,
+            config.homebrew_owner,
+            config.homebrew_tap,
+            config.install,
         ]
 
         for env_variable in required_env_variables:
@@ -229,18 +1140,71 @@ class App:
                 )
         logger.debug('All required environment variables are present.')
 
+        if config.readme_table_layout not in README_TABLE_LAYOUTS:
+            raise SystemExit(
+                f'The "readme_table_layout" must be one of {", ".join(README_TABLE_LAYOUTS)}, '
+                f'not "{config.readme_table_layout}".'
+            )
+        invalid_bottles = [tag for tag in config.bottles if not BOTTLE_TAG_PATTERN.match(tag)]
+        if invalid_bottles:
+            raise SystemExit(f'Invalid bottle tags: {", ".join(invalid_bottles)} (eg: "arm64_sonoma", "x86_64_linux").')
+        if not config.bottle_cellar.startswith((':', '/')):
+            raise SystemExit(
+                f'The "bottle_cellar" must be a symbol (eg: ":any") or a path, not "{config.bottle_cellar}".'
+            )
+        if config.backfill_releases and (config.formulas or config.additional_taps):
+            raise SystemExit('The "backfill_releases" option cannot be combined with "formulas" or "additional_taps".')
+        if config.sparse_checkout and not config.sharded_formula_folder:
+            raise SystemExit('The "sparse_checkout" option requires a "sharded_formula_folder".')
+        if config.sparse_checkout and config.update_readme_table and not config.update_tap_index:
+            raise SystemExit(
+                'The "sparse_checkout" option requires "update_tap_index" to update the README table, '
+                'since not every formula is checked out.'
+            )
+
     @staticmethod
-    def download_archive(url: str, stream: Optional[bool] = False) -> str:
-        """Gets an archive (eg: zip, tar) from GitHub and saves it locally."""
-        response = Utils.make_github_get_request(
-            url=url,
-            stream=stream,
-        )
+    def check_batch_configs(configs: List[Config]):
+        """Checks that every config of a batch is complete and that they all publish to the same tap."""
+        if not configs:
+            raise SystemExit('A batch must list at least one repository.')
+        for config in configs:
+            App.check_required_env_variables(config)
+            if config.additional_taps:
+                raise SystemExit('The repositories of a batch cannot have "additional_taps".')
+
+        taps = {(config.homebrew_owner, config.homebrew_tap) for config in configs}
+        if len(taps) > 1:
+            raise SystemExit('Every repository of a batch must be published to the same "homebrew_tap".')
+        repos = [config.github_repo for config in configs]
+        if len(set(repos)) < len(repos):
+            raise SystemExit('Every repository of a batch must be listed only once.')
+
+    @staticmethod
+    def download_archive(
+        url: str, stream: Optional[bool] = False, token: Optional[str] = None, directory: Optional[str] = None
+    ) -> str:
+        """Gets an archive (eg: zip, tar) from GitHub (or any other host) and saves it locally."""
+        if url.startswith((GITHUB_BASE_URL, GITHUB_SERVER_URL)):
+            response = Utils.make_github_get_request(
+                url=url,
+                stream=stream,
+                token=token,
+            )
+        else:
+            # Files hosted outside of GitHub (eg: `resources`) must not get the GitHub token
+            response = Utils.make_get_request(url)
         filename = Utils.get_filename_from_path(url)
+        if directory:
+            filename = os.path.join(directory, filename)
         Utils.write_file(filename, response.content, 'wb')
 
         return filename
 
+    @staticmethod
+    def _work_path(config: Config, filename: str) -> str:
+        """Places a working file (eg: `checksum.txt`) in the configured work directory."""
+        return os.path.join(config.work_dir, filename) if config.work_dir else filename
+
 
 def main():
     App.run_github_action()
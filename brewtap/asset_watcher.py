@@ -0,0 +1,143 @@
+import asyncio
+import time
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import requests
+import woodchips
+
+from brewtap.config import Config
+from brewtap.constants import (
+    GITHUB_BASE_URL,
+    LOGGER_NAME,
+    TASK_TIMEOUT,
+)
+from brewtap.utils import (
+    BrewtapError,
+    Utils,
+)
+
+
+ASSET_POLL_INTERVAL = 5  # Seconds between two polls of the asset list of a release
+ASSETS_PAGE_SIZE = 100  # The most assets GitHub lists per request
+
+
+class AssetWatcher:
+    """Watches the asset list of a release whose assets are still being uploaded (`wait_for_assets`).
+
+    Each archive waits for its own asset (see `AssetWatcher.wait`), so it is downloaded and hashed as soon as its
+    upload completes while the other uploads are still running. One poller serves every waiting archive: it lists the
+    assets of the release (every page of them) every `ASSET_POLL_INTERVAL` seconds with conditional requests, which
+    do not count against the rate limit while nothing changed, and stops once no archive waits anymore. Archives whose
+    asset is not uploaded within `deadline` seconds of the start fail the publish, like every waiting archive when the
+    poller itself fails.
+    """
+
+    def __init__(self, config: Config, release: Dict[str, Any], deadline: float):
+        self.config = config
+        self.assets_url = (
+            f'{GITHUB_BASE_URL}/repos/{config.github_owner}/{config.github_repo}/releases/{release["id"]}/assets'
+            f'?per_page={ASSETS_PAGE_SIZE}'
+        )
+        self.deadline = deadline
+        self.expires_at = time.monotonic() + deadline
+        self.assets: Dict[str, Dict[str, Any]] = AssetWatcher.index_assets(release['assets'])
+        # Page URL -> its ETag, assets and the URL of the next page, pages are requested again with their ETag
+        self.pages: Dict[str, Tuple[Optional[str], List[Dict[str, Any]], Optional[str]]] = {}
+        self.waiters: Dict[str, asyncio.Future] = {}  # Browser download URL -> its uploaded asset
+        self.poller: Optional[asyncio.Task] = None
+
+    async def wait(self, archive_url: str) -> Dict[str, Any]:
+        """The asset of an archive (by browser download URL), once it is uploaded."""
+        asset = self.assets.get(archive_url)
+        if asset and asset.get('state') == 'uploaded':
+            return asset
+
+        woodchips.get(LOGGER_NAME).info(f'Waiting for {Utils.get_filename_from_path(archive_url)} to be uploaded...')
+        if archive_url not in self.waiters:
+            self.waiters[archive_url] = asyncio.get_running_loop().create_future()
+        if self.poller is None or self.poller.done():
+            self.poller = asyncio.create_task(self.poll())
+
+        return await self.waiters[archive_url]  # Cancelling the wait cancels the waiter, the poller then stops
+
+    async def poll(self):
+        """Lists the assets of the release until every waiting archive got its asset or the deadline passed.
+
+        Any unexpected error (eg: a malformed asset list) fails every waiting archive instead of leaving it waiting.
+        """
+        try:
+            await self.watch()
+        except Exception as error:
+            for archive_url in self.pending():
+                self.waiters[archive_url].set_exception(
+                    BrewtapError(f'Could not list the assets of the release: {str(error) or type(error).__name__}')
+                )
+
+    async def watch(self):
+        """The polling loop of `AssetWatcher.poll`."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        while self.pending():
+            remaining = self.expires_at - time.monotonic()
+            if remaining <= 0:
+                for archive_url in self.pending():
+                    self.waiters[archive_url].set_exception(
+                        BrewtapError(
+                            f'{Utils.get_filename_from_path(archive_url)} was not uploaded to the release within '
+                            f'{self.deadline} seconds.'
+                        )
+                    )
+                return
+            await asyncio.sleep(min(ASSET_POLL_INTERVAL, remaining))
+
+            try:
+                self.assets = await self.list_assets()
+            except BrewtapError as error:
+                logger.warning(f'Could not list the assets of the release, retrying: {error}')
+                continue
+
+            for archive_url in self.pending():
+                asset = self.assets.get(archive_url)
+                if asset and asset.get('state') == 'uploaded':
+                    logger.info(f'{asset["name"]} was uploaded, hashing it.')
+                    self.waiters[archive_url].set_result(asset)
+
+    async def list_assets(self) -> Dict[str, Dict[str, Any]]:
+        """Lists the assets of the release a page at a time, following the `next` links of the responses.
+
+        The pages that did not change since the previous poll are answered `304 Not Modified` and reused.
+        """
+        assets: List[Dict[str, Any]] = []
+        page_url: Optional[str] = self.assets_url
+        while page_url:
+            etag, page_assets, next_url = self.pages.get(page_url, (None, [], None))
+            response = await Utils.run_blocking(
+                Utils.make_github_get_request,
+                page_url,
+                token=self.config.github_token,
+                etag=etag,
+                timeout=TASK_TIMEOUT,
+            )
+            if response.status_code != requests.codes.not_modified:
+                next_link = response.links.get('next')
+                etag, page_assets = response.headers.get('ETag'), response.json()
+                next_url = next_link['url'] if next_link else None
+                self.pages[page_url] = (etag, page_assets, next_url)
+            assets.extend(page_assets)
+            page_url = next_url
+
+        return AssetWatcher.index_assets(assets)
+
+    def pending(self) -> List[str]:
+        """The archives still waiting for their asset."""
+        return [archive_url for archive_url, waiter in self.waiters.items() if not waiter.done()]
+
+    @staticmethod
+    def index_assets(assets: Any) -> Dict[str, Dict[str, Any]]:
+        return {asset['browser_download_url']: asset for asset in assets}
@@ -1,5 +1,9 @@
 import subprocess  # nosec
-from typing import Any
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Optional,
+)
 
 import requests
 import woodchips
@@ -12,6 +16,22 @@ from brewtap.constants import (
     LOGGER_NAME,
     TIMEOUT,
 )
+from brewtap.utils import HTTP_SESSION
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveChecksum:
+    """The checksum of a downloaded archive.
+
+    `target` is `default` for the archive of the top-level formula `url`, otherwise the name of its `Target`.
+    `mirror` is the URL of the copy of the archive in the bucket of `mirror_url`, if any.
+    """
+
+    filename: str
+    checksum: str
+    url: str
+    target: str = 'default'
+    mirror: Optional[str] = None
 
 
 class Checksum:
@@ -39,28 +59,44 @@ class Checksum:
         return checksum
 
     @staticmethod
-    def upload_checksum_file(release: dict[str, Any]):
+    def upload_checksum_file(
+        release: dict[str, Any],
+        owner: Optional[str] = None,
+        repo: Optional[str] = None,
+        token: Optional[str] = None,
+        checksum_file: str = CHECKSUM_FILE,
+    ):
         """Uploads a `checksum.txt` file to the latest release of the repo."""
         logger = woodchips.get(LOGGER_NAME)
 
+        owner = owner or GITHUB_OWNER
+        repo = repo or GITHUB_REPO
         release_id = release['id']
 
-        with open(CHECKSUM_FILE, 'rb') as filename:
+        with open(checksum_file, 'rb') as filename:
             checksum_binary = filename.read()
 
-        upload_url = f'https://uploads.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}/assets?name={CHECKSUM_FILE}'  # noqa
+        # The release links to its upload endpoint (as a `.../assets{?name,label}` URI template)
+        upload_base_url = (
+            release['upload_url'].split('{', 1)[0]
+            if release.get('upload_url')
+            else f'https://uploads.github.com/repos/{owner}/{repo}/releases/{release_id}/assets'
+        )
+        upload_url = f'{upload_base_url}?name={CHECKSUM_FILE}'
         headers = GITHUB_HEADERS.copy()
         headers['Content-Type'] = 'text/plain'
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
 
         try:
-            response = requests.post(
+            response = HTTP_SESSION.post(
                 upload_url,
                 headers=headers,
                 data=checksum_binary,
                 timeout=TIMEOUT,
             )
             if response.ok:
-                logger.info(f'checksum.txt uploaded successfully to {GITHUB_REPO}.')
+                logger.info(f'checksum.txt uploaded successfully to {repo}.')
             else:
                 logger.debug(response.json())
                 SystemExit(f'checksum.txt was not uploaded: received status code ${response.status_code}')
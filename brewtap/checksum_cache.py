@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+)
+
+import requests
+import woodchips
+
+from brewtap.constants import (
+    LOGGER_NAME,
+    TIMEOUT,
+)
+from brewtap.utils import (
+    HTTP_SESSION,
+    Utils,
+)
+
+
+# Keys and checksums are both SHA-256 hex digests
+HEX_DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+ENTRY_PATH = '/checksums/'
+
+
+class ChecksumCache:
+    """A client of a remote checksum cache shared by runners, so an archive hashed by one job is not downloaded
+    and hashed again by the next.
+
+    The protocol follows build caches: `GET /checksums/<key>` answers the entry of a key (or `404`), and
+    `PUT /checksums/<key>` stores one. Keys are derived from what identifies the content of an archive before
+    downloading it (see `ChecksumCache.key`), entries are `{"key", "url", "size", "sha256"}`. Hits are checked
+    against the requested key, URL and (when known) asset size, a failing check counts as a miss. The cache never
+    fails a publish: errors are logged and the archive is downloaded as usual.
+    """
+
+    def __init__(self, url: str, read_only: bool = False, token: Optional[str] = None):
+        self.url = url.rstrip('/')
+        self.read_only = read_only
+        self.headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+    @staticmethod
+    def key(download_url: str, asset: Optional[Dict[str, Any]] = None) -> str:
+        """The key of an archive: its URL, along with the id, size and update time of its release asset (if any)
+        so a re-uploaded asset gets a new key.
+        """
+        asset = asset or {}
+        material = '\n'.join(
+            str(part) for part in (download_url, asset.get('id'), asset.get('size'), asset.get('updated_at'))
+        )
+
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str, url: str, size: Optional[int] = None) -> Optional[str]:
+        """The cached checksum of an archive, if the cache has a valid entry for it."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        try:
+            response = HTTP_SESSION.get(f'{self.url}{ENTRY_PATH}{key}', headers=self.headers, timeout=TIMEOUT)
+            if response.status_code == requests.codes.not_found:
+                logger.debug(f'Checksum cache miss for {url}.')
+                return None
+            response.raise_for_status()
+            entry = response.json()
+        except (requests.exceptions.RequestException, ValueError) as error:
+            logger.warning(f'Could not read the checksum cache for {url}: {error}')
+            return None
+
+        if not ChecksumCache.valid_entry(entry, key, url, size):
+            logger.warning(f'Ignoring the invalid checksum cache entry of {url}.')
+            return None
+        logger.debug(f'Checksum cache hit for {url}.')
+
+        return entry['sha256']
+
+    def put(self, key: str, url: str, checksum: str, size: Optional[int] = None):
+        """Stores the checksum of an archive, unless the cache is read-only."""
+        if self.read_only:
+            return
+        entry = {'key': key, 'url': url, 'size': size, 'sha256': checksum}
+        try:
+            response = HTTP_SESSION.put(
+                f'{self.url}{ENTRY_PATH}{key}', json=entry, headers=self.headers, timeout=TIMEOUT
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as error:
+            woodchips.get(LOGGER_NAME).warning(f'Could not store the checksum of {url} in the checksum cache: {error}')
+
+    @staticmethod
+    def valid_entry(entry: Any, key: str, url: Optional[str] = None, size: Optional[int] = None) -> bool:
+        """Whether an entry is well formed and describes the archive of `key` (and `url`/`size` when given)."""
+        return (
+            isinstance(entry, dict)
+            and entry.get('key') == key
+            and isinstance(entry.get('sha256'), str)
+            and bool(HEX_DIGEST_PATTERN.match(entry['sha256']))
+            and (url is None or entry.get('url') == url)
+            and (size is None or entry.get('size') in (None, size))
+        )
+
+
+class ChecksumCacheServer(ThreadingHTTPServer):
+    """The reference checksum cache server (`brewtap cache-server`), storing one JSON file per entry in `directory`.
+
+    With a `token`, only requests bearing it may store entries, anyone may read them.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], directory: str, token: Optional[str] = None):
+        super().__init__(address, ChecksumCacheHandler)
+        self.directory = directory
+        self.token = token
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+
+class ChecksumCacheHandler(BaseHTTPRequestHandler):
+    server: ChecksumCacheServer
+
+    def do_GET(self):
+        if self.path in ('', '/'):
+            return self.respond(200, {'status': 'ok'})
+        key = self.entry_key()
+        if key is None:
+            return self.respond(404, {'error': 'Not found.'})
+
+        try:
+            with open(self.server.entry_path(key), 'rb') as entry_file:
+                body = entry_file.read()
+        except FileNotFoundError:
+            return self.respond(404, {'error': f'No entry for {key}.'})
+        self.respond_body(200, body)
+
+    def do_PUT(self):
+        key = self.entry_key()
+        if key is None:
+            return self.respond(404, {'error': 'Not found.'})
+        if self.server.token and self.headers.get('Authorization') != f'Bearer {self.server.token}':
+            return self.respond(401, {'error': 'This cache is read-only without its token.'})
+
+        try:
+            entry = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        except ValueError:
+            entry = None
+        if not ChecksumCache.valid_entry(entry, key):
+            return self.respond(400, {'error': 'Invalid entry.'})
+
+        entry_path = self.server.entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        Utils.write_atomically(entry_path, json.dumps(entry))
+        self.respond(201, {'status': f'Stored {key}.'})
+
+    def entry_key(self) -> Optional[str]:
+        """The key of an entry path, if the path is one."""
+        if not self.path.startswith(ENTRY_PATH):
+            return None
+        key = self.path.removeprefix(ENTRY_PATH)
+
+        return key if HEX_DIGEST_PATTERN.match(key) else None
+
+    def respond(self, status: int, payload: Dict[str, Any]):
+        self.respond_body(status, json.dumps(payload).encode())
+
+    def respond_body(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):
+        woodchips.get(LOGGER_NAME).debug(f'{self.address_string()} - {format % args}')
@@ -0,0 +1,268 @@
+import json
+import os
+from dataclasses import (
+    dataclass,
+    field,
+    fields,
+)
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
+
+from brewtap.constants import (
+    ADDITIONAL_TAPS,
+    BACKFILL_RELEASES,
+    BOTTLE_CELLAR,
+    BOTTLES,
+    CAVEATS,
+    CHECKSUM_CACHE_READ_ONLY,
+    CHECKSUM_CACHE_URL,
+    CHECKSUM_FRAGMENTS,
+    COMMIT_EMAIL,
+    COMMIT_OWNER,
+    CUSTOM_REQUIRE,
+    DEBUG,
+    DEPENDS_ON,
+    DOWNLOAD_STRATEGY,
+    FORMULA_FOLDER,
+    FORMULA_INCLUDES,
+    FORMULAS,
+    GITHUB_OWNER,
+    GITHUB_REPO,
+    GITHUB_TOKEN,
+    HOMEBREW_OWNER,
+    HOMEBREW_TAP,
+    INSTALL,
+    MIRROR_PUBLIC_URL,
+    MIRROR_REGION,
+    MIRROR_URL,
+    PATCH_FORMULA,
+    README_FULL_REBUILD,
+    README_PARSE_PROCESSES,
+    README_TABLE_LAYOUT,
+    RESOURCES,
+    RESUME,
+    SHARDED_FORMULA_FOLDER,
+    SKIP_COMMIT,
+    SPARSE_CHECKOUT,
+    TARGET,
+    TARGET_MATRIX,
+    TEST,
+    UPDATE_README_TABLE,
+    UPDATE_TAP_INDEX,
+    VERSION,
+    WAIT_FOR_ASSETS,
+)
+
+
+# The options describing the release itself rather than where it is published, an `additional_taps` entry can
+# override any other option
+RELEASE_OPTIONS = (
+    'github_owner',
+    'github_repo',
+    'version',
+    'work_dir',
+    'target',
+    'targets',
+    'formula_name',
+    'formulas',
+    'additional_taps',
+    'bottles',
+    'resources',
+    'checksum_fragments',
+    'wait_for_assets',
+    'mirror_url',
+    'mirror_public_url',
+    'mirror_region',
+)
+# The options a `formulas` entry can override
+FORMULA_OPTIONS = (
+    'install',
+    'test',
+    'depends_on',
+    'caveats',
+    'download_strategy',
+    'custom_require',
+    'formula_includes',
+    'target',
+    'targets',
+    'bottles',
+    'bottle_cellar',
+    'resources',
+    'patch_formula',
+)
+
+
+@dataclass
+class Config:
+    """The inputs of a single publish.
+
+    GitHub Actions hands these to us as `INPUT_*` environment variables (see `Config.from_env`), library
+    callers can build as many independent configs as they need and run them on one event loop.
+    """
+
+    github_owner: str
+    github_repo: str
+    homebrew_owner: Optional[str]
+    homebrew_tap: Optional[str]
+    github_token: Optional[str] = None
+    formula_folder: str = 'Formula'
+    formula_name: Optional[str] = None  # Defaults to the name of the repository
+    sharded_formula_folder: bool = False  # Formulas live in `formula_folder/<shard>/`, see `App.formula_shard`
+    sparse_checkout: bool = False  # Only check out the shard of the formula, requires `sharded_formula_folder`
+    commit_owner: str = 'github-actions[bot]'
+    commit_email: str = '41898282+github-actions[bot]@users.noreply.github.com'
+    install: Optional[str] = None
+    test: Optional[str] = None
+    depends_on: Optional[str] = None
+    caveats: Optional[str] = None
+    download_strategy: Optional[str] = None
+    custom_require: Optional[str] = None
+    formula_includes: Optional[str] = None
+    version: Optional[str] = None
+    work_dir: Optional[str] = None  # Where assets and `checksum.txt` are written, defaults to the current directory
+    target: str | bool = False
+    targets: Dict[str, str | bool] = field(default_factory=dict)  # `Target` name -> custom asset name or `True`
+    bottles: List[str] = field(default_factory=list)  # Tags (eg: `arm64_sonoma`) of the bottles in the release assets
+    bottle_cellar: str = ':any_skip_relocation'  # The `cellar:` of the bottles, a symbol or an absolute path
+    resources: Dict[str, str] = field(default_factory=dict)  # Resource name -> release asset name (or any URL)
+    update_readme_table: bool = False
+    readme_full_rebuild: bool = False
+    readme_table_layout: str = 'single'  # One of `README_TABLE_LAYOUTS`
+    readme_parse_processes: bool = False  # Parse the formulas of a README table rebuild in processes, not threads
+    update_tap_index: bool = False
+    patch_formula: bool = False
+    formulas: List[Dict[str, Any]] = field(default_factory=list)  # `name` and options of each formula of the release
+    additional_taps: List[Dict[str, Any]] = field(default_factory=list)  # Options of the other taps to publish to
+    reuse_clone: bool = False  # Refresh the clone of a previous publish instead of cloning the tap (`brewtap serve`)
+    checksum_fragments: Optional[str] = None  # Glob of `brewtap hash` fragments used instead of downloading assets
+    checksum_cache_url: Optional[str] = None  # A checksum cache server (see `ChecksumCache`) shared by runners
+    checksum_cache_read_only: bool = False  # Only look checksums up in the cache, without storing new ones
+    mirror_url: Optional[str] = None  # An S3-compatible bucket the archives are copied to (see `AssetMirror`)
+    mirror_public_url: Optional[str] = None  # The base URL of the `mirror` stanzas, defaults to `mirror_url`
+    mirror_region: str = 'us-east-1'
+    wait_for_assets: int = 0  # Seconds to wait for assets still being uploaded (see `AssetWatcher`), 0 does not wait
+    resume: bool = False  # Journal each completed phase in `work_dir` so a re-run resumes a failed publish
+    backfill_releases: int = 0  # Publish versioned formulas of this many past releases instead of one release
+    skip_commit: bool = False
+    debug: bool = False
+
+    @staticmethod
+    def from_env() -> 'Config':
+        """Builds the config of the current GitHub Action run from its environment variables."""
+        return Config(
+            github_owner=GITHUB_OWNER,
+            github_repo=GITHUB_REPO,
+            homebrew_owner=HOMEBREW_OWNER,
+            homebrew_tap=HOMEBREW_TAP,
+            github_token=GITHUB_TOKEN,
+            formula_folder=FORMULA_FOLDER,
+            commit_owner=COMMIT_OWNER,
+            commit_email=COMMIT_EMAIL,
+            install=INSTALL,
+            test=TEST,
+            depends_on=DEPENDS_ON,
+            caveats=CAVEATS,
+            download_strategy=DOWNLOAD_STRATEGY,
+            custom_require=CUSTOM_REQUIRE,
+            formula_includes=FORMULA_INCLUDES,
+            version=VERSION,
+            target=TARGET,
+            targets=dict(TARGET_MATRIX),
+            bottles=BOTTLES.replace(',', ' ').split(),
+            bottle_cellar=BOTTLE_CELLAR,
+            resources=Config.parse_json_object(RESOURCES, 'resources'),
+            update_readme_table=bool(UPDATE_README_TABLE),
+            readme_full_rebuild=bool(README_FULL_REBUILD),
+            readme_table_layout=README_TABLE_LAYOUT,
+            readme_parse_processes=bool(README_PARSE_PROCESSES),
+            update_tap_index=bool(UPDATE_TAP_INDEX),
+            patch_formula=bool(PATCH_FORMULA),
+            sharded_formula_folder=bool(SHARDED_FORMULA_FOLDER),
+            sparse_checkout=bool(SPARSE_CHECKOUT),
+            formulas=Config.parse_json_list(FORMULAS, 'formulas'),
+            additional_taps=Config.parse_json_list(ADDITIONAL_TAPS, 'additional_taps'),
+            checksum_fragments=CHECKSUM_FRAGMENTS,
+            checksum_cache_url=CHECKSUM_CACHE_URL,
+            checksum_cache_read_only=bool(CHECKSUM_CACHE_READ_ONLY),
+            mirror_url=MIRROR_URL,
+            mirror_public_url=MIRROR_PUBLIC_URL,
+            mirror_region=MIRROR_REGION,
+            wait_for_assets=WAIT_FOR_ASSETS,
+            resume=bool(RESUME),
+            backfill_releases=BACKFILL_RELEASES,
+            skip_commit=bool(SKIP_COMMIT),
+            debug=bool(DEBUG),
+        )
+
+    @staticmethod
+    def parse_json_list(value: str, input_name: str) -> List[Dict[str, Any]]:
+        """Parses an input holding a JSON list of objects (eg: `additional_taps`), each overriding some options."""
+        if not value:
+            return []
+        try:
+            items = json.loads(value)
+        except ValueError as error:
+            raise SystemExit(f'The "{input_name}" must be a JSON list: {error}')
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise SystemExit(f'The "{input_name}" must be a JSON list of objects.')
+
+        return items
+
+    @staticmethod
+    def parse_json_object(value: str, input_name: str) -> Dict[str, str]:
+        """Parses an input holding a JSON object of strings (eg: `resources`)."""
+        if not value:
+            return {}
+        try:
+            items = json.loads(value)
+        except ValueError as error:
+            raise SystemExit(f'The "{input_name}" must be a JSON object: {error}')
+        if not isinstance(items, dict) or not all(isinstance(item, str) and item for item in items.values()):
+            raise SystemExit(f'The "{input_name}" must be a JSON object of strings.')
+
+        return items
+
+    @staticmethod
+    def from_batch_file(batch_file: str) -> List['Config']:
+        """Builds one config per repository listed in a JSON batch file, eg:
+
+        {
+            "homebrew_owner": "m-dzianishchyts",
+            "homebrew_tap": "homebrew-formulas",
+            "repositories": [
+                {"github_owner": "m-dzianishchyts", "github_repo": "foo", "version": "v1.0.0", "install": "..."}
+            ]
+        }
+
+        Every key besides `repositories` is a default for each repository, keys are the fields of `Config`.
+        The token falls back to the `GITHUB_TOKEN` environment variable and each repository gets its own
+        `work_dir` (a subfolder named after it) so their assets and `checksum.txt` do not collide.
+        """
+        try:
+            with open(batch_file, 'r') as file:
+                batch = json.load(file)
+        except (OSError, ValueError) as error:
+            raise SystemExit(f'Could not read the batch file {batch_file}: {error}')
+
+        defaults = {key: value for key, value in batch.items() if key != 'repositories'}
+        defaults.setdefault('github_token', os.getenv('GITHUB_TOKEN') or GITHUB_TOKEN)
+        config_fields = {config_field.name for config_field in fields(Config)}
+
+        configs = []
+        for repository in batch.get('repositories', []):
+            options = {**defaults, **repository}
+            unknown_options = sorted(options.keys() - config_fields)
+            if unknown_options:
+                raise SystemExit(f'Unknown options in the batch file {batch_file}: {", ".join(unknown_options)}.')
+            if 'github_repo' in options and 'work_dir' not in repository:
+                options['work_dir'] = os.path.join(defaults.get('work_dir') or '', options['github_repo'])
+            try:
+                configs.append(Config(**options))
+            except TypeError as error:
+                raise SystemExit(f'Invalid repository in the batch file {batch_file}: {error}')
+
+        return configs
@@ -1,5 +1,7 @@
 import os
 
+from brewtap.targets import TARGETS
+
 
 # Helper function to translate given INPUT_TARGET_* string from GitHub Actions into
 # appropriate bool or string value.
@@ -34,20 +36,74 @@ UPDATE_README_TABLE = (
 SKIP_COMMIT = (
     os.getenv('INPUT_SKIP_COMMIT', False) if os.getenv('INPUT_SKIP_COMMIT') != 'false' else False
 )  # Must check for string `false` since GitHub Actions passes the bool as a string
+README_FULL_REBUILD = (
+    os.getenv('INPUT_README_FULL_REBUILD', False) if os.getenv('INPUT_README_FULL_REBUILD') != 'false' else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+README_TABLE_LAYOUT = os.getenv('INPUT_README_TABLE_LAYOUT') or 'single'
+README_PARSE_PROCESSES = (
+    os.getenv('INPUT_README_PARSE_PROCESSES', False) if os.getenv('INPUT_README_PARSE_PROCESSES') != 'false' else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+README_TABLE_LAYOUTS = ('single', 'shards', 'pages')
+UPDATE_TAP_INDEX = (
+    os.getenv('INPUT_UPDATE_TAP_INDEX', False) if os.getenv('INPUT_UPDATE_TAP_INDEX') != 'false' else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+PATCH_FORMULA = (
+    os.getenv('INPUT_PATCH_FORMULA', False) if os.getenv('INPUT_PATCH_FORMULA') != 'false' else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+SHARDED_FORMULA_FOLDER = (
+    os.getenv('INPUT_SHARDED_FORMULA_FOLDER', False) if os.getenv('INPUT_SHARDED_FORMULA_FOLDER') != 'false' else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+SPARSE_CHECKOUT = (
+    os.getenv('INPUT_SPARSE_CHECKOUT', False) if os.getenv('INPUT_SPARSE_CHECKOUT') != 'false' else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+RESUME = (
+    os.getenv('INPUT_RESUME', False) if os.getenv('INPUT_RESUME') != 'false' else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+CHECKSUM_FRAGMENTS = os.getenv('INPUT_CHECKSUM_FRAGMENTS')  # Glob of the fragments written by `brewtap hash`
+CHECKSUM_CACHE_URL = os.getenv('INPUT_CHECKSUM_CACHE_URL')  # A checksum cache server shared by runners
+CHECKSUM_CACHE_READ_ONLY = (
+    os.getenv('INPUT_CHECKSUM_CACHE_READ_ONLY', False)
+    if os.getenv('INPUT_CHECKSUM_CACHE_READ_ONLY') != 'false'
+    else False
+)  # Must check for string `false` since GitHub Actions passes the bool as a string
+BOTTLES = os.getenv('INPUT_BOTTLES') or ''  # Whitespace or comma separated bottle tags, eg: `arm64_sonoma x86_64_linux`
+BOTTLE_CELLAR = os.getenv('INPUT_BOTTLE_CELLAR') or ':any_skip_relocation'
+MIRROR_URL = os.getenv('INPUT_MIRROR_URL')  # An S3-compatible bucket (`<endpoint>/<bucket>`) archives are copied to
+MIRROR_PUBLIC_URL = os.getenv(
+    'INPUT_MIRROR_PUBLIC_URL'
+)  # Where users download the mirrored archives from, if not there
+MIRROR_REGION = os.getenv('INPUT_MIRROR_REGION') or 'us-east-1'
+WAIT_FOR_ASSETS = int(os.getenv('INPUT_WAIT_FOR_ASSETS') or 0)  # Seconds to wait for assets still being uploaded
+BACKFILL_RELEASES = int(os.getenv('INPUT_BACKFILL_RELEASES') or 0)
+FORMULAS = os.getenv('INPUT_FORMULAS') or ''  # JSON list of the formulas of the release and their options
+RESOURCES = os.getenv('INPUT_RESOURCES') or ''  # JSON object of resource names to release asset names or URLs
+ADDITIONAL_TAPS = os.getenv('INPUT_ADDITIONAL_TAPS') or ''  # JSON list of per-tap option overrides
 DEBUG = (
     os.getenv('INPUT_DEBUG', False) if os.getenv('INPUT_DEBUG') != 'false' else False
 )  # Must check for string `false` since GitHub Actions passes the bool as a string
 
 # App Constants
-GITHUB_BASE_URL = 'https://api.github.com'
+# GitHub Actions points these to the GitHub instance running the workflow, they can also point to a local stand-in
+GITHUB_BASE_URL = os.getenv('GITHUB_API_URL') or 'https://api.github.com'
+GITHUB_SERVER_URL = os.getenv('GITHUB_SERVER_URL') or 'https://github.com'
 LOGGER_NAME = 'brewtap'
 TIMEOUT = 30
+TASK_TIMEOUT = 300  # Upper bound for a single download, hash or upload task of the async engine
+RELEASES_PAGE_SIZE = 100  # The most releases GitHub lists per request
+HTTP_POOL_SIZE = 32  # Connections kept open per host, matches the largest default thread pool of asyncio
 GITHUB_HEADERS = {
     'Accept': 'application/vnd.github.v3+json',
     'Agent': 'Brewtap',
     'Authorization': f'Bearer {GITHUB_TOKEN}',
 }
 CHECKSUM_FILE = 'checksum.txt'
+FRAGMENT_SECRET = os.getenv('BREWTAP_FRAGMENT_SECRET')  # Signs and verifies checksum fragments when set
+CHECKSUM_CACHE_TOKEN = os.getenv('BREWTAP_CACHE_TOKEN')  # Sent to the checksum cache server, which may require it
+JOURNAL_FILE = '.brewtap-journal.json'
+# The credentials of the mirror bucket, named like the AWS tools do
+MIRROR_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY_ID')
+MIRROR_SECRET_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+MIRROR_SESSION_TOKEN = os.getenv('AWS_SESSION_TOKEN')
 
 # GitHub Action env variables set by GitHub
 GITHUB_REPOSITORY = os.getenv('GITHUB_REPOSITORY', 'user/repo').split('/')
@@ -56,7 +112,6 @@ GITHUB_REPO = GITHUB_REPOSITORY[1]
 
 # Matrix targets to add URL/checksum targets for
 TARGET = translate_target(os.getenv('INPUT_TARGET', False))
-TARGET_DARWIN_AMD64 = translate_target(os.getenv('INPUT_TARGET_DARWIN_AMD64', False))
-TARGET_DARWIN_ARM64 = translate_target(os.getenv('INPUT_TARGET_DARWIN_ARM64', False))
-TARGET_LINUX_AMD64 = translate_target(os.getenv('INPUT_TARGET_LINUX_AMD64', False))
-TARGET_LINUX_ARM64 = translate_target(os.getenv('INPUT_TARGET_LINUX_ARM64', False))
+TARGET_MATRIX = {
+    target.name: translate_target(os.getenv(f'INPUT_TARGET_{target.name.upper()}', False)) for target in TARGETS
+}
@@ -4,119 +4,29 @@ from typing import (
     Dict,
     List,
     Optional,
+    Tuple,
 )
 
 import chevron  # type: ignore
+import chevron.tokenizer  # type: ignore
 import woodchips
 
-from brewtap.constants import (
-    LOGGER_NAME,
-    TARGET_DARWIN_AMD64,
-    TARGET_DARWIN_ARM64,
-    TARGET_LINUX_AMD64,
-    TARGET_LINUX_ARM64,
+from brewtap.checksum import ArchiveChecksum
+from brewtap.constants import LOGGER_NAME
+from brewtap.formula_parser import FormulaParser
+from brewtap.targets import (
+    BOTTLE_PREFIX,
+    RESOURCE_PREFIX,
+    TARGETS,
+    bottle_tag_order,
 )
 
 
-class Formula:
-    @staticmethod
-    def generate_formula_data(
-        owner: str,
-        repo_name: str,
-        repository: Dict[str, Any],
-        checksums: List[Dict[str, str]],
-        install: str,
-        tar_url: str,
-        depends_on: Optional[str] = None,
-        test: Optional[str] = None,
-        caveats: Optional[str] = None,
-        download_strategy: Optional[str] = None,
-        custom_require: Optional[str] = None,
-        formula_includes: Optional[str] = None,
-        version: Optional[str] = None,
-    ) -> str:
-        """Generates the formula data for Homebrew.
-
-        We attempt to ensure generated formula will pass `brew audit --strict --online` if given correct inputs:
-        - Proper class name
-        - 80 characters or less desc field (alphanumeric characters and does not start with
-            an article or the name of the formula)
-        - Homepage
-        - URL points to the tar file
-        - Checksum matches the url archive
-        - Proper installable binary
-        - Test is included
-        - No version attribute if Homebrew can reliably infer the version from the tar URL (GitHub tag)
-        - Enable typing
-        - Enable frozen_string_literal
-        """
-        logger = woodchips.get(LOGGER_NAME)
-
-        max_desc_field_length = 80  # `brew audit` wants no more than 80 characters in the desc field
-
-        class_name = re.sub(r'[-_. ]+', '', repo_name.title())
-        license_type = repository['license'].get('spdx_id', '') if repository.get('license') else ''
-        description = (
-            re.sub(r'[.!]+', '', repository.get('description', '')[:max_desc_field_length]).strip().capitalize()
-        )
-
-        # If the first word of the desc is an article or the name of the formula, we cut it out per `brew audit`
-        articles = {
-            'a',
-            'an',
-            'the',
-        }
-        if description:
-            first_word_of_desc = description.split(' ', 1)
-            if first_word_of_desc[0].lower() in articles or first_word_of_desc[0].lower() == class_name.lower():
-                description = first_word_of_desc[1].strip().capitalize()
-        else:
-            description = 'NA'
-
-        dependencies = Formula.parse_multiline_to_items(depends_on, strip_line=True, sort=True)
-
-        darwin_amd64_url = None
-        darwin_amd64_checksum = None
-        darwin_arm64_url = None
-        darwin_arm64_checksum = None
-        linux_amd64_url = None
-        linux_amd64_checksum = None
-        linux_arm64_url = None
-        linux_arm64_checksum = None
-        for index, checksum in enumerate(checksums):
-            checksum_filename = next(iter(checksum))
-            checksum_url = checksum[checksum_filename]['url']  # type: ignore
-            checksum_type = checksum[checksum_filename]['type']  # type: ignore
-
-            # Autogenerated tar URL is the first one
-            if checksum_type == 'default':
-                autogenerated_tar_checksum = checksum[checksum_filename]['checksum']  # type: ignore
-
-            if checksum_type == 'darwin_amd64' and TARGET_DARWIN_AMD64:
-                darwin_amd64_url = checksum_url
-                darwin_amd64_checksum = checksum[checksum_filename]['checksum']  # type: ignore
-            elif checksum_type == 'darwin_arm64' and TARGET_DARWIN_ARM64:
-                darwin_arm64_url = checksum_url
-                darwin_arm64_checksum = checksum[checksum_filename]['checksum']  # type: ignore
-            elif checksum_type == 'linux_amd64' and TARGET_LINUX_AMD64:
-                linux_amd64_url = checksum_url
-                linux_amd64_checksum = checksum[checksum_filename]['checksum']  # type: ignore
-            elif checksum_type == 'linux_arm64' and TARGET_LINUX_ARM64:
-                linux_arm64_url = checksum_url
-                linux_arm64_checksum = checksum[checksum_filename]['checksum']  # type: ignore
-
-        # We set these so we can properly space items only if both are present
-        darwin_amd_and_arm = darwin_amd64_url and darwin_arm64_url
-        linux_amd_and_arm = linux_amd64_url and linux_arm64_url
-
-        install_block = Formula.parse_multiline_to_items(install)
-        test_block = Formula.parse_multiline_to_items(test)
-        caveats_block = Formula.parse_multiline_to_items(caveats)
-
-        # Ruby template data MUST remain double spaced to conform to `brew audit`.
-        # You may notice some template checks have a line break after the opening tag, this is to ensure
-        # we only add that line break when that section is present.
-        template = """# typed: true
+# Ruby template data MUST remain double spaced to conform to `brew audit`.
+# You may notice some template checks have a line break after the opening tag, this is to ensure
+# we only add that line break when that section is present. The `*_separator` sections add the blank
+# line in front of a block only when something other than the header precedes it.
+FORMULA_TEMPLATE = """# typed: true
 # frozen_string_literal: true
 {{# custom_require}}
 
@@ -132,6 +42,9 @@ class {{class_name}} < Formula
   desc "{{description}}"
   homepage "https://github.com/{{owner}}/{{repo_name}}"
   url "{{tar_url}}"{{# download_strategy}}, using: {{download_strategy}}{{/ download_strategy}}
+  {{# tar_mirror}}
+  mirror "{{tar_mirror}}"
+  {{/ tar_mirror}}
   {{# version}}
   version "{{version}}"
   {{/ version}}
@@ -140,50 +53,65 @@ class {{class_name}} < Formula
   license "{{license_type}}"
   {{/ license_type}}
 
+  {{# bottle}}
+  bottle do
+    root_url "{{root_url}}"
+    {{# items}}
+    sha256 cellar: {{{cellar}}}, {{{tag}}}"{{checksum}}"
+    {{/ items}}
+  end
+
+  {{/ bottle}}
+  {{# keg_only}}
+  keg_only {{{keg_only}}}
+
+  {{/ keg_only}}
   {{# dependencies.items}}
   depends_on {{{item}}}
   {{/ dependencies.items}}
-  {{# darwin}}
-
-  on_macos do
-    {{# darwin_amd64_url}}
-    on_intel do
-      url "{{darwin_amd64_url}}"{{# download_strategy}}, using: {{download_strategy}}{{/ download_strategy}}
-      sha256 "{{darwin_amd64_checksum}}"
-    end
-    {{/ darwin_amd64_url}}
-    {{# darwin_amd_and_arm}}
-
-    {{/ darwin_amd_and_arm}}
-    {{# darwin_arm64_url}}
-    on_arm do
-      url "{{darwin_arm64_url}}"{{# download_strategy}}, using: {{download_strategy}}{{/ download_strategy}}
-      sha256 "{{darwin_arm64_checksum}}"
+  {{# platforms}}
+  {{# separator}}
+
+  {{/ separator}}
+  {{block}} do
+    {{# targets}}
+    {{# separator}}
+
+    {{/ separator}}
+    {{# block}}
+    {{block}} do
+      url "{{url}}"{{# download_strategy}}, using: {{download_strategy}}{{/ download_strategy}}
+      {{# mirror}}
+      mirror "{{mirror}}"
+      {{/ mirror}}
+      sha256 "{{checksum}}"
     end
-    {{/ darwin_arm64_url}}
+    {{/ block}}
+    {{^ block}}
+    url "{{url}}"{{# download_strategy}}, using: {{download_strategy}}{{/ download_strategy}}
+    {{# mirror}}
+    mirror "{{mirror}}"
+    {{/ mirror}}
+    sha256 "{{checksum}}"
+    {{/ block}}
+    {{/ targets}}
   end
-  {{/ darwin}}
-  {{# linux}}
-
-  on_linux do
-    {{# linux_amd64_url}}
-    on_intel do
-      url "{{linux_amd64_url}}"{{# download_strategy}}, using: {{download_strategy}}{{/ download_strategy}}
-      sha256 "{{linux_amd64_checksum}}"
-    end
-    {{/ linux_amd64_url}}
-    {{# linux_amd_and_arm}}
-
-    {{/ linux_amd_and_arm}}
-    {{# linux_arm64_url}}
-    on_arm do
-      url "{{linux_arm64_url}}"{{# download_strategy}}, using: {{download_strategy}}{{/ download_strategy}}
-      sha256 "{{linux_arm64_checksum}}"
-    end
-    {{/ linux_arm64_url}}
+  {{/ platforms}}
+  {{# resources}}
+  {{# separator}}
+
+  {{/ separator}}
+  resource "{{name}}" do
+    url "{{url}}"
+    {{# mirror}}
+    mirror "{{mirror}}"
+    {{/ mirror}}
+    sha256 "{{checksum}}"
   end
-  {{/ linux}}
+  {{/ resources}}
+  {{# install_separator}}
 
+  {{/ install_separator}}
   {{# install}}
   def install
   {{# items}}
@@ -227,18 +155,111 @@ class {{class_name}} < Formula
 end
 """
 
-        target_darwin = True if TARGET_DARWIN_AMD64 or TARGET_DARWIN_ARM64 else False
-        target_linux = True if TARGET_LINUX_AMD64 or TARGET_LINUX_ARM64 else False
+# Tokenizing is the bulk of a `chevron.render` call, so the template is tokenized once at import.
+# `chevron.render` renders a sequence of tokens as is instead of parsing a template string again.
+FORMULA_TEMPLATE_TOKENS = tuple(chevron.tokenizer.tokenize(FORMULA_TEMPLATE))
+
+# The `on_*` blocks (outermost first) wrapping the `url`/`sha256` stanzas of each checksum target
+PLATFORM_BLOCKS = {(): 'default', **{target.blocks: target.name for target in TARGETS}}
+PATCHED_STANZAS = ('url', 'mirror', 'sha256', 'version')
+
+
+class Formula:
+    @staticmethod
+    def generate_formula_data(
+        owner: str,
+        repo_name: str,
+        repository: Dict[str, Any],
+        checksums: List[ArchiveChecksum],
+        install: str,
+        tar_url: str,
+        depends_on: Optional[str] = None,
+        test: Optional[str] = None,
+        caveats: Optional[str] = None,
+        download_strategy: Optional[str] = None,
+        custom_require: Optional[str] = None,
+        formula_includes: Optional[str] = None,
+        version: Optional[str] = None,
+        formula_name: Optional[str] = None,
+        keg_only: Optional[str] = None,
+        bottle_cellar: str = ':any_skip_relocation',
+    ) -> str:
+        """Generates the formula data for Homebrew, named after `formula_name` if given, else the repository.
+
+        We attempt to ensure generated formula will pass `brew audit --strict --online` if given correct inputs:
+        - Proper class name
+        - 80 characters or less desc field (alphanumeric characters and does not start with
+            an article or the name of the formula)
+        - Homepage
+        - URL points to the tar file
+        - Checksum matches the url archive
+        - Proper installable binary
+        - Test is included
+        - No version attribute if Homebrew can reliably infer the version from the tar URL (GitHub tag)
+        - Enable typing
+        - Enable frozen_string_literal
+        - Bottles (if any) sorted and aligned the way `brew style` wants them
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        max_desc_field_length = 80  # `brew audit` wants no more than 80 characters in the desc field
+
+        class_name = re.sub(r'[-_. ]+', '', (formula_name or repo_name).title())
+        # Like Homebrew, versioned formulas spell out the `@`, eg: `foo@1.2` -> `FooAT12`
+        class_name = re.sub(r'(.)@(\d)', r'\1AT\2', class_name)
+        license_type = repository['license'].get('spdx_id', '') if repository.get('license') else ''
+        description = (
+            re.sub(r'[.!]+', '', repository.get('description', '')[:max_desc_field_length]).strip().capitalize()
+        )
+
+        # If the first word of the desc is an article or the name of the formula, we cut it out per `brew audit`
+        articles = {
+            'a',
+            'an',
+            'the',
+        }
+        if description:
+            first_word_of_desc = description.split(' ', 1)
+            if first_word_of_desc[0].lower() in articles or first_word_of_desc[0].lower() == class_name.lower():
+                description = first_word_of_desc[1].strip().capitalize()
+        else:
+            description = 'NA'
+
+        dependencies = Formula.parse_multiline_to_items(depends_on, strip_line=True, sort=True)
+
+        # Autogenerated tar URL is the first one
+        autogenerated_tar = next(checksum for checksum in checksums if checksum.target == 'default')
+        platforms = Formula.group_target_checksums(checksums)
+        for index, platform in enumerate(platforms):
+            # We only add a blank line in front of a platform block when something other than the header precedes it
+            platform['separator'] = bool(dependencies or index)
+        resources = [
+            {
+                'name': checksum.target.removeprefix(RESOURCE_PREFIX),
+                'url': checksum.url,
+                'mirror': checksum.mirror,
+                'checksum': checksum.checksum,
+                'separator': bool(dependencies or platforms or index),
+            }
+            for index, checksum in enumerate(
+                checksum for checksum in checksums if checksum.target.startswith(RESOURCE_PREFIX)
+            )
+        ]
+
+        install_block = Formula.parse_multiline_to_items(install)
+        test_block = Formula.parse_multiline_to_items(test)
+        caveats_block = Formula.parse_multiline_to_items(caveats)
 
         template_data = {
-            'template': template,
+            'template': FORMULA_TEMPLATE_TOKENS,
             'data': {
                 'class_name': class_name,
                 'description': description,
                 'owner': owner,
                 'repo_name': repo_name,
                 'tar_url': tar_url,
-                'autogenerated_tar_checksum': autogenerated_tar_checksum,
+                'tar_mirror': autogenerated_tar.mirror,
+                'autogenerated_tar_checksum': autogenerated_tar.checksum,
                 'license_type': license_type,
                 'dependencies': dependencies,
                 'install': install_block,
@@ -248,35 +269,136 @@ end
                 'custom_require': custom_require,
                 'formula_includes': formula_includes.strip() if formula_includes else None,
                 'version': version,
-                'darwin_amd64_url': darwin_amd64_url,
-                'darwin_amd64_checksum': darwin_amd64_checksum,
-                'darwin_arm64_url': darwin_arm64_url,
-                'darwin_arm64_checksum': darwin_arm64_checksum,
-                'linux_amd64_url': linux_amd64_url,
-                'linux_amd64_checksum': linux_amd64_checksum,
-                'linux_arm64_url': linux_arm64_url,
-                'linux_arm64_checksum': linux_arm64_checksum,
-                'darwin_amd_and_arm': darwin_amd_and_arm,
-                'linux_amd_and_arm': linux_amd_and_arm,
-                'darwin': target_darwin,
-                'linux': target_linux,
+                'keg_only': keg_only,
+                'bottle': Formula.bottle_block(checksums, bottle_cellar),
+                'platforms': platforms,
+                'resources': resources,
+                'install_separator': bool(dependencies or platforms or resources),
             },
         }
 
-        # TODO: We replace the multiple newlines here for shortcomings in the chevron template above so that
-        # `brew audit` passes correctly.
-        rendered_template = (
-            chevron.render(**template_data)
-            .replace('\n\n\n  def install', '\n\n  def install')
-            .replace('\n\n\n  on_macos', '\n\n  on_macos')
-            .replace('\n\n\n  on_linux', '\n\n  on_linux')
-        )
+        rendered_template = chevron.render(**template_data)
 
         logger.info('Homebrew formula generated successfully!')
         logger.debug(rendered_template)
 
         return rendered_template
 
+    @staticmethod
+    def group_target_checksums(checksums: List[ArchiveChecksum]) -> List[Dict[str, Any]]:
+        """Groups the checksums of the targets by their OS block for the template.
+
+        Only the targets the caller resolved a checksum for end up in the formula, in the order of `TARGETS`.
+        """
+        target_checksums = {checksum.target: checksum for checksum in checksums}
+        platforms: Dict[str, Dict[str, Any]] = {}
+        for target in TARGETS:
+            checksum = target_checksums.get(target.name)
+            if checksum is None:
+                continue
+            platform = platforms.setdefault(target.os_block, {'block': target.os_block, 'targets': []})
+            platform['targets'].append(
+                {
+                    'block': target.arch_block,
+                    'url': checksum.url,
+                    'mirror': checksum.mirror,
+                    'checksum': checksum.checksum,
+                    # We set this so we can properly space targets only if several share a platform
+                    'separator': bool(platform['targets']),
+                }
+            )
+
+        return list(platforms.values())
+
+    @staticmethod
+    def bottle_block(checksums: List[ArchiveChecksum], cellar: str) -> Optional[Dict[str, Any]]:
+        """The `bottle` block of the bottle checksums for the template, `None` without bottles.
+
+        Bottles share the release download folder as their `root_url`, their digests are aligned.
+        """
+        bottles = sorted(
+            (checksum for checksum in checksums if checksum.target.startswith(BOTTLE_PREFIX)),
+            key=lambda checksum: bottle_tag_order(checksum.target.removeprefix(BOTTLE_PREFIX)),
+        )
+        if not bottles:
+            return None
+        tags = [f'{bottle.target.removeprefix(BOTTLE_PREFIX)}:' for bottle in bottles]
+        tag_width = max(len(tag) for tag in tags) + 1
+
+        return {
+            'root_url': bottles[0].url.rsplit('/', 1)[0],
+            'items': [
+                {
+                    'cellar': cellar if cellar.startswith(':') else f'"{cellar}"',
+                    'tag': tag.ljust(tag_width),
+                    'checksum': bottle.checksum,
+                }
+                for tag, bottle in zip(tags, bottles)
+            ],
+        }
+
+    @staticmethod
+    def patch_formula_data(
+        formula: str,
+        checksums: List[ArchiveChecksum],
+        tar_url: str,
+        version: Optional[str] = None,
+    ) -> Optional[str]:
+        """Patches the `url`, `mirror`, `sha256` and `version` stanzas of an existing formula in place.
+
+        Only the values inside the quotes change, everything else (including hand tuning) is kept as is,
+        so the resulting diff is minimal. Stanzas are matched at the top level of the formula class and
+        inside the `on_macos`/`on_linux` + `on_intel`/`on_arm` blocks, anything nested in other blocks
+        (eg: `resource`) is left alone.
+
+        Returns `None` when the formula's structure does not match what a full render would produce
+        (eg: a target was added or removed, or `version` was added or dropped) so the caller can fall
+        back to `Formula.generate_formula_data`. Formulas with bottles or resources are always rendered, since their
+        `bottle` and `resource` blocks are not patched.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        if any(checksum.target.startswith((BOTTLE_PREFIX, RESOURCE_PREFIX)) for checksum in checksums):
+            return None
+
+        new_values = {}
+        for checksum in checksums:
+            checksum_url = tar_url if checksum.target == 'default' else checksum.url
+            new_values[checksum.target] = {'url': checksum_url, 'sha256': checksum.checksum}
+            if checksum.mirror:
+                new_values[checksum.target]['mirror'] = checksum.mirror
+        if version:
+            new_values.setdefault('default', {})['version'] = version
+
+        lines = formula.splitlines(keepends=True)
+        stanzas: Dict[str, Dict[str, Tuple[int, re.Match]]] = {}
+        for index, blocks, stanza in FormulaParser.iter_stanzas(lines):
+            if stanza.group('name') not in PATCHED_STANZAS:
+                continue
+            stanza_type = PLATFORM_BLOCKS.get(blocks)
+            if stanza_type is None:
+                return None
+            block_stanzas = stanzas.setdefault(stanza_type, {})
+            if stanza.group('name') in block_stanzas:
+                return None
+            block_stanzas[stanza.group('name')] = (index, stanza)
+
+        if stanzas.keys() != new_values.keys() or any(
+            stanzas[checksum_type].keys() != values.keys() for checksum_type, values in new_values.items()
+        ):
+            return None
+
+        for checksum_type, values in new_values.items():
+            for name, value in values.items():
+                index, stanza = stanzas[checksum_type][name]
+                lines[index] = f'{stanza.string[:stanza.start("value")]}{value}{stanza.string[stanza.end("value"):]}'
+
+        patched_formula = ''.join(lines)
+        logger.info('Homebrew formula patched successfully!')
+        logger.debug(patched_formula)
+
+        return patched_formula
+
     @staticmethod
     def parse_multiline_to_items(input_str: Optional[str], strip_line: bool = False, sort: bool = False):
         if not input_str:
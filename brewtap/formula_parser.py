@@ -0,0 +1,246 @@
+import multiprocessing
+import os
+import re
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import (
+    dataclass,
+    field,
+    replace,
+)
+from itertools import repeat
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+CLASS_PATTERN = re.compile(r'^\s*(?P<name>class)\s+(?P<value>\w+)\s*<\s*Formula\b')
+STANZA_PATTERN = re.compile(
+    r'^\s*(?P<name>desc|homepage|url|mirror|sha256|version|license)\s+"(?P<value>(?:[^"\\]|\\.)*)"'
+)
+PLATFORM_BLOCK_PATTERN = re.compile(r'^\s*(?P<name>on_\w+(\s+:\w+)?)\s+do\s*$')
+BLOCK_START_PATTERN = re.compile(r'^\s*(class|module|def|if|unless|case|begin|while|until)\b|\bdo(\s*\|[^|]*\|)?\s*$')
+HEREDOC_PATTERN = re.compile(r'<<[~-]?([\'"]?)(?P<tag>\w+)\1')
+VERSIONED_CLASS_PATTERN = re.compile(r'^(?P<name>\w+?)AT(?P<version>\d+)$')
+
+# What the README table needs, a summary parse stops reading a formula once it found all of them
+SUMMARY_STANZAS = {'class', 'desc', 'homepage'}
+
+# Parsed formulas keyed by their absolute path, along with the `(mtime, size)` of the file they were parsed from
+# and whether the whole file was parsed (as opposed to a summary)
+_PARSE_CACHE: Dict[str, Tuple[Tuple[int, int], 'FormulaRecord', bool]] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class FormulaRecord:
+    """The metadata of an existing formula.
+
+    `url`, `sha256` and `version` are the top-level stanzas of the formula class, `platforms` holds the
+    `url`/`sha256` stanzas found in the `on_*` blocks keyed by those blocks (outermost first),
+    eg: `('on_macos', 'on_arm')`.
+    """
+
+    class_name: str = ''
+    desc: str = ''
+    homepage: str = ''
+    url: Optional[str] = None
+    sha256: Optional[str] = None
+    version: Optional[str] = None
+    license: Optional[str] = None
+    platforms: Dict[Tuple[str, ...], Dict[str, str]] = field(default_factory=dict)
+    file_name: str = ''  # The name of the file the formula was parsed from (without `.rb`), if any
+
+    @property
+    def name(self) -> str:
+        """The name users install the formula by, eg: `FooBar` -> `foo-bar`.
+
+        The class of a versioned formula drops the dots of its version (eg: `FooAT12` for `foo@1.2`), so its
+        file name is used when known.
+        """
+        versioned_class = VERSIONED_CLASS_PATTERN.match(self.class_name)
+        if versioned_class and self.file_name:
+            return self.file_name
+        if versioned_class:
+            return self._class_to_name(versioned_class.group('name')) + '@' + versioned_class.group('version')
+
+        return self._class_to_name(self.class_name)
+
+    @staticmethod
+    def _class_to_name(class_name: str) -> str:
+        return '-'.join(re.findall('[A-Z][^A-Z]*', class_name)).lower()
+
+
+class FormulaParser:
+    @staticmethod
+    def parse(formula: str | Iterable[str], summary_only: bool = False) -> FormulaRecord:
+        """Parses the metadata of a formula out of its Ruby source (either a string or its lines).
+
+        This isn't a Ruby parser: it understands the layout Brewtap generates (and the usual hand edits of it),
+        stanzas set through anything other than a plain string literal are ignored. With `summary_only`, lines
+        stop being consumed as soon as the class name, `desc` and `homepage` are found.
+        """
+        lines = formula.splitlines() if isinstance(formula, str) else formula
+        fields: Dict[str, str] = {}
+        platforms: Dict[Tuple[str, ...], Dict[str, str]] = {}
+
+        for _, blocks, stanza in FormulaParser.iter_stanzas(lines):
+            value = stanza.group('value').replace('\\"', '"')
+            if blocks:
+                platforms.setdefault(blocks, {})[stanza.group('name')] = value
+            elif stanza.group('name') not in fields or not summary_only:
+                # Like Ruby, the last assignment of a stanza wins (in a full parse)
+                fields[stanza.group('name')] = value
+
+            if summary_only and SUMMARY_STANZAS <= fields.keys():
+                break
+
+        return FormulaRecord(
+            class_name=fields.get('class', ''),
+            desc=fields.get('desc', ''),
+            homepage=fields.get('homepage', ''),
+            url=fields.get('url'),
+            sha256=fields.get('sha256'),
+            version=fields.get('version'),
+            license=fields.get('license'),
+            platforms=platforms,
+        )
+
+    @staticmethod
+    def parse_file(formula_path: str, summary_only: bool = False) -> FormulaRecord:
+        """Parses a formula file, reusing the previous result if the file did not change since (same mtime and size).
+
+        A cached full parse also serves summaries, a cached summary is parsed again when the full record is needed.
+        """
+        cache_key, file_version, record = FormulaParser.lookup_cache(formula_path, summary_only)
+        if record is None:
+            record = FormulaParser.read_file(cache_key, summary_only)
+            _PARSE_CACHE[cache_key] = (file_version, record, not summary_only)
+
+        return record
+
+    @staticmethod
+    def parse_folder(formula_folder: str, summary_only: bool = False, processes: bool = False) -> List[FormulaRecord]:
+        """Parses every Ruby formula file of a folder (see `FormulaParser.list_formulas`), in filename order."""
+        return FormulaParser.parse_files(FormulaParser.list_formulas(formula_folder), summary_only, processes)
+
+    @staticmethod
+    def parse_files(
+        formula_paths: List[str], summary_only: bool = False, processes: bool = False
+    ) -> List[FormulaRecord]:
+        """Parses formula files, keeping their order.
+
+        Reading the files dominates (especially on network filesystems), so they are parsed by a pool of threads.
+        With `processes`, the files missing from the cache are parsed by a pool of processes instead, which pays
+        off when parsing itself dominates (eg: thousands of large formulas on a local disk) despite starting the
+        workers and sending the records back.
+        """
+        if not processes:
+            with ThreadPoolExecutor() as executor:
+                return list(executor.map(lambda path: FormulaParser.parse_file(path, summary_only), formula_paths))
+
+        lookups = [FormulaParser.lookup_cache(formula_path, summary_only) for formula_path in formula_paths]
+        missing = [cache_key for cache_key, _, record in lookups if record is None]
+        parsed: Dict[str, FormulaRecord] = {}
+        if missing:
+            workers = os.cpu_count() or 1
+            # Workers are spawned, forking a process running other threads (eg: the event loop's) may deadlock
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                records = executor.map(
+                    FormulaParser.read_file,
+                    missing,
+                    repeat(summary_only),
+                    chunksize=max(1, len(missing) // (workers * 4)),
+                )
+                parsed = dict(zip(missing, records))
+            for cache_key, file_version, record in lookups:
+                if record is None:
+                    _PARSE_CACHE[cache_key] = (file_version, parsed[cache_key], not summary_only)
+
+        return [record or parsed[cache_key] for cache_key, _, record in lookups]
+
+    @staticmethod
+    def lookup_cache(
+        formula_path: str, summary_only: bool = False
+    ) -> Tuple[str, Tuple[int, int], Optional[FormulaRecord]]:
+        """The cache key and `(mtime, size)` of a formula file, along with its cached record if still valid."""
+        cache_key = os.path.abspath(formula_path)
+        stat = os.stat(cache_key)
+        file_version = (stat.st_mtime_ns, stat.st_size)
+
+        cached = _PARSE_CACHE.get(cache_key)
+        if cached and cached[0] == file_version and (cached[2] or summary_only):
+            return cache_key, file_version, cached[1]
+
+        return cache_key, file_version, None
+
+    @staticmethod
+    def read_file(formula_path: str, summary_only: bool = False) -> FormulaRecord:
+        """Parses a formula file, bypassing the cache."""
+        with open(formula_path, 'r') as formula_file:
+            return replace(
+                FormulaParser.parse(formula_file, summary_only),
+                file_name=os.path.splitext(os.path.basename(formula_path))[0],
+            )
+
+    @staticmethod
+    def list_formulas(formula_folder: str) -> List[str]:
+        """Lists the paths of the Ruby formula files of a folder, sorted by filename.
+
+        Like Homebrew, subfolders are included so taps sharding their formulas (eg: `Formula/a/abc.rb`) work too.
+        """
+        formula_paths = [
+            os.path.join(folder, filename)
+            for folder, _, filenames in os.walk(formula_folder)
+            for filename in filenames
+            if filename.endswith('.rb')
+        ]
+
+        return sorted(formula_paths, key=lambda path: (os.path.basename(path), path))
+
+    @staticmethod
+    def clear_cache():
+        """Forgets every parsed formula."""
+        _PARSE_CACHE.clear()
+
+    @staticmethod
+    def iter_stanzas(lines: Iterable[str]) -> Iterator[Tuple[int, Tuple[str, ...], re.Match]]:
+        """Yields the index, enclosing `on_*` blocks and match of every stanza of the formula class.
+
+        The class line itself is yielded first as a `class` stanza holding the class name. Stanzas nested in any
+        other block (eg: `resource`, `def install`), comments and heredocs are skipped.
+        """
+        blocks: List[str] = []
+        heredoc_tag = None
+        for index, line in enumerate(lines):
+            if heredoc_tag:
+                if line.strip() == heredoc_tag:
+                    heredoc_tag = None
+                continue
+            if line.lstrip().startswith('#'):
+                continue
+
+            class_line = CLASS_PATTERN.match(line) if not any(blocks) else None
+            if class_line:
+                yield index, (), class_line
+
+            platform_block = PLATFORM_BLOCK_PATTERN.match(line)
+            stanza = STANZA_PATTERN.match(line)
+            if platform_block:
+                blocks.append(platform_block.group('name'))
+            elif BLOCK_START_PATTERN.search(line):
+                blocks.append('')
+            elif line.strip() == 'end' and blocks:
+                blocks.pop()
+            elif stanza and blocks and blocks[0] == '' and all(blocks[1:]):
+                yield index, tuple(blocks[1:]), stanza
+
+            heredoc = HEREDOC_PATTERN.search(line)
+            if heredoc:
+                heredoc_tag = heredoc.group('tag')
@@ -0,0 +1,84 @@
+import glob
+import hashlib
+import hmac
+import json
+import os
+from dataclasses import (
+    asdict,
+    dataclass,
+    replace,
+)
+from typing import (
+    Dict,
+    Optional,
+)
+
+from brewtap.targets import TARGETS
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ChecksumFragment:
+    """The checksum of one release asset, hashed by the (matrix) job that built it with `brewtap hash`.
+
+    Fragments are merged by `brewtap assemble` (or the `checksum_fragments` input) into `checksum.txt` and the
+    formula instead of downloading and hashing the assets again. With a secret, a fragment is signed with an HMAC
+    so the merging job can tell it was produced by a job holding the same secret.
+    """
+
+    target: str
+    filename: str
+    size: int
+    sha256: str
+    signature: Optional[str] = None
+
+    @staticmethod
+    def from_file(file_path: str, target: str, secret: Optional[str] = None) -> 'ChecksumFragment':
+        """Hashes a local asset into a fragment, signed with `secret` if given."""
+        if target != 'default' and target not in {known_target.name for known_target in TARGETS}:
+            raise SystemExit(f'Unknown target "{target}", it must be "default" or the name of a target.')
+
+        sha256 = hashlib.sha256()
+        try:
+            with open(file_path, 'rb') as file:
+                while chunk := file.read(CHUNK_SIZE):
+                    sha256.update(chunk)
+        except OSError as error:
+            raise SystemExit(f'Could not hash {file_path}: {error}')
+        fragment = ChecksumFragment(target, os.path.basename(file_path), os.path.getsize(file_path), sha256.hexdigest())
+
+        return replace(fragment, signature=fragment.sign(secret)) if secret else fragment
+
+    def sign(self, secret: str) -> str:
+        """The `sha256=<hex digest>` HMAC of every field of the fragment but its signature."""
+        payload = json.dumps({**asdict(self), 'signature': None}, sort_keys=True).encode()
+
+        return 'sha256=' + hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+
+    def to_json(self) -> str:
+        """The fragment as a single line of JSON, eg: for a job output."""
+        return json.dumps(asdict(self), sort_keys=True)
+
+    @staticmethod
+    def load(pattern: str, secret: Optional[str] = None) -> Dict[str, 'ChecksumFragment']:
+        """Reads the fragments of the files matching a glob pattern, keyed by asset filename.
+
+        With a secret, every fragment must carry a valid signature.
+        """
+        fragments = {}
+        for fragment_path in sorted(glob.glob(pattern, recursive=True)):
+            try:
+                with open(fragment_path, 'r') as fragment_file:
+                    fragment = ChecksumFragment(**json.load(fragment_file))
+            except (OSError, ValueError, TypeError) as error:
+                raise SystemExit(f'Invalid checksum fragment {fragment_path}: {error}')
+            if secret and not (fragment.signature and hmac.compare_digest(fragment.sign(secret), fragment.signature)):
+                raise SystemExit(f'The checksum fragment {fragment_path} is not signed with the fragment secret.')
+            fragments[fragment.filename] = fragment
+
+        if not fragments:
+            raise SystemExit(f'No checksum fragment matches {pattern}.')
+
+        return fragments
@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    List,
+    Optional,
+)
+
+
+# Wait times and durations are averaged over the most recent jobs
+STATS_WINDOW = 100
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repository TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    taps TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+'''
+
+
+@dataclass(frozen=True)
+class Job:
+    """A queued publish of the `tag` release of a repository (`owner/repo`) to its taps."""
+
+    id: int
+    repository: str
+    tag: str
+    taps: List[str]
+    enqueued_at: float
+
+
+class JobQueue:
+    """A durable queue of publishes, stored in a SQLite database so queued jobs survive restarts.
+
+    Jobs move from `queued` to `running` to `done` or `failed`. Queuing a release of a repository supersedes its
+    releases still waiting in the queue, so bursts of releases only publish the newest one. A job is only claimed
+    once none of its taps is busy, and every queued job of a free tap is claimed at once so they can be published
+    in a single commit.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.connection.executescript(SCHEMA)
+            # Jobs running when a previous process stopped never finished, run them again
+            self.connection.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+
+    def enqueue(self, repository: str, tag: str, taps: Collection[str]) -> int:
+        """Queues the publish of a release, superseding the queued releases of the same repository."""
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.execute(
+                "UPDATE jobs SET status = 'superseded', finished_at = ? WHERE repository = ? AND status = 'queued'",
+                (time.time(), repository),
+            )
+            cursor = self.connection.execute(
+                'INSERT INTO jobs (repository, tag, taps, enqueued_at) VALUES (?, ?, ?, ?)',
+                (repository, tag, ','.join(sorted(taps)), time.time()),
+            )
+
+            return cursor.lastrowid  # type: ignore
+
+    def claim(self, busy_taps: Collection[str] = ()) -> List[Job]:
+        """Claims the oldest queued job none of whose taps is busy.
+
+        A job publishing to a single tap is claimed along with every other queued single-tap job of that tap.
+        """
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            rows = self.connection.execute(
+                "SELECT id, repository, tag, taps, enqueued_at FROM jobs WHERE status = 'queued' ORDER BY id"
+            ).fetchall()
+            jobs = [Job(row[0], row[1], row[2], row[3].split(','), row[4]) for row in rows]
+            free_jobs = [job for job in jobs if not set(job.taps) & set(busy_taps)]
+            if not free_jobs:
+                return []
+
+            first_job = free_jobs[0]
+            claimed = (
+                [job for job in free_jobs if job.taps == first_job.taps] if len(first_job.taps) == 1 else [first_job]
+            )
+            self.connection.executemany(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                [(time.time(), job.id) for job in claimed],
+            )
+
+            return claimed
+
+    def finish(self, jobs: Collection[Job], error: Optional[str] = None):
+        """Marks claimed jobs as `done`, or `failed` with the error that stopped them."""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                [('failed' if error else 'done', error, time.time(), job.id) for job in jobs],
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """The depth of the queue, the wait of its oldest job, and the average wait and duration of recent jobs
+        (all in seconds).
+        """
+        now = time.time()
+        with self.lock:
+            counts = dict(self.connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            oldest_enqueued_at = self.connection.execute(
+                "SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+            wait_time, duration = self.connection.execute(
+                'SELECT AVG(started_at - enqueued_at), AVG(finished_at - started_at) FROM '
+                "(SELECT * FROM jobs WHERE status IN ('done', 'failed') ORDER BY finished_at DESC LIMIT ?)",
+                (STATS_WINDOW,),
+            ).fetchone()
+
+        return {
+            'depth': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'superseded': counts.get('superseded', 0),
+            'oldest_wait': round(now - oldest_enqueued_at, 3) if oldest_enqueued_at else 0,
+            'wait_time': round(wait_time or 0, 3),
+            'duration': round(duration or 0, 3),
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
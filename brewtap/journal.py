@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+
+import woodchips
+
+from brewtap.config import Config
+from brewtap.constants import (
+    JOURNAL_FILE,
+    LOGGER_NAME,
+)
+from brewtap.utils import Utils
+
+
+# Options that do not change what gets published, a re-run may change them and still resume
+UNFINGERPRINTED_OPTIONS = {'github_token', 'resume', 'wait_for_assets', 'debug'}
+
+
+class RunJournal:
+    """A checkpoint of every completed phase of a publish, kept in `work_dir` so a failed run resumes where it stopped.
+
+    The journal holds a fingerprint of the inputs and the id of the release, then (in order) the checksums of the
+    release and, per tap, the SHA-256 of every rendered formula, the commit and whether it was pushed. A journal whose
+    fingerprint or release do not match the current run is discarded. Without `path` (`resume` disabled) the journal
+    is kept in memory only, so the run always starts from scratch.
+    """
+
+    def __init__(self, path: Optional[str], fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.data: Dict[str, Any] = {'fingerprint': fingerprint}
+
+        if path and os.path.isfile(path):
+            with open(path, 'r') as journal_file:
+                data = json.load(journal_file)
+            if data.get('fingerprint') == fingerprint:
+                self.data = data
+            else:
+                woodchips.get(LOGGER_NAME).info('The inputs changed since the journaled run, starting from scratch.')
+
+    @staticmethod
+    def open(config: Config) -> 'RunJournal':
+        """The journal of the publish of `config`."""
+        path = os.path.join(config.work_dir or '', JOURNAL_FILE) if config.resume else None
+
+        return RunJournal(path, RunJournal.fingerprint_config(config))
+
+    @staticmethod
+    def fingerprint_config(config: Config) -> str:
+        """Hashes every input of a publish that changes what gets published."""
+        inputs = {key: value for key, value in asdict(config).items() if key not in UNFINGERPRINTED_OPTIONS}
+
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the journal is kept on disk (`resume`)."""
+        return self.path is not None
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """The SHA-256 of a (small) file, eg: a rendered formula."""
+        with open(file_path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def start(self, release_id: int):
+        """Records the release of the run, forgetting the phases journaled for another release (eg: re-tagged)."""
+        if self.data.get('release_id') != release_id:
+            self.data = {'fingerprint': self.fingerprint, 'release_id': release_id}
+            self.save()
+
+    def get(self, *keys: str) -> Any:
+        """The journaled value under nested `keys`, if any."""
+        value: Any = self.data
+        for key in keys:
+            value = value.get(key) if isinstance(value, dict) else None
+
+        return value
+
+    def record(self, value: Any, *keys: str):
+        """Journals a completed phase under nested `keys`."""
+        data = self.data
+        for key in keys[:-1]:
+            data = data.setdefault(key, {})
+        data[keys[-1]] = value
+        self.save()
+
+    def save(self):
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            Utils.write_atomically(self.path, json.dumps(self.data, indent=2, sort_keys=True))
+
+    def complete(self):
+        """Deletes the journal of a successful run."""
+        if self.path and os.path.isfile(self.path):
+            os.remove(self.path)
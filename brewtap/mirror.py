@@ -0,0 +1,218 @@
+import hashlib
+import hmac
+import re
+from datetime import (
+    datetime,
+    timezone,
+)
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
+from urllib.parse import (
+    parse_qsl,
+    quote,
+    urlsplit,
+)
+
+import requests
+import woodchips
+
+from brewtap.constants import (
+    LOGGER_NAME,
+    TIMEOUT,
+)
+from brewtap.utils import HTTP_SESSION
+
+
+# Archives larger than a part are uploaded in parts, S3 wants at least 5 MiB per part (but the last)
+PART_SIZE = 16 * 1024 * 1024
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+UPLOAD_ID_PATTERN = re.compile(r'<UploadId>(?P<upload_id>[^<]+)</UploadId>')
+
+
+class AssetMirror:
+    """Copies release archives to an S3-compatible bucket (AWS S3, MinIO, R2...) so formulas list a `mirror` for them.
+
+    Objects are keyed by the SHA-256 of the archive (`<owner>/<repo>/<sha256>/<filename>`), so an archive is uploaded
+    once and an existing object is never overwritten with other content. Archives are streamed from disk, in parts of
+    `PART_SIZE` when larger. Uploads are verified without downloading the object again: the archive is hashed while it
+    is uploaded (the bytes sent must be the ones the formula's `sha256` names), and the `ETag` of the stored object
+    must match the MD5 (or, once uploaded in parts, the MD5 of the part MD5s) of those bytes.
+
+    Requests are signed with AWS Signature Version 4 and address the bucket path-style (`<endpoint>/<bucket>`), which
+    every S3-compatible store supports.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        public_url: Optional[str] = None,
+        region: str = 'us-east-1',
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        session_token: Optional[str] = None,
+    ):
+        self.url = url.rstrip('/')
+        self.public_url = (public_url or url).rstrip('/')
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.session_token = session_token
+
+    @staticmethod
+    def object_key(owner: str, repo: str, checksum: str, filename: str) -> str:
+        return f'{owner}/{repo}/{checksum}/{filename}'
+
+    def object_url(self, key: str, public: bool = False) -> str:
+        return f'{self.public_url if public else self.url}/{quote(key)}'
+
+    def mirrored(self, key: str, checksum: str) -> bool:
+        """Whether the bucket already holds the archive of `key`, as uploaded by a previous publish."""
+        response = self.request('HEAD', self.object_url(key), allow_missing=True)
+
+        return response.status_code == requests.codes.ok and response.headers.get('x-amz-meta-sha256') == checksum
+
+    def mirror_file(self, key: str, file_path: str, checksum: str):
+        """Uploads a local archive under `key` and verifies the stored object."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        sha256 = hashlib.sha256()
+        part_digests: List[bytes] = []
+        object_url = self.object_url(key)
+        metadata = {'x-amz-meta-sha256': checksum}
+        with open(file_path, 'rb') as archive:
+            part = archive.read(PART_SIZE)
+            next_part = archive.read(PART_SIZE)
+            if not next_part:
+                sha256.update(part)
+                part_digests.append(hashlib.md5(part, usedforsecurity=False).digest())
+                AssetMirror.check_checksum(sha256.hexdigest(), checksum, file_path)
+                self.request('PUT', object_url, data=part, headers=metadata)
+                expected_etag = part_digests[0].hex()
+            else:
+                upload = self.request('POST', f'{object_url}?uploads', headers=metadata)
+                upload_id = UPLOAD_ID_PATTERN.search(upload.text)
+                if upload_id is None:
+                    raise SystemExit(f'The mirror did not start the upload of {key}: {upload.text}')
+                try:
+                    etags = []
+                    while part:
+                        sha256.update(part)
+                        part_digests.append(hashlib.md5(part, usedforsecurity=False).digest())
+                        response = self.request(
+                            'PUT',
+                            f'{object_url}?partNumber={len(part_digests)}&uploadId={quote(upload_id["upload_id"])}',
+                            data=part,
+                        )
+                        etags.append(response.headers.get('ETag', ''))
+                        part, next_part = next_part, archive.read(PART_SIZE) if next_part else b''
+                    AssetMirror.check_checksum(sha256.hexdigest(), checksum, file_path)
+                    self.request(
+                        'POST',
+                        f'{object_url}?uploadId={quote(upload_id["upload_id"])}',
+                        data=AssetMirror.complete_upload_body(etags),
+                    )
+                except SystemExit:
+                    # Parts of an upload never completed are billed until it is aborted
+                    try:
+                        self.request(
+                            'DELETE', f'{object_url}?uploadId={quote(upload_id["upload_id"])}', allow_missing=True
+                        )
+                    except SystemExit as error:
+                        logger.warning(f'Could not abort the upload of {key}: {error}')
+                    raise
+                expected_etag = f'{hashlib.md5(b"".join(part_digests), usedforsecurity=False).hexdigest()}-'
+                expected_etag += str(len(part_digests))
+
+        stored_etag = self.request('HEAD', object_url).headers.get('ETag', '').strip('"')
+        if stored_etag != expected_etag:
+            raise SystemExit(
+                f'The mirrored {key} does not match the archive (ETag {stored_etag}, not {expected_etag}).'
+            )
+        logger.info(f'{key} mirrored successfully in {len(part_digests)} part(s).')
+
+    @staticmethod
+    def check_checksum(uploaded_checksum: str, checksum: str, file_path: str):
+        """Fails the upload of an archive whose bytes are not the ones its checksum was computed from."""
+        if uploaded_checksum != checksum:
+            raise SystemExit(f'{file_path} changed since it was hashed, it was not mirrored.')
+
+    @staticmethod
+    def complete_upload_body(etags: List[str]) -> bytes:
+        parts = ''.join(
+            f'<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>'
+            for number, etag in enumerate(etags, start=1)
+        )
+
+        return f'<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>'.encode()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        allow_missing: bool = False,
+    ) -> requests.Response:
+        """Sends a signed request to the bucket, a `404` only passes with `allow_missing`."""
+        try:
+            response = HTTP_SESSION.request(
+                method, url, data=data, headers=self.sign(method, url, headers or {}), timeout=TIMEOUT
+            )
+            if not (allow_missing and response.status_code == requests.codes.not_found):
+                response.raise_for_status()
+        except requests.exceptions.RequestException as error:
+            raise SystemExit(f'The mirror request {method} {url} failed: {error}')
+
+        return response
+
+    def sign(self, method: str, url: str, headers: Dict[str, str], now: Optional[datetime] = None) -> Dict[str, str]:
+        """The headers of a request signed with AWS Signature Version 4 (the payload is left unsigned)."""
+        if not (self.access_key and self.secret_key):
+            return headers
+
+        parsed_url = urlsplit(url)
+        timestamp = (now or datetime.now(timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+        signed = {
+            **{name.lower(): value.strip() for name, value in headers.items()},
+            'host': parsed_url.netloc,
+            'x-amz-content-sha256': UNSIGNED_PAYLOAD,
+            'x-amz-date': timestamp,
+        }
+        if self.session_token:
+            signed['x-amz-security-token'] = self.session_token
+        signed_names = ';'.join(sorted(signed))
+        query = '&'.join(
+            sorted(
+                f'{quote(name, safe="-_.~")}={quote(value, safe="-_.~")}'
+                for name, value in parse_qsl(parsed_url.query, keep_blank_values=True)
+            )
+        )
+        canonical_request = '\n'.join(
+            (
+                method,
+                parsed_url.path or '/',
+                query,
+                ''.join(f'{name}:{signed[name]}\n' for name in sorted(signed)),
+                signed_names,
+                UNSIGNED_PAYLOAD,
+            )
+        )
+        scope = f'{timestamp[:8]}/{self.region}/s3/aws4_request'
+        string_to_sign = '\n'.join(
+            ('AWS4-HMAC-SHA256', timestamp, scope, hashlib.sha256(canonical_request.encode()).hexdigest())
+        )
+        signing_key = f'AWS4{self.secret_key}'.encode()
+        for scope_part in scope.split('/'):
+            signing_key = hmac.new(signing_key, scope_part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        return {
+            **signed,
+            'authorization': (
+                f'AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, SignedHeaders={signed_names}, '
+                f'Signature={signature}'
+            ),
+        }
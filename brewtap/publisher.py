@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+from dataclasses import replace
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Set,
+)
+
+import woodchips
+
+from brewtap.app import App
+from brewtap.config import Config
+from brewtap.constants import LOGGER_NAME
+from brewtap.job_queue import (
+    Job,
+    JobQueue,
+)
+
+
+class Publisher:
+    """Publishes the releases of the long-running modes (`brewtap serve` and `brewtap watch`).
+
+    Releases are queued in a durable `JobQueue` and published by a pool of workers on one event loop, so the pooled
+    HTTP session and the tap clones stay warm between releases: each tap is cloned by its first publish and only
+    refreshed (a shallow fetch and reset) afterwards. Publishes to the same tap are serialized (the releases queued
+    meanwhile are published together in a single commit), publishes to different taps run concurrently.
+    """
+
+    def __init__(self, configs: List[Config], job_queue: Optional[JobQueue] = None, workers: int = 4):
+        self.configs: Dict[str, Config] = {Publisher.repository(config): config for config in configs}
+        self.job_queue = job_queue or JobQueue()
+        self.worker_count = workers
+        self.workers: List[asyncio.Task] = []
+        self.busy_taps: Set[str] = set()  # Only touched from the event loop
+        self.jobs_queued = asyncio.Event()
+
+    async def start(self):
+        """Starts the workers on the running event loop, they first publish the jobs left by a previous run."""
+        self.workers = [asyncio.create_task(self.work()) for _ in range(self.worker_count)]
+        self.wake()
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.job_queue.close()
+
+    def enqueue(self, config: Config, tag: str) -> int:
+        """Queues the publish of a release (from any thread), `Publisher.wake` then lets the workers claim it."""
+        return self.job_queue.enqueue(Publisher.repository(config), tag, Publisher.taps(config))
+
+    def wake(self):
+        """Wakes the idle workers up, must run on the event loop of the workers."""
+        self.jobs_queued.set()
+
+    async def work(self):
+        """Claims and publishes jobs until cancelled."""
+        while True:
+            jobs = self.job_queue.claim(self.busy_taps)
+            if not jobs:
+                self.jobs_queued.clear()
+                await self.jobs_queued.wait()
+                continue
+
+            taps = set(jobs[0].taps)
+            self.busy_taps |= taps
+            try:
+                await self.publish(jobs)
+            finally:
+                self.busy_taps -= taps
+                self.wake()  # The taps are free again, another worker may claim their jobs
+
+    async def publish(self, jobs: List[Job]):
+        """Publishes claimed jobs, in a single commit when there are several (see `App.run_batch_async`).
+
+        Any failure (eg: a rejected `git push`) marks the jobs `failed` without stopping the worker. Jobs whose
+        publish got cancelled stay `running`, so the next start of the queue publishes them again.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+        releases = ', '.join(f'{job.repository} {job.tag}' for job in jobs)
+        started_at = time.time()
+
+        error = None
+        try:
+            configs = [Publisher.release_config(self.configs[job.repository], job.tag) for job in jobs]
+            logger.info(f'Publishing {releases}...')
+            if len(configs) == 1:
+                await App.run_github_action_async(configs[0])
+            else:
+                await App.run_batch_async(configs)
+        except (Exception, SystemExit) as exception:
+            error = str(exception) or type(exception).__name__
+            logger.error(f'Could not publish {releases}: {error}')
+        self.job_queue.finish(jobs, error)
+
+        waited = max(started_at - job.enqueued_at for job in jobs)
+        logger.info(f'Finished {releases} in {time.time() - started_at:.1f}s after waiting {waited:.1f}s.')
+
+    @staticmethod
+    def repository(config: Config) -> str:
+        """The key of the repository of a config, as GitHub names it (case-insensitive)."""
+        return f'{config.github_owner}/{config.github_repo}'.lower()
+
+    @staticmethod
+    def taps(config: Config) -> Set[str]:
+        """The keys (`owner/tap`, case-insensitive) of the taps a config publishes to, taps of different owners
+        may share a name.
+        """
+        return {
+            f'{tap.get("homebrew_owner", config.homebrew_owner)}/{tap.get("homebrew_tap", config.homebrew_tap)}'.lower()
+            for tap in [{}, *config.additional_taps]
+        }
+
+    @staticmethod
+    def release_config(config: Config, tag: str) -> Config:
+        """The config publishing the `tag` release of a repository.
+
+        Every release gets its own `work_dir` (a subfolder named after the tag) so concurrent publishes of one
+        repository do not share assets, and reuses the clones of the taps left by previous publishes.
+        """
+        return replace(config, version=tag, reuse_clone=True, work_dir=os.path.join(config.work_dir or '', tag))
@@ -1,188 +1,394 @@
+import bisect
 import os
 import re
+import shutil
+import tempfile
 from typing import (
+    Callable,
+    Dict,
     List,
     Optional,
     Tuple,
 )
 
-import _io  # type: ignore
-import pretty_tables
 import woodchips
 
 from brewtap.constants import (
     FORMULA_FOLDER,
     HOMEBREW_OWNER,
-    HOMEBREW_TAP,
     LOGGER_NAME,
 )
+from brewtap.formula_parser import FormulaParser
+from brewtap.tap_index import TapIndex
+from brewtap.utils import Utils
 
 
 TABLE_START_TAG = '<!-- project_table_start -->'
 TABLE_END_TAG = '<!-- project_table_end -->'
+EMPTY_CELL_PLACEHOLDER = 'NA'
+SHARD_HEADING_PATTERN = re.compile(r'^### (?P<shard>[A-Z]|0-9)\s*$')
+PAGES_FOLDER = 'docs'
+PAGE_FILENAME = 'formulas-{shard}.md'
+PAGE_FILENAME_PATTERN = re.compile(r'^formulas-(?P<shard>[a-z]|0-9)\.md$')
+PAGE_LINK_PATTERN = re.compile(r'^- \[(?P<shard>[A-Z]|0-9)\]\(docs/formulas-([a-z]|0-9)\.md\)$')
+TABLE_ROW_PATTERN = re.compile(
+    r'^\|\s*\[(?P<name>[^\]]*)\]\((?P<homepage>[^)]*)\)\s*\|\s*(?P<desc>.*?)\s*\|\s*`brew install [^`]*`\s*\|$'
+)
 
 
 class ReadmeUpdater:
     @staticmethod
-    def update_readme(homebrew_tap: str):
+    def update_readme(
+        homebrew_tap: str,
+        formula_folder: Optional[str] = None,
+        homebrew_owner: Optional[str] = None,
+        formula_path: Optional[str] = None,
+        full_rebuild: bool = False,
+        layout: str = 'single',
+        from_tap_index: bool = False,
+        parse_processes: bool = False,
+    ):
         """Updates the homebrew tap README by replacing the old table string
         with the updated table string if it can be found.
+
+        When the `formula_path` of the formula that changed is given, only its row of the old table is
+        updated (or removed if the file is gone) instead of parsing every formula of the tap again,
+        unless a `full_rebuild` is requested or the old table can't be parsed.
+
+        The `layout` is one of `README_TABLE_LAYOUTS`: a `single` table, one table per alphabetical
+        `shards` in the README, or one `pages` per shard under `docs/` with an index in the README.
+        Rebuilds read the formulas `from_tap_index` (see `TapIndex`) when asked to, instead of every formula file,
+        which are otherwise parsed by a pool of threads (or of processes with `parse_processes`).
         """
-        old_table, found_old_table = ReadmeUpdater.retrieve_old_table(homebrew_tap)
+        logger = woodchips.get(LOGGER_NAME)
+
+        readme = ReadmeUpdater.does_readme_exist(homebrew_tap)
+        if not readme:
+            logger.error('Could not find a valid README in this project to update.')
+            return
+
+        table_builders = {
+            'single': ReadmeUpdater.build_table,
+            'shards': ReadmeUpdater.build_sharded_table,
+            'pages': ReadmeUpdater.build_page_index,
+        }
+        changed_formula = None if full_rebuild else formula_path
+
+        def load_formulas() -> List:
+            if from_tap_index:
+                return [
+                    {'name': entry['name'], 'desc': entry['desc'], 'homepage': entry['homepage']}
+                    for entry in TapIndex.read(homebrew_tap)
+                ]
+            return ReadmeUpdater.format_formula_data(homebrew_tap, formula_folder, parse_processes)
+
+        def build_table(old_table: str) -> str:
+            return table_builders[layout](
+                old_table, homebrew_tap, load_formulas, homebrew_owner or HOMEBREW_OWNER, changed_formula
+            )
 
         # Only update the README table if both start/end tags were found
-        if found_old_table:
-            formulas = ReadmeUpdater.format_formula_data(homebrew_tap)
-            new_table = ReadmeUpdater.generate_table(formulas, HOMEBREW_OWNER, HOMEBREW_TAP)
+        if ReadmeUpdater.rewrite_table(readme, build_table):
+            logger.debug(f'{readme} table updated successfully.')
+        else:
+            logger.error('Could not find both start and end tags for project table in README.')
 
-            readme_content = ReadmeUpdater.read_current_readme(homebrew_tap)
-            ReadmeUpdater.replace_table_contents(readme_content, old_table, new_table, homebrew_tap)
+    @staticmethod
+    def build_table(
+        old_table: str,
+        homebrew_tap: str,
+        load_formulas: Callable[[], List],
+        homebrew_owner: Optional[str] = None,
+        formula_path: Optional[str] = None,
+    ) -> str:
+        """Builds a single table of every formula, only updating the row of `formula_path` if given."""
+        formulas = ReadmeUpdater.parse_table_rows(old_table)
+        if formula_path and formulas:
+            formulas = ReadmeUpdater.update_formula_row(formulas, *ReadmeUpdater.read_formula_row(formula_path))
+        else:
+            formulas = load_formulas()
+
+        return ReadmeUpdater.generate_table(formulas, homebrew_owner, homebrew_tap)
 
     @staticmethod
-    def format_formula_data(homebrew_tap: str) -> List:
-        """Retrieve the name, description, and homepage from each
-        Ruby formula file in the homebrew tap repo.
+    def build_sharded_table(
+        old_table: str,
+        homebrew_tap: str,
+        load_formulas: Callable[[], List],
+        homebrew_owner: Optional[str] = None,
+        formula_path: Optional[str] = None,
+    ) -> str:
+        """Builds one table per shard, each under a `### <shard>` heading.
+
+        When only the formula of `formula_path` changed, the tables of the other shards are copied as is.
+        Everything is rebuilt if the table of its shard can't be parsed.
         """
-        homebrew_tap_path = os.path.join(homebrew_tap, FORMULA_FOLDER)
-        formulas = []
-        files = os.listdir(homebrew_tap_path)
+        shards = ReadmeUpdater.parse_shards(old_table) if formula_path else None
+        shard_formulas = None
+        if formula_path and shards:
+            name, formula = ReadmeUpdater.read_formula_row(formula_path)
+            shard = ReadmeUpdater.shard_of(name)
+            formulas = ReadmeUpdater.parse_table_rows(shards[shard]) if shard in shards else []
+            if formulas is not None:
+                shard_formulas = {shard: ReadmeUpdater.update_formula_row(formulas, name, formula)}
+        if shards is None or shard_formulas is None:
+            shards = {}
+            shard_formulas = ReadmeUpdater.group_by_shard(load_formulas())
+
+        for shard, formulas in shard_formulas.items():
+            if formulas:
+                shards[shard] = ReadmeUpdater.render_table(formulas, homebrew_owner, homebrew_tap)
+            else:
+                shards.pop(shard, None)
+        sections = [f'### {shard.upper()}\n\n{shards[shard]}' for shard in sorted(shards)]
+
+        return TABLE_START_TAG + '\n' + '\n'.join(sections) + TABLE_END_TAG + '\n'
 
-        if not any([file.endswith('.rb') for file in files]):
-            raise SystemExit('No Ruby files found in the "formula_folder" provided.')
+    @staticmethod
+    def build_page_index(
+        old_table: str,
+        homebrew_tap: str,
+        load_formulas: Callable[[], List],
+        homebrew_owner: Optional[str] = None,
+        formula_path: Optional[str] = None,
+    ) -> str:
+        """Writes a `docs/formulas-<shard>.md` page with the table of each shard and builds the index of the pages.
+
+        When only the formula of `formula_path` changed, only the page of its shard is written.
+        """
+        pages_folder = os.path.join(homebrew_tap, PAGES_FOLDER)
+        shard_formulas = None
+        if formula_path and ReadmeUpdater.parse_page_index(old_table):
+            name, formula = ReadmeUpdater.read_formula_row(formula_path)
+            shard = ReadmeUpdater.shard_of(name)
+            page = os.path.join(pages_folder, PAGE_FILENAME.format(shard=shard))
+            formulas = ReadmeUpdater.parse_table_rows(Utils.read_file(page) or '') if os.path.isfile(page) else []
+            if formulas is not None:
+                shard_formulas = {shard: ReadmeUpdater.update_formula_row(formulas, name, formula)}
+        if shard_formulas is None:
+            shard_formulas = ReadmeUpdater.group_by_shard(load_formulas())
+            for shard in ReadmeUpdater.list_pages(pages_folder):
+                shard_formulas.setdefault(shard, [])
+
+        os.makedirs(pages_folder, exist_ok=True)
+        for shard, formulas in shard_formulas.items():
+            page = os.path.join(pages_folder, PAGE_FILENAME.format(shard=shard))
+            if formulas:
+                table = ReadmeUpdater.generate_table(formulas, homebrew_owner, homebrew_tap)
+                Utils.write_atomically(page, f'# {shard.upper()}\n\n{table}')
+            elif os.path.isfile(page):
+                os.remove(page)
+        index = [
+            f'- [{shard.upper()}]({PAGES_FOLDER}/{PAGE_FILENAME.format(shard=shard)})\n'
+            for shard in ReadmeUpdater.list_pages(pages_folder)
+        ]
+
+        return TABLE_START_TAG + '\n' + ''.join(index) + TABLE_END_TAG + '\n'
+
+    @staticmethod
+    def rewrite_table(readme: str, build_table: Callable[[str], str]) -> bool:
+        """Replaces the table between the start/end tags of the README (tags included) in a single pass.
 
+        Content before and after the table is streamed into a temporary file next to the README, with the
+        table in between built by `build_table` from the old one. The temporary file then atomically replaces
+        the README so it is never left half written. Returns `False`, leaving the README untouched, if both
+        tags can't be found.
+        """
+        readme_folder = os.path.dirname(readme) or '.'
+        temp_file = tempfile.NamedTemporaryFile('w', dir=readme_folder, prefix='.readme-', delete=False)
+        table_replaced = False
         try:
-            for filename in sorted(files):
-                with open(os.path.join(homebrew_tap_path, filename), 'r') as formula:
-                    # Set empty defaults
-                    final_name = ''
-                    final_desc = ''
-                    final_homepage = ''
-
-                    for line in formula:
-                        if line.strip().startswith('class'):
-                            name_line = line.split()
-                            name_pieces = []
-                            name_pieces = re.findall('[A-Z][^A-Z]*', name_line[1])
-                            formatted_name = ''
-
-                            for piece in name_pieces:
-                                if piece != name_pieces[-1]:
-                                    formatted_name += f'{piece}-'
-                                else:
-                                    formatted_name += f'{piece}'
-                                final_name = formatted_name.lower()
-                        if line.strip().startswith('desc'):
-                            final_desc = line.strip().replace('desc ', '').replace('"', '')
-                        if line.strip().startswith('homepage'):
-                            final_homepage = line.strip().replace('homepage ', '').replace('"', '')
-                    formula_data = {
-                        'name': final_name,
-                        'desc': final_desc,
-                        'homepage': final_homepage,
-                    }
-                    formulas.append(formula_data)
-        except Exception as error:
-            raise SystemExit(f'There was a problem opening or reading the formula data: {error}')
+            with open(readme, 'r') as readme_contents, temp_file:
+                old_table: List[str] = []
+                for line in readme_contents:
+                    normalized_line = line.strip().lower()
+                    if not old_table and normalized_line != TABLE_START_TAG:
+                        temp_file.write(line)
+                        continue
+
+                    old_table.append(line)
+                    if normalized_line == TABLE_END_TAG:
+                        temp_file.write(build_table(''.join(old_table)))
+                        shutil.copyfileobj(readme_contents, temp_file)
+                        table_replaced = True
+                        break
 
-        return formulas
+            if table_replaced:
+                shutil.copymode(readme, temp_file.name)
+                os.replace(temp_file.name, readme)
+        finally:
+            # Only still around if we did not replace the README with it
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+
+        return table_replaced
 
     @staticmethod
-    def generate_table(formulas: List, __owner: Optional[str] = None, __tap: Optional[str] = None) -> str:
-        """Generates a pretty table which will be used in the README file."""
-        logger = woodchips.get(LOGGER_NAME)
-        owner = __owner
-        tap = __tap.replace('homebrew-', '', 1) if __tap else None
+    def read_formula_row(formula_path: str) -> Tuple[str, Optional[Dict[str, str]]]:
+        """Reads the name and table row of a formula, the row is `None` if the formula file is gone."""
+        if not os.path.isfile(formula_path):
+            return os.path.basename(formula_path).removesuffix('.rb'), None
 
-        headers = ['Project', 'Description', 'Install']
-        rows = []
+        record = FormulaParser.parse_file(formula_path, summary_only=True)
 
-        for formula in formulas:
-            prefix = f'{owner}/{tap}/' if owner and tap else ''
-            rows.append(
-                [
-                    f'[{formula["name"]}]({formula.get("homepage")})',
-                    formula.get('desc'),
-                    f'`brew install {prefix}{formula["name"]}`',
-                ]
-            )
+        return record.name, {'name': record.name, 'desc': record.desc, 'homepage': record.homepage}
 
-        table = pretty_tables.create(
-            headers=headers,
-            rows=rows,
-            empty_cell_placeholder='NA',
-        )
+    @staticmethod
+    def update_formula_row(formulas: List, name: str, formula: Optional[Dict[str, str]]) -> List:
+        """Replaces, inserts or removes (if `formula` is `None`) the row of a formula.
 
-        final_table = TABLE_START_TAG + '\n' + table + '\n' + TABLE_END_TAG + '\n'
+        Rows are kept sorted by formula name.
+        """
+        formulas = [row for row in formulas if row['name'] != name]
+        if formula:
+            bisect.insort(formulas, formula, key=lambda row: row['name'])
 
-        logger.debug(final_table)
+        return formulas
 
-        return final_table
+    @staticmethod
+    def parse_table_rows(table: str) -> Optional[List]:
+        """Parses the name, description, and homepage back out of the rows of a table built by `generate_table`.
+
+        Anything other than table lines (eg: tags, headings) is skipped. Returns `None` if there is no table
+        or a row does not look like one of ours.
+        """
+        lines = [line.strip() for line in table.splitlines() if line.lstrip().startswith('|')]
+        if len(lines) < 2:
+            return None
+
+        formulas = []
+        # The first two lines are the table header and its separator
+        for line in lines[2:]:
+            row = TABLE_ROW_PATTERN.match(line)
+            if not row:
+                return None
+            formulas.append({'name': row.group('name'), 'desc': row.group('desc'), 'homepage': row.group('homepage')})
+
+        return formulas
 
     @staticmethod
-    def retrieve_old_table(homebrew_tap: str) -> Tuple[str, bool]:
-        """Retrives all content between the start/end tags in the README file."""
-        logger = woodchips.get(LOGGER_NAME)
+    def parse_shards(table: str) -> Optional[Dict[str, str]]:
+        """Splits a table built by `build_sharded_table` into the table of each shard.
 
-        readme = ReadmeUpdater.does_readme_exist(homebrew_tap)
-        old_table_found = False
-        table_start_found = False
-        table_end_found = False
-        old_table = ''
+        Returns `None` if there are no shards or there is content outside of them.
+        """
+        shard_lines: Dict[str, List[str]] = {}
+        shard = None
+        for line in table.splitlines(keepends=True):
+            heading = SHARD_HEADING_PATTERN.match(line)
+            if heading:
+                shard = heading.group('shard').lower()
+                shard_lines[shard] = []
+            elif line.lstrip().startswith('|') and shard:
+                shard_lines[shard].append(line)
+            elif line.strip() and line.strip().lower() not in (TABLE_START_TAG, TABLE_END_TAG):
+                return None
+
+        return {shard: ''.join(lines) for shard, lines in shard_lines.items()} or None
 
-        if readme:
-            with open(readme, 'r') as readme_contents:
-                for line in readme_contents:
-                    normalized_line = line.strip().lower()
-                    if normalized_line == TABLE_START_TAG:
-                        table_start_found = True
-                    elif normalized_line == TABLE_END_TAG:
-                        table_end_found = True
-
-                    # Once we find the start tag, start building the potential replacement
-                    if table_start_found:
-                        old_table += line
-                    # Once we find both start and end tags, break out of reading more README lines
-                    if table_start_found and table_end_found:
-                        old_table_found = True
-                        break
+    @staticmethod
+    def parse_page_index(table: str) -> bool:
+        """Determines if the table is an index of pages built by `build_page_index`."""
+        lines = [
+            line.strip()
+            for line in table.splitlines()
+            if line.strip() and line.strip().lower() not in (TABLE_START_TAG, TABLE_END_TAG)
+        ]
 
-            if not old_table_found:
-                # If we can't find both start/end tags, reset the table so we don't blow away unassociated README data
-                old_table = ''
-                logger.error('Could not find both start and end tags for project table in README.')
-        else:
-            logger.error('Could not find a valid README in this project to update.')
+        return bool(lines) and all(PAGE_LINK_PATTERN.match(line) for line in lines)
+
+    @staticmethod
+    def list_pages(pages_folder: str) -> List[str]:
+        """Lists the shards that have a page, in order."""
+        if not os.path.isdir(pages_folder):
+            return []
+
+        pages = (PAGE_FILENAME_PATTERN.match(filename) for filename in os.listdir(pages_folder))
 
-        return old_table, old_table_found
+        return sorted(page.group('shard') for page in pages if page)
 
     @staticmethod
-    def read_current_readme(homebrew_tap: str) -> _io.TextIOWrapper:
-        """Reads the current README content."""
-        logger = woodchips.get(LOGGER_NAME)
+    def shard_of(name: str) -> str:
+        """The alphabetical shard of a formula: the first letter of its name, `0-9` for anything else."""
+        first_letter = name[:1].lower()
 
-        readme = ReadmeUpdater.does_readme_exist(homebrew_tap)
-        file_content = None
+        return first_letter if first_letter.isascii() and first_letter.isalpha() else '0-9'
 
-        if readme:
-            with open(readme, 'r') as readme_contents:
-                file_content = readme_contents.read()
-            logger.debug(f'{readme} read successfully.')
+    @staticmethod
+    def group_by_shard(formulas: List) -> Dict[str, List]:
+        """Groups formulas by their shard, keeping their order."""
+        shard_formulas: Dict[str, List] = {}
+        for formula in formulas:
+            shard_formulas.setdefault(ReadmeUpdater.shard_of(formula['name']), []).append(formula)
 
-        return file_content
+        return shard_formulas
 
     @staticmethod
-    def replace_table_contents(file_content: _io.TextIOWrapper, old_table: str, new_table: str, homebrew_tap: str):
-        """Replaces the old README project table string with the new
-        project table string including start/end tags.
+    def format_formula_data(homebrew_tap: str, formula_folder: Optional[str] = None, processes: bool = False) -> List:
+        """Retrieve the name, description, and homepage from each
+        Ruby formula file in the homebrew tap repo, sorted by name.
         """
+        homebrew_tap_path = os.path.join(homebrew_tap, formula_folder or FORMULA_FOLDER)
+        formula_paths = FormulaParser.list_formulas(homebrew_tap_path)
+
+        if not formula_paths:
+            raise SystemExit('No Ruby files found in the "formula_folder" provided.')
+
+        try:
+            records = FormulaParser.parse_files(formula_paths, summary_only=True, processes=processes)
+        except Exception as error:
+            raise SystemExit(f'There was a problem opening or reading the formula data: {error}')
+
+        formulas = [{'name': record.name, 'desc': record.desc, 'homepage': record.homepage} for record in records]
+
+        # Rows are sorted by name like `update_formula_row` does, files sort differently (eg: `foo-bar.rb` < `foo.rb`)
+        return sorted(formulas, key=lambda row: row['name'])
+
+    @staticmethod
+    def generate_table(formulas: List, __owner: Optional[str] = None, __tap: Optional[str] = None) -> str:
+        """Generates a pretty table which will be used in the README file."""
         logger = woodchips.get(LOGGER_NAME)
 
-        readme = ReadmeUpdater.does_readme_exist(homebrew_tap)
+        final_table = (
+            TABLE_START_TAG + '\n' + ReadmeUpdater.render_table(formulas, __owner, __tap) + TABLE_END_TAG + '\n'
+        )
 
-        if readme:
-            with open(readme, 'w') as readme_contents:
-                readme_contents.write(file_content.replace(old_table, new_table))
-            logger.debug(f'{readme} table updated successfully.')
+        logger.debug(final_table)
+
+        return final_table
+
+    @staticmethod
+    def render_table(formulas: List, owner: Optional[str] = None, homebrew_tap: Optional[str] = None) -> str:
+        """Renders the Markdown table of the formulas (without tags)."""
+        tap = homebrew_tap.replace('homebrew-', '', 1) if homebrew_tap else None
+        prefix = f'{owner}/{tap}/' if owner and tap else ''
+
+        headers = ['Project', 'Description', 'Install']
+        rows = [
+            [
+                f'[{formula["name"]}]({formula.get("homepage")})',
+                formula.get('desc'),
+                f'`brew install {prefix}{formula["name"]}`',
+            ]
+            for formula in formulas
+        ]
+
+        return ReadmeUpdater.format_table(headers, rows) + '\n'
+
+    @staticmethod
+    def format_table(headers: List[str], rows: List[List[Optional[str]]]) -> str:
+        """Formats a Markdown table with every column padded to its widest cell.
+
+        Takes linear time in the number of rows: one pass measures the columns, another writes the lines.
+        """
+        table = [headers, *([EMPTY_CELL_PLACEHOLDER if cell is None else cell for cell in row] for row in rows)]
+        widths = [max(len(cell) for cell in column) for column in zip(*table)]
+        separator = ['-' * width for width in widths]
+
+        return '\n'.join(
+            '| ' + ' | '.join(cell.ljust(width) for cell, width in zip(row, widths)) + ' |'
+            for row in (table[0], separator, *table[1:])
+        )
 
     @staticmethod
     def does_readme_exist(homebrew_tap: str) -> Optional[str]:
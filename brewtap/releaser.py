@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import os
+from dataclasses import replace
+from typing import (
+    List,
+    Optional,
+)
+
+import woodchips
+
+from brewtap._version import __version__
+from brewtap.app import App
+from brewtap.checksum_cache import ChecksumCacheServer
+from brewtap.config import Config
+from brewtap.constants import (
+    CHECKSUM_CACHE_TOKEN,
+    FRAGMENT_SECRET,
+    LOGGER_NAME,
+)
+from brewtap.fragments import ChecksumFragment
+from brewtap.job_queue import JobQueue
+from brewtap.publisher import Publisher
+from brewtap.server import WebhookServer
+from brewtap.utils import (
+    BrewtapError,
+    Utils,
+)
+from brewtap.watcher import ReleaseWatcher
+
+
+class Releaser:
+    """The `brewtap` command line, for publishing outside of GitHub Actions."""
+
+    @staticmethod
+    def build_parser() -> argparse.ArgumentParser:
+        """Builds the parser of the `brewtap` command and its subcommands."""
+        parser = argparse.ArgumentParser(
+            prog='brewtap',
+            description='Release scripts, binaries, and executables directly to Homebrew.',
+        )
+        parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+        parser.add_argument('--debug', action='store_true', help='Log debugging info to console.')
+        subparsers = parser.add_subparsers(dest='command', required=True)
+
+        batch_parser = subparsers.add_parser(
+            'batch',
+            help='Publish the formulas of several repositories to one tap in a single commit.',
+        )
+        batch_parser.add_argument('batch_file', help='JSON file listing the repositories to publish.')
+        batch_parser.add_argument(
+            '--skip-commit',
+            action='store_true',
+            help='Commit the formulas without pushing them or uploading checksum.txt (a dry run).',
+        )
+        batch_parser.set_defaults(run=Releaser.batch)
+
+        serve_parser = subparsers.add_parser(
+            'serve',
+            help='Publish releases as GitHub notifies them through webhooks, keeping tap clones warm.',
+        )
+        serve_parser.add_argument('config_file', help='JSON file listing the repositories to publish (batch format).')
+        serve_parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1).')
+        serve_parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080).')
+        Releaser.add_publisher_arguments(serve_parser)
+        serve_parser.set_defaults(run=Releaser.serve)
+
+        watch_parser = subparsers.add_parser(
+            'watch',
+            help='Poll the latest release of repositories that cannot send webhooks and publish their new tags.',
+        )
+        watch_parser.add_argument('config_file', help='JSON file listing the repositories to watch (batch format).')
+        watch_parser.add_argument(
+            '--state-file',
+            default='brewtap-watch.json',
+            help='JSON file keeping the latest tag of every repository (default: brewtap-watch.json).',
+        )
+        Releaser.add_publisher_arguments(watch_parser)
+        watch_parser.set_defaults(run=Releaser.watch)
+
+        hash_parser = subparsers.add_parser(
+            'hash',
+            help='Hash a locally built release asset into a checksum fragment for `brewtap assemble`.',
+        )
+        hash_parser.add_argument('asset', help='The release asset to hash.')
+        hash_parser.add_argument(
+            '--target',
+            default='default',
+            help='The target of the asset, eg: darwin_arm64 (default: the top-level formula archive).',
+        )
+        hash_parser.add_argument(
+            '--output',
+            help='File to write the fragment to, it is printed to stdout (as a single line of JSON) either way.',
+        )
+        hash_parser.set_defaults(run=Releaser.hash)
+
+        assemble_parser = subparsers.add_parser(
+            'assemble',
+            help='Publish releases from the checksum fragments of `brewtap hash` instead of downloading their assets.',
+        )
+        assemble_parser.add_argument(
+            'config_file', help='JSON file listing the repositories to publish (batch format).'
+        )
+        assemble_parser.add_argument('fragments', help='Glob pattern of the fragment files, eg: "fragments/*.json".')
+        assemble_parser.add_argument(
+            '--skip-commit',
+            action='store_true',
+            help='Commit the formulas without pushing them or uploading checksum.txt (a dry run).',
+        )
+        assemble_parser.set_defaults(run=Releaser.assemble)
+
+        cache_server_parser = subparsers.add_parser(
+            'cache-server',
+            help='Serve a checksum cache shared by runners (the `checksum_cache_url` input).',
+        )
+        cache_server_parser.add_argument('directory', help='Folder the cache entries are stored in.')
+        cache_server_parser.add_argument(
+            '--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1).'
+        )
+        cache_server_parser.add_argument('--port', type=int, default=8081, help='Port to listen on (default: 8081).')
+        cache_server_parser.set_defaults(run=Releaser.cache_server)
+
+        return parser
+
+    @staticmethod
+    def add_publisher_arguments(parser: argparse.ArgumentParser):
+        """Adds the options of the `Publisher` of the long-running subcommands."""
+        parser.add_argument(
+            '--queue-file',
+            default='brewtap-queue.sqlite3',
+            help='SQLite database of the job queue, releases still queued are published on restart '
+            '(default: brewtap-queue.sqlite3).',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4, help='Number of taps published concurrently (default: 4).'
+        )
+
+    @staticmethod
+    def service_configs(config_file: str) -> List[Config]:
+        """Reads and checks the repositories of a long-running subcommand."""
+        configs = Utils.trap_exit(Config.from_batch_file, config_file)
+        for config in configs:
+            Utils.trap_exit(App.check_required_env_variables, config)
+
+        return configs
+
+    @staticmethod
+    def batch(args: argparse.Namespace):
+        """Publishes every repository of the batch file."""
+        configs = Utils.trap_exit(Config.from_batch_file, args.batch_file)
+        if args.skip_commit:
+            for config in configs:
+                config.skip_commit = True
+
+        asyncio.run(App.run_batch_async(configs))
+
+    @staticmethod
+    def hash(args: argparse.Namespace):
+        """Prints (and writes) the checksum fragment of an asset, signed if `BREWTAP_FRAGMENT_SECRET` is set."""
+        fragment = ChecksumFragment.from_file(args.asset, args.target, FRAGMENT_SECRET)
+        if args.output:
+            Utils.write_file(args.output, fragment.to_json() + '\n')
+
+        print(fragment.to_json())
+
+    @staticmethod
+    def assemble(args: argparse.Namespace):
+        """Publishes the repositories of the config file with the checksums of the fragments.
+
+        Fragments are verified against `BREWTAP_FRAGMENT_SECRET` when it is set.
+        """
+        configs = [
+            replace(config, checksum_fragments=args.fragments, skip_commit=config.skip_commit or args.skip_commit)
+            for config in Utils.trap_exit(Config.from_batch_file, args.config_file)
+        ]
+
+        if len(configs) == 1:
+            asyncio.run(App.run_github_action_async(configs[0]))
+        else:
+            asyncio.run(App.run_batch_async(configs))
+
+    @staticmethod
+    def cache_server(args: argparse.Namespace):
+        """Serves a checksum cache until interrupted.
+
+        With `BREWTAP_CACHE_TOKEN` set, only requests bearing it may store checksums.
+        """
+        server = ChecksumCacheServer((args.host, args.port), args.directory, CHECKSUM_CACHE_TOKEN)
+        woodchips.get(LOGGER_NAME).info(
+            f'Serving the checksum cache in {args.directory} on {args.host}:{server.server_port}...'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    @staticmethod
+    def serve(args: argparse.Namespace):
+        """Serves the webhooks of every repository of the config file until interrupted.
+
+        The webhook secret is read from the `BREWTAP_WEBHOOK_SECRET` environment variable.
+        """
+        secret = os.getenv('BREWTAP_WEBHOOK_SECRET')
+        if not secret:
+            raise SystemExit('BREWTAP_WEBHOOK_SECRET must be set to verify the signature of webhooks.')
+        configs = Releaser.service_configs(args.config_file)
+
+        server = WebhookServer((args.host, args.port), configs, secret, JobQueue(args.queue_file), args.workers)
+        woodchips.get(LOGGER_NAME).info(f'Serving webhooks on {args.host}:{server.server_port}...')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    @staticmethod
+    def watch(args: argparse.Namespace):
+        """Polls every repository of the config file until interrupted."""
+        configs = Releaser.service_configs(args.config_file)
+        publisher = Publisher(configs, JobQueue(args.queue_file), args.workers)
+        watcher = ReleaseWatcher(configs, publisher, args.state_file)
+
+        woodchips.get(LOGGER_NAME).info(f'Watching the releases of {len(configs)} repositories...')
+        try:
+            asyncio.run(watcher.run())
+        except KeyboardInterrupt:
+            pass
+
+
+def main(argv: Optional[List[str]] = None):
+    args = Releaser.build_parser().parse_args(argv)
+    App.setup_logger(args.debug)
+
+    try:
+        args.run(args)
+    except BrewtapError as error:
+        raise SystemExit(error)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import woodchips
+
+from brewtap.config import Config
+from brewtap.constants import LOGGER_NAME
+from brewtap.job_queue import JobQueue
+from brewtap.publisher import Publisher
+
+
+SIGNATURE_HEADER = 'X-Hub-Signature-256'
+EVENT_HEADER = 'X-GitHub-Event'
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """A long-running server publishing the releases GitHub notifies it of through `release` webhooks.
+
+    Releases are published by a `Publisher` running on a background event loop.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        configs: List[Config],
+        secret: str,
+        job_queue: Optional[JobQueue] = None,
+        workers: int = 4,
+    ):
+        super().__init__(address, WebhookHandler)
+        self.secret = secret
+        self.publisher = Publisher(configs, job_queue, workers)
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name='brewtap-publish', daemon=True)
+        self.loop_thread.start()
+        asyncio.run_coroutine_threadsafe(self.publisher.start(), self.loop).result()
+
+    def submit(self, config: Config, tag: str) -> int:
+        """Queues the publish of a release and wakes the workers up."""
+        job_id = self.publisher.enqueue(config, tag)
+        self.loop.call_soon_threadsafe(self.publisher.wake)
+
+        return job_id
+
+    def server_close(self):
+        super().server_close()
+        asyncio.run_coroutine_threadsafe(self.publisher.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+
+    @staticmethod
+    def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+        """Checks the `sha256=<hex digest>` HMAC GitHub signs webhook payloads with."""
+        expected = 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+        return signature is not None and hmac.compare_digest(expected, signature)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Accepts the webhooks of the `WebhookServer`, releases are queued and answered with `202 Accepted`.
+
+    `GET` answers health checks along with the stats of the queue (see `JobQueue.stats`).
+    """
+
+    server: WebhookServer
+
+    def do_GET(self):
+        self.respond(
+            200,
+            {
+                'status': 'ok',
+                'repositories': sorted(self.server.publisher.configs),
+                'queue': self.server.publisher.job_queue.stats(),
+            },
+        )
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not WebhookServer.verify_signature(self.server.secret, body, self.headers.get(SIGNATURE_HEADER)):
+            return self.respond(401, {'error': 'Invalid signature.'})
+
+        event = self.headers.get(EVENT_HEADER)
+        if event == 'ping':
+            return self.respond(200, {'status': 'pong'})
+        if event != 'release':
+            return self.respond(202, {'status': f'Ignored the {event} event.'})
+
+        try:
+            payload = json.loads(body)
+            action, release, repository = payload['action'], payload['release'], payload['repository']['full_name']
+        except (ValueError, KeyError, TypeError):
+            return self.respond(400, {'error': 'Invalid release payload.'})
+
+        if action != 'published' or release.get('draft') or release.get('prerelease'):
+            return self.respond(202, {'status': f'Ignored the {action} release.'})
+
+        config = self.server.publisher.configs.get(repository.lower())
+        if config is None:
+            return self.respond(404, {'error': f'{repository} is not configured.'})
+
+        job_id = self.server.submit(config, release['tag_name'])
+        self.respond(202, {'status': f'Queued {repository} {release["tag_name"]}.', 'job': job_id})
+
+    def respond(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):
+        woodchips.get(LOGGER_NAME).debug(f'{self.address_string()} - {format % args}')
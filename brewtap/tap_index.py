@@ -0,0 +1,169 @@
+import bisect
+import json
+import os
+import re
+from dataclasses import replace
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
+
+import woodchips
+
+from brewtap.checksum import ArchiveChecksum
+from brewtap.constants import LOGGER_NAME
+from brewtap.formula_parser import (
+    FormulaParser,
+    FormulaRecord,
+)
+from brewtap.targets import (
+    TARGETS,
+    TARGETS_BY_NAME,
+)
+from brewtap.utils import Utils
+
+
+TAP_INDEX_FILE = 'index.jsonl'
+# The target of the `url`/`sha256` stanzas of each `on_*` block combination
+TARGET_BLOCKS = {target.blocks: target.name for target in TARGETS}
+# Homebrew infers the version of formulas without a `version` stanza from their URL, eg: `.../tags/v1.2.0.tar.gz`
+URL_VERSION_PATTERN = re.compile(r'/(?:tags|download)/v?(?P<version>\d[\w.-]*?)(?:\.tar\.gz|\.tgz|\.zip|/)')
+
+
+class TapIndex:
+    """A JSON Lines index of every formula in a tap, one formula per line sorted by name.
+
+    Lets tooling look up the version, URL and checksum of formulas without cloning the tap and parsing Ruby,
+    and keeps diffs to one line per published formula.
+    """
+
+    @staticmethod
+    def update(
+        homebrew_tap: str,
+        formula_path: str,
+        formula: str,
+        version: Optional[str] = None,
+        checksums: Optional[List[ArchiveChecksum]] = None,
+        formula_folder: Optional[str] = None,
+    ):
+        """Updates the entry of a published formula in the tap index.
+
+        The entry is built from the formula's content and the checksums of the publish, so no formula is read.
+        The index is built from every formula of `formula_folder` when it does not exist yet.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+        index_path = os.path.join(homebrew_tap, TAP_INDEX_FILE)
+        record = replace(FormulaParser.parse(formula), file_name=os.path.splitext(os.path.basename(formula_path))[0])
+        entry = TapIndex.build_entry(record, os.path.relpath(formula_path, homebrew_tap), version, checksums)
+
+        if os.path.isfile(index_path):
+            lines = TapIndex.read_lines(index_path)
+        else:
+            logger.info(f'Building {TAP_INDEX_FILE} from every formula in the tap...')
+            lines = TapIndex.build_lines(homebrew_tap, formula_folder or os.path.dirname(entry['path']))
+
+        lines = TapIndex.upsert_line(lines, entry)
+        TapIndex.write_lines(index_path, lines)
+        logger.debug(f'{TAP_INDEX_FILE} updated with {entry["name"]}.')
+
+    @staticmethod
+    def lookup(homebrew_tap: str, name: str) -> Optional[Dict[str, Any]]:
+        """Finds the entry of a formula by name (a binary search over the sorted lines)."""
+        lines = TapIndex.read_lines(os.path.join(homebrew_tap, TAP_INDEX_FILE))
+        index = bisect.bisect_left(lines, name, key=TapIndex.line_name)
+
+        return json.loads(lines[index]) if index < len(lines) and TapIndex.line_name(lines[index]) == name else None
+
+    @staticmethod
+    def read(homebrew_tap: str) -> List[Dict[str, Any]]:
+        """Reads every entry of the tap index, sorted by name."""
+        return [json.loads(line) for line in TapIndex.read_lines(os.path.join(homebrew_tap, TAP_INDEX_FILE))]
+
+    @staticmethod
+    def build_entry(
+        record: FormulaRecord,
+        path: str,
+        version: Optional[str] = None,
+        checksums: Optional[List[ArchiveChecksum]] = None,
+    ) -> Dict[str, Any]:
+        """Builds the index entry of a formula, `name` always comes first so entries sort by name.
+
+        Targets come from the `checksums` of a publish if given, otherwise from the `on_*` blocks of the formula.
+        """
+        if checksums is not None:
+            targets = {
+                checksum.target: {'url': checksum.url, 'sha256': checksum.checksum}
+                for checksum in checksums
+                if checksum.target in TARGETS_BY_NAME
+            }
+        else:
+            targets = {
+                # `mirror` stanzas are left out, like in the entries built from checksums
+                TARGET_BLOCKS[blocks]: {name: value for name, value in stanzas.items() if name in ('url', 'sha256')}
+                for blocks, stanzas in record.platforms.items()
+                if blocks in TARGET_BLOCKS
+            }
+        if version:
+            version = version.lstrip('v')
+        elif record.version:
+            version = record.version
+        elif url_version := URL_VERSION_PATTERN.search(record.url or ''):
+            version = url_version.group('version')
+
+        return {
+            'name': record.name,
+            'version': version,
+            'url': record.url,
+            'sha256': record.sha256,
+            'targets': targets,
+            'desc': record.desc,
+            'homepage': record.homepage,
+            'license': record.license,
+            'path': path,
+        }
+
+    @staticmethod
+    def build_lines(homebrew_tap: str, formula_folder: str) -> List[str]:
+        """Builds the sorted lines of the index from every formula of the tap."""
+        formula_paths = FormulaParser.list_formulas(os.path.join(homebrew_tap, formula_folder))
+        records = FormulaParser.parse_files(formula_paths)
+        entries = [
+            TapIndex.build_entry(record, os.path.relpath(formula_path, homebrew_tap))
+            for formula_path, record in zip(formula_paths, records)
+        ]
+
+        return sorted((TapIndex.dump_entry(entry) for entry in entries), key=TapIndex.line_name)
+
+    @staticmethod
+    def upsert_line(lines: List[str], entry: Dict[str, Any]) -> List[str]:
+        """Replaces or inserts (in sorted position) the line of an entry."""
+        index = bisect.bisect_left(lines, entry['name'], key=TapIndex.line_name)
+        if index < len(lines) and TapIndex.line_name(lines[index]) == entry['name']:
+            lines[index] = TapIndex.dump_entry(entry)
+        else:
+            lines.insert(index, TapIndex.dump_entry(entry))
+
+        return lines
+
+    @staticmethod
+    def dump_entry(entry: Dict[str, Any]) -> str:
+        """Serializes an entry to its (compact) line."""
+        return json.dumps(entry, separators=(',', ':')) + '\n'
+
+    @staticmethod
+    def line_name(line: str) -> str:
+        """The name of the formula of a line."""
+        return json.loads(line)['name']
+
+    @staticmethod
+    def read_lines(index_path: str) -> List[str]:
+        """Reads the (non-blank) lines of the index."""
+        with open(index_path, 'r') as index_file:
+            return [line for line in index_file if line.strip()]
+
+    @staticmethod
+    def write_lines(index_path: str, lines: List[str]):
+        """Replaces the index with the lines."""
+        Utils.write_atomically(index_path, ''.join(lines))
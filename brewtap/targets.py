@@ -0,0 +1,66 @@
+import re
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    Tuple,
+)
+
+
+@dataclass(frozen=True)
+class Target:
+    """A platform that a formula can ship a prebuilt archive for.
+
+    - name: key of the target, also the suffix of its `INPUT_TARGET_*` input (eg: `darwin_arm64`)
+    - os_block: the formula block the target's `url`/`sha256` go in (eg: `on_macos`)
+    - arch_block: the nested architecture block, `None` for archives serving every architecture
+    - asset_pattern: default release asset name, `{repo}` and `{version}` (without `v`) are filled in
+    """
+
+    name: str
+    os_block: str
+    arch_block: Optional[str]
+    asset_pattern: str
+
+    @property
+    def blocks(self) -> Tuple[str, ...]:
+        """The blocks (outermost first) wrapping the `url`/`sha256` stanzas of this target."""
+        return (self.os_block, self.arch_block) if self.arch_block else (self.os_block,)
+
+    def asset_name(self, repo: str, version: str) -> str:
+        """The default release asset name of this target."""
+        return self.asset_pattern.format(repo=repo, version=version)
+
+
+# Every target Brewtap knows about, in the order they appear in the formula. Adding a platform
+# only takes a row here (and an input in `action.yml`).
+TARGETS = (
+    Target('darwin_amd64', 'on_macos', 'on_intel', '{repo}-{version}-darwin-amd64.tar.gz'),
+    Target('darwin_arm64', 'on_macos', 'on_arm', '{repo}-{version}-darwin-arm64.tar.gz'),
+    Target('darwin_universal', 'on_macos', None, '{repo}-{version}-darwin-universal.tar.gz'),
+    Target('linux_amd64', 'on_linux', 'on_intel', '{repo}-{version}-linux-amd64.tar.gz'),
+    Target('linux_arm64', 'on_linux', 'on_arm', '{repo}-{version}-linux-arm64.tar.gz'),
+)
+TARGETS_BY_NAME = {target.name: target for target in TARGETS}
+
+RESOURCE_PREFIX = 'resource:'  # The `ArchiveChecksum.target` of a `resource` block is this prefix followed by its name
+
+# Homebrew downloads the bottle of a tag (eg: `arm64_sonoma`) from `<root_url>/<name>-<version>.<tag>.bottle.tar.gz`,
+# so bottle assets must be named this way
+BOTTLE_ASSET_PATTERN = '{name}-{version}.{tag}.bottle.tar.gz'
+BOTTLE_PREFIX = 'bottle:'  # The `ArchiveChecksum.target` of a bottle is this prefix followed by its tag
+BOTTLE_TAG_PATTERN = re.compile(r'^(all|(arm64|x86_64)_linux|(arm64_)?[a-z]+(_[a-z]+)?)$')
+# macOS releases newest first, `brew style` wants the bottles of newer releases first
+BOTTLE_MACOS_VERSIONS = ('tahoe', 'sequoia', 'sonoma', 'ventura', 'monterey', 'big_sur', 'catalina')
+
+
+def bottle_tag_order(tag: str) -> Tuple[bool, bool, int]:
+    """Sorts bottle tags like `brew style` does: Apple Silicon macOS, then Intel macOS, then Linux,
+    newer macOS releases first.
+    """
+    arm = tag.startswith('arm64_')
+    os_name = tag.removeprefix('arm64_')
+    macos_order = (
+        BOTTLE_MACOS_VERSIONS.index(os_name) if os_name in BOTTLE_MACOS_VERSIONS else len(BOTTLE_MACOS_VERSIONS)
+    )
+
+    return tag.endswith('_linux'), not arm, macos_order
@@ -1,28 +1,63 @@
+import asyncio
 import os
-from typing import Optional
+import tempfile
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    List,
+    Optional,
+    TypeVar,
+)
 
 import requests
 import woodchips
 
 from brewtap.constants import (
     GITHUB_HEADERS,
+    HTTP_POOL_SIZE,
     LOGGER_NAME,
     TIMEOUT,
 )
 
 
+T = TypeVar('T')
+
+# Every request goes through one session, so the downloads of concurrent publishes reuse their connections
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE))
+
+
+class BrewtapError(Exception):
+    """A failed step of an asynchronous publish.
+
+    The synchronous helpers bail out with `SystemExit`, which would tear down an event loop shared
+    with other publishes, so the async engine re-raises their errors as this exception instead.
+    """
+
+
 class Utils:
     @staticmethod
-    def make_github_get_request(url: str, stream: Optional[bool] = False) -> requests.Response:
-        """Make an HTTP GET request."""
+    def make_github_get_request(
+        url: str, stream: Optional[bool] = False, token: Optional[str] = None, etag: Optional[str] = None
+    ) -> requests.Response:
+        """Make an HTTP GET request.
+
+        With the `etag` of a previous response, the request is conditional: GitHub answers `304 Not Modified`
+        (which does not count against the rate limit) when the resource did not change.
+        """
         logger = woodchips.get(LOGGER_NAME)
 
         headers = GITHUB_HEADERS.copy()
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
         if stream:
             headers['Accept'] = 'application/octet-stream'
+        if etag:
+            headers['If-None-Match'] = etag
 
         try:
-            response = requests.get(
+            response = HTTP_SESSION.get(
                 url,
                 headers=headers,
                 allow_redirects=True,  # We need to allow redirects to reach various GitHub resources
@@ -36,6 +71,18 @@ class Utils:
 
         return response
 
+    @staticmethod
+    def make_get_request(url: str) -> requests.Response:
+        """Make a plain HTTP GET request, without the GitHub headers (and token)."""
+        try:
+            response = HTTP_SESSION.get(url, allow_redirects=True, timeout=TIMEOUT)
+            response.raise_for_status()
+            woodchips.get(LOGGER_NAME).debug(f'HTTP GET request made successfully to {url}.')
+        except requests.exceptions.RequestException as error:
+            raise SystemExit(error)
+
+        return response
+
     @staticmethod
     def write_file(file_path: str, content: str | bytes, mode: str = 'w'):
         """Writes content to a file."""
@@ -51,7 +98,62 @@ class Utils:
         except Exception as error:
             raise SystemExit(error)
 
+    @staticmethod
+    def write_atomically(file_path: str, content: str):
+        """Writes a file through a temporary file next to it, so it's never left half written."""
+        with tempfile.NamedTemporaryFile(
+            'w', dir=os.path.dirname(file_path) or '.', prefix='.brewtap-', delete=False
+        ) as temp_file:
+            temp_file.write(content)
+        os.replace(temp_file.name, file_path)
+
+    @staticmethod
+    def read_file(file_path: str) -> Optional[str]:
+        """Reads the content of a file, `None` if there is no such file."""
+        try:
+            with open(file_path, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as error:
+            raise SystemExit(error)
+
     @staticmethod
     def get_filename_from_path(path: str) -> str:
         """Gets the last part of a path (the filename)."""
         return path.rsplit('/', 1)[1]
+
+    @staticmethod
+    def trap_exit(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Calls a synchronous helper, turning its `SystemExit` into a `BrewtapError`."""
+        try:
+            return func(*args, **kwargs)
+        except SystemExit as error:
+            raise BrewtapError(str(error)) from error
+
+    @staticmethod
+    async def run_blocking(func: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+        """Runs a blocking helper (HTTP, hashing, file IO) in the default thread pool.
+
+        The timeout bounds how long the calling task waits, the worker thread itself is only stopped
+        by the timeouts of the helper it runs (eg: `TIMEOUT` for HTTP requests).
+        """
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(Utils.trap_exit, func, *args, **kwargs), timeout)
+        except TimeoutError:
+            raise BrewtapError(f'{func.__name__} did not finish within {timeout} seconds.')
+
+    @staticmethod
+    async def run_concurrently(*coroutines: Coroutine[Any, Any, T]) -> List[T]:
+        """Runs coroutines concurrently and returns their results in order.
+
+        As soon as one of them fails the rest are cancelled and the first error is raised as is
+        (not wrapped in an `ExceptionGroup`) so callers can handle it like any other error.
+        """
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                tasks = [task_group.create_task(coroutine) for coroutine in coroutines]
+        except BaseExceptionGroup as error_group:
+            raise error_group.exceptions[0]
+
+        return [task.result() for task in tasks]
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
+
+import requests
+import woodchips
+
+from brewtap.config import Config
+from brewtap.constants import (
+    GITHUB_BASE_URL,
+    LOGGER_NAME,
+    TIMEOUT,
+)
+from brewtap.publisher import Publisher
+from brewtap.utils import (
+    BrewtapError,
+    Utils,
+)
+
+
+# Repositories are polled every `age of their latest release / POLL_CADENCE_DIVISOR` seconds, within these bounds,
+# eg: hourly a day after a release and every 6 hours once the latest release is a week old
+MIN_POLL_INTERVAL = 5 * 60
+MAX_POLL_INTERVAL = 6 * 60 * 60
+POLL_CADENCE_DIVISOR = 24
+# Every interval is randomly stretched or shrunk by up to this ratio so polls do not line up
+POLL_JITTER = 0.2
+
+
+class ReleaseWatcher:
+    """Polls the latest release of repositories that cannot send webhooks and publishes their new tags.
+
+    Polls are conditional requests (with the `ETag` of the previous response), so unchanged releases cost no rate
+    limit. Repositories releasing often are polled often, dormant ones rarely (see `ReleaseWatcher.poll_interval`),
+    and polls are spread out by jitter and held back when the rate limit runs low. The latest tag and `ETag` of every
+    repository are kept in a JSON state file, the first poll of a repository only records its latest tag.
+    """
+
+    def __init__(self, configs: List[Config], publisher: Publisher, state_file: str):
+        self.configs = configs
+        self.publisher = publisher
+        self.state_file = state_file
+        self.state: Dict[str, Dict[str, Any]] = ReleaseWatcher.read_state(state_file)
+        self.rate_limit_reset = 0.0  # When polls may resume once the rate limit ran low
+
+    async def run(self):
+        """Polls every repository until cancelled."""
+        await self.publisher.start()
+        try:
+            await asyncio.gather(*(self.watch(config) for config in self.configs))
+        finally:
+            await self.publisher.stop()
+
+    async def watch(self, config: Config):
+        """Polls one repository, starting at a random offset so the first polls are spread out too."""
+        await asyncio.sleep(random.uniform(0, MIN_POLL_INTERVAL))
+        while True:
+            interval = await self.poll(config)
+            await asyncio.sleep(max(ReleaseWatcher.jitter(interval), self.rate_limit_reset - time.time()))
+
+    async def poll(self, config: Config) -> float:
+        """Checks the latest release of a repository, queuing its publish if it has a new tag.
+
+        Returns the number of seconds until the next poll.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+        repository = Publisher.repository(config)
+        state = self.state.setdefault(repository, {})
+
+        try:
+            response = await Utils.run_blocking(
+                Utils.make_github_get_request,
+                f'{GITHUB_BASE_URL}/repos/{config.github_owner}/{config.github_repo}/releases/latest',
+                token=config.github_token,
+                etag=state.get('etag'),
+                timeout=TIMEOUT,
+            )
+        except BrewtapError as error:
+            logger.warning(f'Could not poll the latest release of {repository}: {error}')
+            return ReleaseWatcher.poll_interval(state.get('published_at'))
+        self.check_rate_limit(response)
+
+        if response.status_code != requests.codes.not_modified:
+            release = response.json()
+            if state.get('tag') and release['tag_name'] != state['tag']:
+                logger.info(f'New release of {repository}: {release["tag_name"]}.')
+                self.publisher.enqueue(config, release['tag_name'])
+                self.publisher.wake()
+            state.update(
+                tag=release['tag_name'], etag=response.headers.get('ETag'), published_at=release['published_at']
+            )
+            Utils.write_atomically(self.state_file, json.dumps(self.state, indent=2, sort_keys=True))
+
+        return ReleaseWatcher.poll_interval(state.get('published_at'))
+
+    def check_rate_limit(self, response: requests.Response):
+        """Holds every poll back until the rate limit resets once fewer requests remain than repositories."""
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is not None and reset is not None and int(remaining) < len(self.configs):
+            woodchips.get(LOGGER_NAME).warning(f'Only {remaining} GitHub requests left, pausing polls until {reset}.')
+            self.rate_limit_reset = float(reset)
+
+    @staticmethod
+    def poll_interval(published_at: Optional[str], now: Optional[float] = None) -> float:
+        """The seconds between two polls of a repository, from the age of its latest release (its release cadence)."""
+        if not published_at:
+            return MIN_POLL_INTERVAL
+        age = (now or time.time()) - datetime.fromisoformat(published_at.replace('Z', '+00:00')).timestamp()
+
+        return min(max(age / POLL_CADENCE_DIVISOR, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+    @staticmethod
+    def jitter(interval: float) -> float:
+        return interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+    @staticmethod
+    def read_state(state_file: str) -> Dict[str, Dict[str, Any]]:
+        if not os.path.isfile(state_file):
+            return {}
+        try:
+            with open(state_file, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            raise SystemExit(f'Could not read the watch state file {state_file}: {error}')
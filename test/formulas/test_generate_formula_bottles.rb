@@ -0,0 +1,28 @@
+# typed: true
+# frozen_string_literal: true
+
+# This file was generated by Brewtap. DO NOT EDIT.
+class TestGenerateFormulaBottles < Formula
+  desc "Release scripts, binaries, and executables to github"
+  homepage "https://github.com/m-dzianishchyts/test-generate-formula-bottles"
+  url "https://github.com/m-dzianishchyts/test-generate-formula-bottles/archive/refs/tags/v0.1.0.tar.gz"
+  sha256 "0000000000000000000000000000000000000000000000000000000000000000"
+  license "MIT"
+
+  bottle do
+    root_url "https://github.com/m-dzianishchyts/test-generate-formula-bottles/releases/download/v0.1.0"
+    sha256 cellar: :any_skip_relocation, arm64_sonoma:  "3333333333333333333333333333333333333333333333333333333333333333"
+    sha256 cellar: :any_skip_relocation, arm64_ventura: "2222222222222222222222222222222222222222222222222222222222222222"
+    sha256 cellar: :any_skip_relocation, sonoma:        "4444444444444444444444444444444444444444444444444444444444444444"
+    sha256 cellar: :any_skip_relocation, ventura:       "1111111111111111111111111111111111111111111111111111111111111111"
+    sha256 cellar: :any_skip_relocation, x86_64_linux:  "0000000000000000000000000000000000000000000000000000000000000000"
+  end
+
+  depends_on "bash" => :build
+  depends_on "gcc"
+
+  def install
+    bin.install "src/secure-browser-kiosk.sh" => "secure-browser-kiosk"
+    ohai "Installed successfully."
+  end
+end
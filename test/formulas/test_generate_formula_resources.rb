@@ -0,0 +1,33 @@
+# typed: true
+# frozen_string_literal: true
+
+# This file was generated by Brewtap. DO NOT EDIT.
+class TestGenerateFormulaResources < Formula
+  desc "Release scripts, binaries, and executables to github"
+  homepage "https://github.com/m-dzianishchyts/test-generate-formula-resources"
+  url "https://github.com/m-dzianishchyts/test-generate-formula-resources/archive/refs/tags/v0.1.0.tar.gz"
+  sha256 "0000000000000000000000000000000000000000000000000000000000000000"
+  license "MIT"
+
+  on_macos do
+    on_arm do
+      url "https://github.com/m-dzianishchyts/test-generate-formula-resources/releases/download/v0.1.0/darwin-arm64.tar.gz"
+      sha256 "0000000000000000000000000000000000000000000000000000000000000000"
+    end
+  end
+
+  resource "completions" do
+    url "https://github.com/m-dzianishchyts/test-generate-formula-resources/releases/download/v0.1.0/completions.tar.gz"
+    sha256 "1111111111111111111111111111111111111111111111111111111111111111"
+  end
+
+  resource "man" do
+    url "https://example.com/man.tar.gz"
+    sha256 "2222222222222222222222222222222222222222222222222222222222222222"
+  end
+
+  def install
+    bin.install "src/secure-browser-kiosk.sh" => "secure-browser-kiosk"
+    ohai "Installed successfully."
+  end
+end
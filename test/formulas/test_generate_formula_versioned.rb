@@ -0,0 +1,22 @@
+# typed: true
+# frozen_string_literal: true
+
+# This file was generated by Brewtap. DO NOT EDIT.
+class TestGenerateFormulaVersionedAT12 < Formula
+  desc "Release scripts, binaries, and executables to github"
+  homepage "https://github.com/m-dzianishchyts/test-generate-formula-versioned"
+  url "https://github.com/m-dzianishchyts/test-generate-formula-versioned/archive/refs/tags/v1.2.3.tar.gz"
+  version "1.2.3"
+  sha256 "0000000000000000000000000000000000000000000000000000000000000000"
+  license "MIT"
+
+  keg_only :versioned_formula
+
+  depends_on "bash" => :build
+  depends_on "gcc"
+
+  def install
+    bin.install "src/secure-browser-kiosk.sh" => "secure-browser-kiosk"
+    ohai "Installed successfully."
+  end
+end
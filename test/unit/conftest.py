@@ -1,6 +1,14 @@
 import pytest
 
+from brewtap.formula_parser import FormulaParser
+
 
 @pytest.fixture
 def mock_tar_filename():
     return 'mock-file.tar.gz'
+
+
+@pytest.fixture(autouse=True)
+def clear_formula_cache():
+    """Parsed formulas are cached per process, start every test with a cold cache."""
+    FormulaParser.clear_cache()
@@ -1,17 +1,28 @@
-from unittest.mock import patch
+import asyncio
+import os
+from dataclasses import replace
+from unittest.mock import (
+    Mock,
+    patch,
+)
 
 import pytest
 
 from brewtap.app import App
+from brewtap.checksum import ArchiveChecksum
+from brewtap.config import Config
+from brewtap.fragments import ChecksumFragment
+from brewtap.tap_index import TapIndex
+from brewtap.utils import BrewtapError
 
 
-@patch('brewtap.app.SKIP_COMMIT', True)
-@patch('brewtap.app.HOMEBREW_TAP', '123')
+@patch('brewtap.config.SKIP_COMMIT', True)
+@patch('brewtap.config.HOMEBREW_TAP', '123')
 @patch('woodchips.get')
-@patch('brewtap.git.Git.setup')
-@patch('brewtap.git.Git.add')
-@patch('brewtap.git.Git.commit')
-@patch('brewtap.git.Git.push')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
 @patch('brewtap.utils.Utils.write_file')
 @patch('brewtap.formula.Formula.generate_formula_data')
 @patch('brewtap.checksum.Checksum.get_checksum', return_value=('123', 'mock-repo'))
@@ -47,13 +58,13 @@ def test_run_github_action_skip_commit(
     mock_push_formula.assert_not_called()
 
 
-@patch('brewtap.app.HOMEBREW_TAP', '123')
+@patch('brewtap.config.HOMEBREW_TAP', '123')
 @patch('brewtap.checksum.Checksum.upload_checksum_file')
 @patch('woodchips.get')
-@patch('brewtap.git.Git.setup')
-@patch('brewtap.git.Git.add')
-@patch('brewtap.git.Git.commit')
-@patch('brewtap.git.Git.push')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
 @patch('brewtap.utils.Utils.write_file')
 @patch('brewtap.formula.Formula.generate_formula_data')
 @patch('brewtap.checksum.Checksum.get_checksum', return_value=('123', 'mock-repo'))
@@ -90,15 +101,15 @@ def test_run_github_action(
     mock_push_formula.assert_called_once()
 
 
-@patch('brewtap.app.HOMEBREW_TAP', '123')
-@patch('brewtap.app.UPDATE_README_TABLE', True)
+@patch('brewtap.config.HOMEBREW_TAP', '123')
+@patch('brewtap.config.UPDATE_README_TABLE', True)
 @patch('brewtap.readme_updater.ReadmeUpdater.update_readme')
 @patch('brewtap.checksum.Checksum.upload_checksum_file')
 @patch('woodchips.get')
-@patch('brewtap.git.Git.setup')
-@patch('brewtap.git.Git.add')
-@patch('brewtap.git.Git.commit')
-@patch('brewtap.git.Git.push')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
 @patch('brewtap.utils.Utils.write_file')
 @patch('brewtap.formula.Formula.generate_formula_data')
 @patch('brewtap.checksum.Checksum.get_checksum', return_value=('123', 'mock-repo'))
@@ -137,17 +148,17 @@ def test_run_github_action_update_readme(
     mock_update_readme.assert_called_once()
 
 
-@patch('brewtap.app.HOMEBREW_TAP', '123')
-@patch('brewtap.app.TARGET_DARWIN_AMD64', True)
-@patch('brewtap.app.TARGET_DARWIN_ARM64', True)
-@patch('brewtap.app.TARGET_LINUX_AMD64', True)
-@patch('brewtap.app.TARGET_LINUX_ARM64', True)
+@patch('brewtap.config.HOMEBREW_TAP', '123')
+@patch.dict(
+    'brewtap.config.TARGET_MATRIX',
+    {'darwin_amd64': True, 'darwin_arm64': True, 'linux_amd64': True, 'linux_arm64': True},
+)
 @patch('brewtap.checksum.Checksum.upload_checksum_file')
 @patch('woodchips.get')
-@patch('brewtap.git.Git.setup')
-@patch('brewtap.git.Git.add')
-@patch('brewtap.git.Git.commit')
-@patch('brewtap.git.Git.push')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
 @patch('brewtap.utils.Utils.write_file')
 @patch('brewtap.formula.Formula.generate_formula_data')
 @patch('brewtap.checksum.Checksum.get_checksum', return_value=('123', 'mock-repo'))
@@ -185,6 +196,553 @@ def test_run_github_action_target_matrix(
     mock_push_formula.assert_called_once()
 
 
+@patch('brewtap.checksum.Checksum.upload_checksum_file')
+@patch('woodchips.get')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_batch_async')
+@patch('brewtap.git.Git.push_async')
+@patch('brewtap.utils.Utils.write_file')
+@patch('brewtap.formula.Formula.generate_formula_data')
+@patch('brewtap.checksum.Checksum.get_checksum', return_value=('123', 'mock-repo'))
+@patch('brewtap.app.App.download_archive')
+@patch('brewtap.utils.Utils.make_github_get_request')
+@patch('brewtap.app.App.check_required_env_variables')
+def test_run_batch(
+    mock_check_env_variables,
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_generate_formula,
+    mock_write_file,
+    mock_push_formula,
+    mock_commit_batch,
+    mock_add_formula,
+    mock_setup_git,
+    mock_logger,
+    mock_upload_checksum_file,
+):
+    """Tests that a batch clones, commits and pushes the tap once for all of its repositories."""
+    configs = [
+        Config(
+            github_owner='m-dzianishchyts',
+            github_repo=github_repo,
+            homebrew_owner='m-dzianishchyts',
+            homebrew_tap='homebrew-formulas',
+            version='v1.0.0',
+            work_dir=github_repo,
+        )
+        for github_repo in ('mock-repo', 'other-repo')
+    ]
+
+    asyncio.run(App.run_batch_async(configs))
+
+    assert mock_check_env_variables.call_count == 2
+    assert mock_make_github_get_request.call_count == 4
+    assert mock_generate_formula.call_count == 2
+    assert mock_upload_checksum_file.call_count == 2
+    mock_setup_git.assert_called_once()
+    mock_add_formula.assert_called_once()
+    mock_commit_batch.assert_called_once_with('homebrew-formulas', [('mock-repo', 'v1.0.0'), ('other-repo', 'v1.0.0')])
+    mock_push_formula.assert_called_once()
+
+
+def test_check_batch_configs_different_taps():
+    configs = [
+        Config(
+            github_owner='m-dzianishchyts',
+            github_repo='mock-repo',
+            homebrew_owner='m-dzianishchyts',
+            homebrew_tap=homebrew_tap,
+            github_token='123',
+            install='bin.install "mock-repo"',
+        )
+        for homebrew_tap in ('homebrew-formulas', 'homebrew-other')
+    ]
+
+    with pytest.raises(SystemExit) as error:
+        App.check_batch_configs(configs)
+
+    assert str(error.value) == 'Every repository of a batch must be published to the same "homebrew_tap".'
+
+
+@patch('brewtap.checksum.Checksum.upload_checksum_file')
+@patch('woodchips.get')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
+@patch('brewtap.utils.Utils.write_file')
+@patch('brewtap.formula.Formula.generate_formula_data')
+@patch('brewtap.checksum.Checksum.get_checksum', return_value=('123', 'mock-repo'))
+@patch('brewtap.app.App.download_archive')
+@patch('brewtap.utils.Utils.make_github_get_request')
+@patch('brewtap.app.App.check_required_env_variables')
+def test_run_github_action_additional_taps(
+    mock_check_env_variables,
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_generate_formula,
+    mock_write_file,
+    mock_push_formula,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_setup_git,
+    mock_logger,
+    mock_upload_checksum_file,
+):
+    """Tests that the release is hashed once for every tap, and that a failed tap does not stop the others."""
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        additional_taps=[
+            {'homebrew_owner': 'acme', 'homebrew_tap': 'homebrew-internal'},
+            {'homebrew_owner': 'acme', 'homebrew_tap': 'homebrew-broken'},
+        ],
+    )
+
+    async def push(homebrew_tap, homebrew_owner, github_token):
+        if homebrew_tap == 'homebrew-broken':
+            raise BrewtapError('mock-error')
+
+    mock_push_formula.side_effect = push
+
+    with pytest.raises(BrewtapError) as error:
+        asyncio.run(App.run_github_action_async(config))
+
+    assert str(error.value) == 'Could not publish to acme/homebrew-broken.'
+    assert mock_make_github_get_request.call_count == 2
+    assert mock_setup_git.call_count == 3
+    assert mock_generate_formula.call_count == 3
+    assert mock_push_formula.call_count == 3
+    # The release was hashed and published to the other taps, so its checksums are uploaded anyway
+    mock_upload_checksum_file.assert_called_once()
+
+
+@patch('brewtap.checksum.Checksum.upload_checksum_file')
+@patch('woodchips.get')
+@patch('brewtap.git.Git.head_async', return_value='mock-sha')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
+@patch('brewtap.formula.Formula.generate_formula_data', return_value='class MockRepo < Formula\nend\n')
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='mock-checksum')
+@patch('brewtap.app.App.download_archive')
+@patch('brewtap.utils.Utils.make_github_get_request')
+@patch('brewtap.app.App.check_required_env_variables')
+def test_run_github_action_resume(
+    mock_check_env_variables,
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_generate_formula,
+    mock_push_formula,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_setup_git,
+    mock_head,
+    mock_logger,
+    mock_upload_checksum_file,
+    tmp_path,
+):
+    """Tests that a re-run of a failed publish resumes from its journal instead of downloading and committing again."""
+    mock_make_github_get_request.return_value.json.return_value = {
+        'id': 1,
+        'name': 'mock-repo',
+        'tag_name': 'v1.0.0',
+        'assets': [],
+        'private': False,
+    }
+    mock_setup_git.side_effect = lambda *args: (tmp_path / 'tap' / '.git').mkdir(parents=True)
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap=str(tmp_path / 'tap'),
+        work_dir=str(tmp_path / 'work'),
+        resume=True,
+    )
+    mock_push_formula.side_effect = [BrewtapError('mock-error'), None]
+
+    with pytest.raises(BrewtapError):
+        asyncio.run(App.run_github_action_async(config))
+    asyncio.run(App.run_github_action_async(replace(config, github_token='new-token')))
+
+    assert mock_download_archive.call_count == 1
+    mock_setup_git.assert_called_once()
+    mock_commit_formula.assert_called_once()
+    assert mock_push_formula.call_count == 2
+    mock_upload_checksum_file.assert_called_once()
+    assert not (tmp_path / 'work' / '.brewtap-journal.json').exists()
+    assert (tmp_path / 'work' / 'checksum.txt').read_text() == 'mock-checksum v1.0.0.tar.gz\n'
+
+
+@patch('brewtap.checksum.Checksum.upload_checksum_file')
+@patch('woodchips.get')
+@patch('brewtap.git.Git.head_async', return_value='mock-sha')
+@patch('brewtap.git.Git.refresh_async')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
+@patch('brewtap.formula.Formula.generate_formula_data')
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='mock-checksum')
+@patch('brewtap.app.App.download_archive')
+@patch('brewtap.utils.Utils.make_github_get_request')
+@patch('brewtap.app.App.check_required_env_variables')
+def test_run_github_action_resume_failed_render(
+    mock_check_env_variables,
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_generate_formula,
+    mock_push_formula,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_setup_git,
+    mock_refresh_git,
+    mock_head,
+    mock_logger,
+    mock_upload_checksum_file,
+    tmp_path,
+):
+    """Tests that resuming a publish whose render failed refreshes the clone the failed run left instead of cloning
+    the tap into it again.
+    """
+    mock_make_github_get_request.return_value.json.return_value = {
+        'id': 1,
+        'name': 'mock-repo',
+        'tag_name': 'v1.0.0',
+        'assets': [],
+        'private': False,
+    }
+    mock_setup_git.side_effect = lambda *args: (tmp_path / 'tap' / '.git').mkdir(parents=True)
+    mock_generate_formula.side_effect = [BrewtapError('mock-error'), 'class MockRepo < Formula\nend\n']
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap=str(tmp_path / 'tap'),
+        work_dir=str(tmp_path / 'work'),
+        resume=True,
+    )
+
+    with pytest.raises(BrewtapError):
+        asyncio.run(App.run_github_action_async(config))
+    asyncio.run(App.run_github_action_async(config))
+
+    assert mock_download_archive.call_count == 1
+    mock_setup_git.assert_called_once()
+    mock_refresh_git.assert_called_once()
+    mock_commit_formula.assert_called_once()
+    mock_push_formula.assert_called_once()
+    assert not (tmp_path / 'work' / '.brewtap-journal.json').exists()
+
+
+@patch('brewtap.app.App.download_archive')
+def test_generate_checksums_fragments(mock_download_archive):
+    """Tests that archives with a checksum fragment are not downloaded, even before they are uploaded."""
+    archive_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/mock-repo-darwin-arm64.tar.gz'
+    fragment = ChecksumFragment('darwin_arm64', 'mock-repo-darwin-arm64.tar.gz', 10, 'mock-checksum')
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')
+
+    checksums = asyncio.run(
+        App.generate_checksums(
+            [('darwin_arm64', archive_url)], ('', ''), [], config, {'mock-repo-darwin-arm64.tar.gz': fragment}
+        )
+    )
+
+    assert checksums == [ArchiveChecksum('mock-repo-darwin-arm64.tar.gz', 'mock-checksum', archive_url, 'darwin_arm64')]
+    mock_download_archive.assert_not_called()
+
+
+@patch('brewtap.app.App.download_archive')
+def test_generate_checksums_fragment_other_target(mock_download_archive):
+    """Tests that a fragment hashed for another target than the archive of the same filename is rejected."""
+    archive_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/mock-repo.tar.gz'
+    fragment = ChecksumFragment('linux_amd64', 'mock-repo.tar.gz', 10, 'mock-checksum')
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')
+
+    with pytest.raises(BrewtapError) as error:
+        asyncio.run(
+            App.generate_checksums(
+                [('darwin_arm64', archive_url)], ('', ''), [], config, {'mock-repo.tar.gz': fragment}
+            )
+        )
+
+    assert str(error.value) == (
+        'The checksum fragment of mock-repo.tar.gz was hashed for the linux_amd64 target, not darwin_arm64.'
+    )
+    mock_download_archive.assert_not_called()
+
+
+def test_tap_configs():
+    """Tests that each additional tap gets the main config with its overrides applied."""
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        update_readme_table=True,
+        additional_taps=[{'homebrew_owner': 'acme', 'homebrew_tap': 'homebrew-internal', 'update_readme_table': False}],
+    )
+
+    main_tap, internal_tap = App.tap_configs(config)
+
+    assert (main_tap.homebrew_tap, main_tap.update_readme_table, main_tap.additional_taps) == (
+        'homebrew-formulas',
+        True,
+        [],
+    )
+    assert (internal_tap.homebrew_owner, internal_tap.homebrew_tap, internal_tap.update_readme_table) == (
+        'acme',
+        'homebrew-internal',
+        False,
+    )
+    assert internal_tap.install == 'bin.install "mock-repo"'
+
+
+@pytest.mark.parametrize(
+    'additional_taps, message',
+    [
+        (
+            [{'homebrew_tap': 'homebrew-internal', 'version': 'v2.0.0'}],
+            'The "additional_taps" cannot override version, the release is shared by every tap.',
+        ),
+        ([{'homebrew_tap': 'homebrew-internal', 'tap': 'x'}], 'Unknown options in the "additional_taps": tap.'),
+        (
+            [{'homebrew_owner': 'acme'}],
+            'Every tap of "additional_taps" must have a different "homebrew_tap" name.',
+        ),
+    ],
+)
+def test_tap_configs_invalid(additional_taps, message):
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        additional_taps=additional_taps,
+    )
+
+    with pytest.raises(SystemExit) as error:
+        App.tap_configs(config)
+
+    assert str(error.value) == message
+
+
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='123')
+@patch('brewtap.app.App.download_archive', side_effect=lambda url, *args: os.path.basename(url))
+@patch('brewtap.app.App.collect_release_data')
+def test_write_formulas(mock_collect_release_data, mock_download_archive, mock_get_checksum, tmp_path):
+    """Tests that every formula of a release is rendered from its own targets, each archive hashed only once."""
+    download_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0'
+    asset_names = ['cli-1.0.0-darwin-arm64.tar.gz', 'daemon-1.0.0-darwin-arm64.tar.gz', 'daemon-linux.tar.gz']
+    repository = {'name': 'mock-repo', 'private': False, 'description': 'Mock tools', 'license': None}
+    release = {
+        'tag_name': 'v1.0.0',
+        'assets': [
+            {'browser_download_url': f'{download_url}/{name}', 'url': f'{download_url}/{name}'} for name in asset_names
+        ],
+    }
+    mock_collect_release_data.return_value = (repository, release)
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap=str(tmp_path),
+        install='bin.install "mock-repo"',
+        work_dir=str(tmp_path),
+        formulas=[
+            {'name': 'cli', 'install': 'bin.install "cli"', 'targets': {'darwin_arm64': True}},
+            {
+                'name': 'daemon',
+                'install': 'bin.install "daemon"',
+                'targets': {'darwin_arm64': True, 'linux_amd64': 'daemon-linux.tar.gz'},
+            },
+        ],
+    )
+
+    async def publish():
+        repository, hashed_release = await App.hash_release(config)
+        return await App.write_formulas(config, repository, hashed_release)
+
+    cli, daemon = asyncio.run(publish())
+
+    # The source tarball is shared by both formulas
+    assert mock_download_archive.call_count == 4
+    assert cli.formula_path == os.path.join(str(tmp_path), 'Formula', 'cli.rb')
+    assert cli.release_name == ('cli', 'v1.0.0')
+    assert 'class Cli < Formula' in cli.template
+    assert 'bin.install "cli"' in cli.template
+    assert 'linux' not in cli.template
+    assert 'class Daemon < Formula' in daemon.template
+    assert f'{download_url}/daemon-linux.tar.gz' in daemon.template
+    assert len((tmp_path / 'checksum.txt').read_text().splitlines()) == 4
+
+
+@patch('brewtap.checksum.Checksum.get_checksum', side_effect=lambda filename: f'sha-{filename}')
+@patch('brewtap.app.App.download_archive', side_effect=lambda url, *args: os.path.basename(url))
+@patch('brewtap.app.App.collect_release_data')
+def test_update_tap_metadata_formulas(mock_collect_release_data, mock_download_archive, mock_get_checksum, tmp_path):
+    """Tests that the index entry of each formula of a release lists its own assets for a target they share."""
+    download_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0'
+    asset_names = ['cli-1.0.0-darwin-arm64.tar.gz', 'daemon-1.0.0-darwin-arm64.tar.gz']
+    release = {
+        'tag_name': 'v1.0.0',
+        'assets': [
+            {'browser_download_url': f'{download_url}/{name}', 'url': f'{download_url}/{name}'} for name in asset_names
+        ],
+    }
+    mock_collect_release_data.return_value = ({'name': 'mock-repo', 'private': False, 'license': None}, release)
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap=str(tmp_path),
+        work_dir=str(tmp_path),
+        update_tap_index=True,
+        formulas=[
+            {'name': name, 'install': f'bin.install "{name}"', 'targets': {'darwin_arm64': True}}
+            for name in ('cli', 'daemon')
+        ],
+    )
+
+    async def publish():
+        repository, hashed_release = await App.hash_release(config)
+        await App.update_tap_metadata(config, await App.write_formulas(config, repository, hashed_release))
+
+    asyncio.run(publish())
+
+    assert {entry['name']: entry['targets'] for entry in TapIndex.read(str(tmp_path))} == {
+        name: {
+            'darwin_arm64': {
+                'url': f'{download_url}/{name}-1.0.0-darwin-arm64.tar.gz',
+                'sha256': f'sha-{name}-1.0.0-darwin-arm64.tar.gz',
+            }
+        }
+        for name in ('cli', 'daemon')
+    }
+
+
+@pytest.mark.parametrize(
+    'formulas, message',
+    [
+        ([{'install': 'bin.install "cli"'}], 'Every formula of "formulas" must have a "name".'),
+        ([{'name': 'cli', 'homebrew_tap': 'x'}], 'Unknown options in the "formulas": homebrew_tap.'),
+        ([{'name': 'cli'}, {'name': 'cli'}], 'Every formula of "formulas" must have a different "name".'),
+    ],
+)
+def test_formula_configs_invalid(formulas, message):
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas', formulas=formulas)
+
+    with pytest.raises(SystemExit) as error:
+        App.formula_configs(config)
+
+    assert str(error.value) == message
+
+
+@pytest.mark.parametrize(
+    'tag, formula_name',
+    [
+        ('v1.2.3', 'mock-repo@1.2'),
+        ('2.0', 'mock-repo@2.0'),
+        ('release-7', 'mock-repo@7'),
+        ('latest', None),
+    ],
+)
+def test_versioned_formula_name(tag, formula_name):
+    assert App.versioned_formula_name('mock-repo', tag) == formula_name
+
+
+@patch('woodchips.get')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_batch_async')
+@patch('brewtap.git.Git.push_async')
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='123')
+@patch('brewtap.app.App.download_archive', side_effect=lambda url, *args: os.path.basename(url))
+@patch('brewtap.app.RELEASES_PAGE_SIZE', 2)
+@patch('brewtap.utils.Utils.make_github_get_request')
+@patch('brewtap.app.App.check_required_env_variables')
+def test_run_backfill(
+    mock_check_env_variables,
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_push_formula,
+    mock_commit_batch,
+    mock_add_formula,
+    mock_setup_git,
+    mock_logger,
+    tmp_path,
+):
+    """Tests that we page through the releases and publish the latest patch release of each version.
+
+    The versioned formulas are published from the assets of the unversioned one.
+    """
+    releases = [
+        {'tag_name': 'v1.3.0', 'draft': False, 'prerelease': True},
+        {'tag_name': 'v1.2.1', 'draft': False, 'prerelease': False},
+        {'tag_name': 'v1.2.0', 'draft': False, 'prerelease': False},
+        {'tag_name': 'v1.1.0', 'draft': False, 'prerelease': False},
+        {'tag_name': 'v1.0.0', 'draft': False, 'prerelease': False},
+    ]
+    download_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download'
+    for release in releases:
+        asset_url = f'{download_url}/{release["tag_name"]}/mock-repo-{release["tag_name"][1:]}-darwin-arm64.tar.gz'
+        release['assets'] = [{'browser_download_url': asset_url, 'url': asset_url}]
+    repository = {'name': 'mock-repo', 'private': False, 'description': 'Mock tool', 'license': None}
+    responses = {
+        'https://api.github.com/repos/m-dzianishchyts/mock-repo': repository,
+        'https://api.github.com/repos/m-dzianishchyts/mock-repo/releases?per_page=2&page=1': releases[0:2],
+        'https://api.github.com/repos/m-dzianishchyts/mock-repo/releases?per_page=2&page=2': releases[2:4],
+    }
+    mock_make_github_get_request.side_effect = lambda url, token: Mock(json=Mock(return_value=responses[url]))
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap=str(tmp_path),
+        install='bin.install "mock-repo"',
+        work_dir=str(tmp_path),
+        backfill_releases=2,
+        targets={'darwin_arm64': True},
+    )
+
+    asyncio.run(App.run_github_action_async(config))
+
+    mock_commit_batch.assert_called_once_with(str(tmp_path), [('mock-repo@1.2', 'v1.2.1'), ('mock-repo@1.1', 'v1.1.0')])
+    assert mock_download_archive.call_count == 4
+    formula = (tmp_path / 'Formula' / 'mock-repo@1.2.rb').read_text()
+    assert 'class MockRepoAT12 < Formula' in formula
+    assert f'{download_url}/v1.2.1/mock-repo-1.2.1-darwin-arm64.tar.gz' in formula
+    assert (tmp_path / 'Formula' / 'mock-repo@1.1.rb').exists()
+    mock_push_formula.assert_called_once()
+
+
+@patch('brewtap.git.Git.refresh_async')
+@patch('brewtap.git.Git.setup_async')
+def test_setup_tap_reuse_clone(mock_setup, mock_refresh, tmp_path):
+    """Tests that an existing clone of the tap is refreshed instead of cloned again with `reuse_clone`."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', str(tmp_path), reuse_clone=True)
+
+    asyncio.run(App.setup_tap(config))
+    (tmp_path / '.git').mkdir()
+    asyncio.run(App.setup_tap(config))
+
+    mock_setup.assert_called_once()
+    mock_refresh.assert_called_once()
+
+
 @patch('woodchips.Logger')
 def test_setup_logger(mock_logger):
     App.setup_logger()
@@ -192,10 +750,10 @@ def test_setup_logger(mock_logger):
     mock_logger.assert_called_once()
 
 
-@patch('brewtap.app.GITHUB_TOKEN', '123')
-@patch('brewtap.app.HOMEBREW_OWNER', 'm-dzianishchyts')
-@patch('brewtap.app.HOMEBREW_TAP', 'homebrew-formulas')
-@patch('brewtap.app.INSTALL', 'bin.install "src/my-script.sh" => "my-script"')
+@patch('brewtap.config.GITHUB_TOKEN', '123')
+@patch('brewtap.config.HOMEBREW_OWNER', 'm-dzianishchyts')
+@patch('brewtap.config.HOMEBREW_TAP', 'homebrew-formulas')
+@patch('brewtap.config.INSTALL', 'bin.install "src/my-script.sh" => "my-script"')
 @patch('sys.exit')
 def test_check_required_env_variables(mock_system_exit):
     App.check_required_env_variables()
@@ -215,13 +773,139 @@ def test_check_required_env_variables_missing_env_variable(mock_system_exit):
     )
 
 
+def test_check_required_env_variables_unknown_readme_table_layout():
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        readme_table_layout='columns',
+    )
+
+    with pytest.raises(SystemExit) as error:
+        App.check_required_env_variables(config)
+
+    assert str(error.value) == 'The "readme_table_layout" must be one of single, shards, pages, not "columns".'
+
+
+@pytest.mark.parametrize(
+    'options, message',
+    [
+        ({'sparse_checkout': True}, 'The "sparse_checkout" option requires a "sharded_formula_folder".'),
+        (
+            {'sparse_checkout': True, 'sharded_formula_folder': True, 'update_readme_table': True},
+            'The "sparse_checkout" option requires "update_tap_index" to update the README table, '
+            'since not every formula is checked out.',
+        ),
+    ],
+)
+def test_check_required_env_variables_sparse_checkout(options, message):
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        **options,
+    )
+
+    with pytest.raises(SystemExit) as error:
+        App.check_required_env_variables(config)
+
+    assert str(error.value) == message
+
+
+@pytest.mark.parametrize(
+    'options, message',
+    [
+        (
+            {'bottles': ['arm64_sonoma', 'Sonoma 14']},
+            'Invalid bottle tags: Sonoma 14 (eg: "arm64_sonoma", "x86_64_linux").',
+        ),
+        (
+            {'bottles': ['arm64_sonoma'], 'bottle_cellar': 'any'},
+            'The "bottle_cellar" must be a symbol (eg: ":any") or a path, not "any".',
+        ),
+    ],
+)
+def test_check_required_env_variables_bottles(options, message):
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        **options,
+    )
+
+    with pytest.raises(SystemExit) as error:
+        App.check_required_env_variables(config)
+
+    assert str(error.value) == message
+
+
+def test_build_archive_urls_bottles():
+    """Tests that bottles are looked up under the asset names Homebrew downloads them by."""
+    config = Config(
+        'm-dzianishchyts',
+        'mock-repo',
+        'm-dzianishchyts',
+        'homebrew-formulas',
+        targets={'darwin_arm64': True},
+        bottles=['arm64_sonoma', 'x86_64_linux'],
+    )
+
+    archive_urls, _ = App.build_archive_urls(config, {'private': False}, 'v1.0.0')
+
+    download_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0'
+    assert list(archive_urls) == ['default', 'darwin_arm64', 'bottle:arm64_sonoma', 'bottle:x86_64_linux']
+    assert archive_urls['bottle:arm64_sonoma'] == f'{download_url}/mock-repo-1.0.0.arm64_sonoma.bottle.tar.gz'
+    assert archive_urls['bottle:x86_64_linux'] == f'{download_url}/mock-repo-1.0.0.x86_64_linux.bottle.tar.gz'
+
+
+@pytest.mark.parametrize(
+    'formula_name, shard',
+    [
+        ('brewtap', 'b'),
+        ('Brewtap', 'b'),
+        ('libyaml', 'lib'),
+        ('lib', 'lib'),
+        ('7zip', '7'),
+    ],
+)
+def test_formula_shard(formula_name, shard):
+    assert App.formula_shard(formula_name) == shard
+
+
+def test_sparse_paths():
+    """Tests that a sparse checkout covers the shard of the formula, and the README pages when they are updated."""
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        sharded_formula_folder=True,
+        sparse_checkout=True,
+        update_readme_table=True,
+        readme_table_layout='pages',
+        update_tap_index=True,
+    )
+
+    assert App.sparse_paths(config) == [os.path.join('Formula', 'm'), 'docs']
+    assert App.sparse_paths(Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')) is None
+
+
 @patch('brewtap.utils.Utils.write_file')
 @patch('brewtap.utils.Utils.make_github_get_request')
 def test_download_public_archive(mock_make_github_get_request, mock_write_file):
     url = 'https://github.com/repos/m-dzianishchyts/brewtap/archive/refs/tags/v0.1.0.tar.gz'
     App.download_archive(url, True)
 
-    mock_make_github_get_request.assert_called_once_with(url=url, stream=True)
+    mock_make_github_get_request.assert_called_once_with(url=url, stream=True, token=None)
     mock_write_file.assert_called_once()  # TODO: Assert `called_with` here instead
 
 
@@ -231,5 +915,239 @@ def test_download_private_archive(mock_make_github_get_request, mock_write_file)
     url = 'https://api.github.com/repos/m-dzianishchyts/brewtap/tarball/v0.1.0'
     App.download_archive(url, False)
 
-    mock_make_github_get_request.assert_called_once_with(url=url, stream=False)
+    mock_make_github_get_request.assert_called_once_with(url=url, stream=False, token=None)
     mock_write_file.assert_called_once()  # TODO: Assert `called_with` here instead
+
+
+@patch('brewtap.utils.Utils.write_file')
+@patch('brewtap.utils.Utils.make_get_request')
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_download_external_archive(mock_make_github_get_request, mock_make_get_request, mock_write_file):
+    """Tests that files hosted outside of GitHub are downloaded without the GitHub token."""
+    url = 'https://example.com/mock-repo-completions.tar.gz'
+    App.download_archive(url, True, '123')
+
+    mock_make_get_request.assert_called_once_with(url)
+    mock_make_github_get_request.assert_not_called()
+
+
+def test_build_archive_urls_resources():
+    """Tests that resources are resolved against the release assets, unless they are URLs."""
+    config = Config(
+        'm-dzianishchyts',
+        'mock-repo',
+        'm-dzianishchyts',
+        'homebrew-formulas',
+        resources={'completions': '{repo}-{version}-completions.tar.gz', 'man': 'https://example.com/man.tar.gz'},
+    )
+
+    archive_urls, _ = App.build_archive_urls(config, {'private': False}, 'v1.0.0')
+
+    assert archive_urls['resource:completions'] == (
+        'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/mock-repo-1.0.0-completions.tar.gz'
+    )
+    assert archive_urls['resource:man'] == 'https://example.com/man.tar.gz'
+
+
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='mock-checksum')
+@patch('brewtap.app.App.download_archive', return_value='man.tar.gz')
+def test_generate_checksums_external_resource(mock_download_archive, mock_get_checksum):
+    """Tests that archives hosted outside of the release are downloaded as is instead of being left out."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')
+    url = 'https://example.com/man.tar.gz'
+
+    checksums = asyncio.run(App.generate_checksums([('resource:man', url)], ('', ''), [], config))
+
+    assert checksums == [ArchiveChecksum('man.tar.gz', 'mock-checksum', url, 'resource:man')]
+    assert mock_download_archive.call_args.args[0] == url
+
+
+@patch('brewtap.app.App.download_archive')
+def test_generate_checksums_missing_resource(mock_download_archive):
+    """Tests that a resource missing from the release assets fails instead of being left out of the formula."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')
+    url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/man.tar.gz'
+
+    with pytest.raises(BrewtapError) as error:
+        asyncio.run(App.generate_checksums([('resource:man', url)], ('', ''), [], config))
+
+    assert str(error.value) == 'Resources missing from the release assets: man.tar.gz.'
+    mock_download_archive.assert_not_called()
+
+
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
+@patch('brewtap.checksum.Checksum.upload_checksum_file')
+@patch('brewtap.utils.Utils.write_file')
+@patch('brewtap.checksum.Checksum.get_checksum', side_effect=lambda filename: f'sha-of-{filename}')
+@patch('brewtap.app.App.download_archive', side_effect=lambda url, *args: url.rsplit('/', 1)[1])
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_run_github_action_async_checksum_order(
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_write_file,
+    mock_upload_checksum_file,
+    mock_push_formula,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_setup_git,
+):
+    """Tests that archives hashed concurrently still land in `checksum.txt` in target order."""
+    base_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0'
+    mock_make_github_get_request.return_value.json.return_value = {
+        'name': 'mock-repo',
+        'private': False,
+        'tag_name': 'v1.0.0',
+        'assets': [
+            {
+                'url': f'{base_url}/mock-repo-1.0.0-linux-amd64.tar.gz',
+                'browser_download_url': f'{base_url}/mock-repo-1.0.0-linux-amd64.tar.gz',
+            },
+            {
+                'url': f'{base_url}/mock-repo-1.0.0-darwin-arm64.tar.gz',
+                'browser_download_url': f'{base_url}/mock-repo-1.0.0-darwin-arm64.tar.gz',
+            },
+        ],
+    }
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        targets={'darwin_arm64': True, 'linux_amd64': True},
+        skip_commit=True,
+    )
+
+    asyncio.run(App.run_github_action_async(config))
+
+    checksum_file_call = mock_write_file.call_args_list[0]
+    assert checksum_file_call.args == (
+        'checksum.txt',
+        'sha-of-v1.0.0.tar.gz v1.0.0.tar.gz\n'
+        'sha-of-mock-repo-1.0.0-darwin-arm64.tar.gz mock-repo-1.0.0-darwin-arm64.tar.gz\n'
+        'sha-of-mock-repo-1.0.0-linux-amd64.tar.gz mock-repo-1.0.0-linux-amd64.tar.gz\n',
+    )
+    assert mock_write_file.call_args_list[1].args[0] == 'homebrew-formulas/Formula/mock-repo.rb'
+    mock_setup_git.assert_awaited_once()
+    mock_commit_formula.assert_awaited_once_with('homebrew-formulas', 'mock-repo', 'v1.0.0')
+    mock_push_formula.assert_not_called()
+    mock_upload_checksum_file.assert_not_called()
+
+
+@patch('woodchips.Logger')
+@patch('brewtap.app.App.run_github_action_async', side_effect=BrewtapError('mock-error'))
+def test_run_github_action_error(mock_run_github_action_async, mock_logger):
+    """Tests that the synchronous wrapper exits with the error of the failed step."""
+    with pytest.raises(SystemExit) as error:
+        App.run_github_action()
+
+    assert str(error.value) == 'mock-error'
+
+
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.utils.Utils.write_file')
+@patch('brewtap.formula.Formula.generate_formula_data')
+@patch('brewtap.utils.Utils.read_file')
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='1' * 64)
+@patch('brewtap.app.App.download_archive', return_value='v1.0.0.tar.gz')
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_run_github_action_async_patch_formula(
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_read_file,
+    mock_generate_formula,
+    mock_write_file,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_setup_git,
+):
+    """Tests that patch mode rewrites the existing formula instead of rendering it again."""
+    mock_make_github_get_request.return_value.json.return_value = {
+        'name': 'mock-repo',
+        'private': False,
+        'tag_name': 'v1.0.0',
+        'assets': [],
+    }
+    mock_read_file.return_value = 'class MockRepo < Formula\n  url "old-url"\n  sha256 "old-checksum"\nend\n'
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        patch_formula=True,
+        skip_commit=True,
+    )
+
+    asyncio.run(App.run_github_action_async(config))
+
+    mock_read_file.assert_called_once_with('homebrew-formulas/Formula/mock-repo.rb')
+    mock_generate_formula.assert_not_called()
+    assert mock_write_file.call_args_list[1].args == (
+        'homebrew-formulas/Formula/mock-repo.rb',
+        'class MockRepo < Formula\n'
+        '  url "https://github.com/m-dzianishchyts/mock-repo/archive/refs/tags/v1.0.0.tar.gz"\n'
+        f'  sha256 "{"1" * 64}"\n'
+        'end\n',
+        'w',
+    )
+
+
+@patch('brewtap.tap_index.TapIndex.update')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.utils.Utils.write_file')
+@patch('brewtap.formula.Formula.generate_formula_data', return_value='mock-formula')
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='1' * 64)
+@patch('brewtap.app.App.download_archive', return_value='v1.0.0.tar.gz')
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_run_github_action_async_update_tap_index(
+    mock_make_github_get_request,
+    mock_download_archive,
+    mock_get_checksum,
+    mock_generate_formula,
+    mock_write_file,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_setup_git,
+    mock_update_tap_index,
+):
+    """Tests that the tap index gets the published formula along with its release's version and checksums."""
+    mock_make_github_get_request.return_value.json.return_value = {
+        'name': 'mock-repo',
+        'private': False,
+        'tag_name': 'v1.0.0',
+        'assets': [],
+    }
+    config = Config(
+        github_owner='m-dzianishchyts',
+        github_repo='mock-repo',
+        homebrew_owner='m-dzianishchyts',
+        homebrew_tap='homebrew-formulas',
+        github_token='123',
+        install='bin.install "mock-repo"',
+        update_tap_index=True,
+        skip_commit=True,
+    )
+
+    asyncio.run(App.run_github_action_async(config))
+
+    mock_update_tap_index.assert_called_once()
+    homebrew_tap, formula_path, formula, version, checksums, formula_folder = mock_update_tap_index.call_args.args
+    assert (homebrew_tap, formula_path, formula, version) == (
+        'homebrew-formulas',
+        'homebrew-formulas/Formula/mock-repo.rb',
+        'mock-formula',
+        'v1.0.0',
+    )
+    assert [checksum.checksum for checksum in checksums] == ['1' * 64]
@@ -0,0 +1,132 @@
+import asyncio
+from typing import Optional
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+import pytest
+
+from brewtap.app import App
+from brewtap.asset_watcher import AssetWatcher
+from brewtap.checksum import ArchiveChecksum
+from brewtap.config import Config
+from brewtap.utils import BrewtapError
+
+
+DOWNLOAD_URL = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/'
+CONFIG = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas', github_token='123')
+
+
+def mock_asset(name: str, state: str = 'uploaded'):
+    return {
+        'name': name,
+        'state': state,
+        'browser_download_url': f'{DOWNLOAD_URL}{name}',
+        'url': f'https://api.github.com/repos/m-dzianishchyts/mock-repo/releases/assets/{name}',
+    }
+
+
+def mock_response(assets, status_code: int = 200, next_url: Optional[str] = None):
+    response = Mock(status_code=status_code, headers={'ETag': '"etag-1"'}, links={})
+    if next_url:
+        response.links['next'] = {'url': next_url, 'rel': 'next'}
+    response.json.return_value = assets
+
+    return response
+
+
+@patch('brewtap.asset_watcher.ASSET_POLL_INTERVAL', 0)
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_wait(mock_make_github_get_request):
+    """Tests that uploaded assets are answered at once and the others as soon as a poll finds them uploaded."""
+    release = {'id': 1, 'assets': [mock_asset('a.tar.gz'), mock_asset('b.tar.gz', state='new')]}
+    mock_make_github_get_request.side_effect = [
+        mock_response(release['assets']),
+        mock_response([], status_code=304),
+        mock_response([mock_asset('a.tar.gz'), mock_asset('b.tar.gz')]),
+    ]
+
+    async def wait():
+        watcher = AssetWatcher(CONFIG, release, 60)
+        return await asyncio.gather(watcher.wait(f'{DOWNLOAD_URL}a.tar.gz'), watcher.wait(f'{DOWNLOAD_URL}b.tar.gz'))
+
+    uploaded_a, uploaded_b = asyncio.run(wait())
+
+    assert (uploaded_a['state'], uploaded_b['state']) == ('uploaded', 'uploaded')
+    assert mock_make_github_get_request.call_count == 3
+    assert mock_make_github_get_request.call_args.kwargs['etag'] == '"etag-1"'
+
+
+@patch('brewtap.asset_watcher.ASSET_POLL_INTERVAL', 0)
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_wait_pages(mock_make_github_get_request):
+    """Tests that every page of the asset list is read, and the unchanged pages are reused on the next poll."""
+    assets_url = 'https://api.github.com/repos/m-dzianishchyts/mock-repo/releases/1/assets'
+    release = {'id': 1, 'assets': [mock_asset('b.tar.gz', state='new')]}
+    mock_make_github_get_request.side_effect = [
+        mock_response([mock_asset('a.tar.gz')], next_url=f'{assets_url}?per_page=100&page=2'),
+        mock_response([mock_asset('b.tar.gz', state='new')]),
+        mock_response([], status_code=304),
+        mock_response([mock_asset('b.tar.gz')]),
+    ]
+
+    async def wait():
+        watcher = AssetWatcher(CONFIG, release, 60)
+        return await watcher.wait(f'{DOWNLOAD_URL}b.tar.gz'), watcher.assets
+
+    uploaded_b, assets = asyncio.run(wait())
+
+    assert uploaded_b['state'] == 'uploaded'
+    assert sorted(assets) == [f'{DOWNLOAD_URL}a.tar.gz', f'{DOWNLOAD_URL}b.tar.gz']
+    assert [call.args[0] for call in mock_make_github_get_request.call_args_list] == [
+        f'{assets_url}?per_page=100',
+        f'{assets_url}?per_page=100&page=2',
+    ] * 2
+
+
+@patch('brewtap.asset_watcher.ASSET_POLL_INTERVAL', 0)
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_wait_poller_failure(mock_make_github_get_request):
+    """Tests that an unexpected error of the poller fails every waiting archive instead of leaving it waiting."""
+    mock_make_github_get_request.return_value.json.side_effect = ValueError('Expecting value')
+
+    async def wait():
+        watcher = AssetWatcher(CONFIG, {'id': 1, 'assets': []}, 60)
+        return await asyncio.gather(
+            watcher.wait(f'{DOWNLOAD_URL}a.tar.gz'), watcher.wait(f'{DOWNLOAD_URL}b.tar.gz'), return_exceptions=True
+        )
+
+    errors = asyncio.run(asyncio.wait_for(wait(), 5))
+
+    assert [str(error) for error in errors] == ['Could not list the assets of the release: Expecting value'] * 2
+
+
+@patch('brewtap.asset_watcher.ASSET_POLL_INTERVAL', 0)
+@patch('brewtap.utils.Utils.make_github_get_request', return_value=mock_response([]))
+def test_wait_deadline(mock_make_github_get_request):
+    """Tests that an asset not uploaded within the deadline fails the wait."""
+    watcher = AssetWatcher(CONFIG, {'id': 1, 'assets': []}, 0.05)
+
+    with pytest.raises(BrewtapError, match='a.tar.gz was not uploaded'):
+        asyncio.run(watcher.wait(f'{DOWNLOAD_URL}a.tar.gz'))
+
+
+@patch('brewtap.asset_watcher.ASSET_POLL_INTERVAL', 0)
+@patch('brewtap.checksum.Checksum.get_checksum', return_value='mock-checksum')
+@patch('brewtap.app.App.download_archive', return_value='a.tar.gz')
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_generate_checksums_waits_for_assets(mock_make_github_get_request, mock_download_archive, mock_get_checksum):
+    """Tests that archives still being uploaded are hashed once uploaded instead of being left out."""
+    archive_url = f'{DOWNLOAD_URL}a.tar.gz'
+    mock_make_github_get_request.return_value = mock_response([mock_asset('a.tar.gz')])
+
+    async def generate_checksums():
+        watcher = AssetWatcher(CONFIG, {'id': 1, 'assets': []}, 60)
+        return await App.generate_checksums([('darwin_arm64', archive_url)], ('', ''), [], CONFIG, None, watcher)
+
+    checksums = asyncio.run(generate_checksums())
+
+    assert checksums == [ArchiveChecksum('a.tar.gz', 'mock-checksum', archive_url, 'darwin_arm64')]
+    mock_download_archive.assert_called_once()
+    assert mock_download_archive.call_args.args[0] == mock_asset('a.tar.gz')['url']
@@ -38,7 +38,7 @@ def test_get_checksum_process_error(mock_subprocess, mock_tar_filename):
         Checksum.get_checksum(mock_tar_filename)
 
 
-@patch('requests.post')
+@patch('brewtap.utils.HTTP_SESSION.post')
 @patch('brewtap.utils.Utils.make_github_get_request')
 def test_upload_checksum_file(mock_make_github_get_request, mock_post_request):
     """Tests that we make the GET call to retrieve the latest release and the
@@ -50,7 +50,7 @@ def test_upload_checksum_file(mock_make_github_get_request, mock_post_request):
         mock_post_request.assert_called_once()
 
 
-@patch('requests.post', side_effect=requests.exceptions.RequestException('mock-error'))
+@patch('brewtap.utils.HTTP_SESSION.post', side_effect=requests.exceptions.RequestException('mock-error'))
 @patch('brewtap.utils.Utils.make_github_get_request')
 def test_upload_checksum_file_error_on_upload(mock_make_github_get_request, mock_post_request):
     """Tests that we exit on error to upload checksum.txt file."""
@@ -61,3 +61,15 @@ def test_upload_checksum_file_error_on_upload(mock_make_github_get_request, mock
             mock_post_request.assert_called_once()
 
     assert 'mock-error' == str(error.value)
+
+
+@patch('brewtap.utils.HTTP_SESSION.post')
+def test_upload_checksum_file_upload_url(mock_post_request):
+    """Tests that we upload to the endpoint the release links to (eg: of a GitHub Enterprise server)."""
+    release = {'id': 1, 'upload_url': 'https://github.example.com/api/uploads/repos/o/r/releases/1/assets{?name,label}'}
+    with patch('builtins.open', mock_open()):
+        Checksum.upload_checksum_file(release)
+
+    assert mock_post_request.call_args.args[0] == (
+        'https://github.example.com/api/uploads/repos/o/r/releases/1/assets?name=checksum.txt'
+    )
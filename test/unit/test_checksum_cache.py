@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from brewtap.app import App
+from brewtap.checksum_cache import (
+    ChecksumCache,
+    ChecksumCacheServer,
+)
+from brewtap.config import Config
+from brewtap.utils import HTTP_SESSION
+
+
+URL = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/mock-repo-darwin-arm64.tar.gz'
+CHECKSUM = 'a' * 64
+
+
+@pytest.fixture
+def cache_server(tmp_path):
+    """A local stand-in of a shared checksum cache, storing its entries in a temporary folder."""
+    server = ChecksumCacheServer(('127.0.0.1', 0), str(tmp_path), token='mock-token')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_cache_round_trip(cache_server):
+    """Tests that a stored checksum is found by the next runner, for the same archive only."""
+    cache = ChecksumCache(cache_server, token='mock-token')
+    key = ChecksumCache.key(URL, {'id': 1, 'size': 10, 'updated_at': '2024-01-01T00:00:00Z'})
+
+    assert cache.get(key, URL) is None
+
+    cache.put(key, URL, CHECKSUM, 10)
+
+    assert cache.get(key, URL, 10) == CHECKSUM
+    assert cache.get(key, URL, 11) is None
+    assert cache.get(key, URL.replace('darwin', 'linux')) is None
+    assert cache.get(ChecksumCache.key(URL, {'id': 2, 'size': 10}), URL) is None
+
+
+def test_cache_read_only(cache_server):
+    """Tests that read-only clients, and clients without the token of the server, do not store checksums."""
+    key = ChecksumCache.key(URL)
+
+    ChecksumCache(cache_server, read_only=True, token='mock-token').put(key, URL, CHECKSUM)
+    ChecksumCache(cache_server).put(key, URL, CHECKSUM)
+
+    assert ChecksumCache(cache_server).get(key, URL) is None
+
+
+def test_cache_server_rejects_invalid_entries(cache_server):
+    key = ChecksumCache.key(URL)
+    headers = {'Authorization': 'Bearer mock-token'}
+
+    response = HTTP_SESSION.put(f'{cache_server}/checksums/{key}', json={'key': key, 'sha256': 'abc'}, headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_cache_unreachable():
+    """Tests that an unreachable cache counts as a miss."""
+    assert ChecksumCache('http://127.0.0.1:9').get(ChecksumCache.key(URL), URL) is None
+
+
+@patch('brewtap.checksum.Checksum.get_checksum', return_value=CHECKSUM)
+@patch('brewtap.app.App.download_archive')
+def test_checksum_archive_cached(mock_download_archive, mock_get_checksum, cache_server):
+    """Tests that an archive hashed by a previous runner is not downloaded again."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')
+    cache = ChecksumCache(cache_server, token='mock-token')
+    asset = {'id': 1, 'size': 10, 'url': 'https://api.github.com/repos/m-dzianishchyts/mock-repo/releases/assets/1'}
+
+    for _ in range(2):
+        checksum = asyncio.run(App._checksum_archive('darwin_arm64', URL, asset['url'], config, cache, asset))
+        assert checksum.checksum == CHECKSUM
+
+    mock_download_archive.assert_called_once()
@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from brewtap.config import Config
+
+
+def test_from_batch_file(tmp_path):
+    """Tests that every repository of a batch file gets the shared options and its own work directory."""
+    batch_file = tmp_path / 'batch.json'
+    batch_file.write_text(
+        json.dumps(
+            {
+                'homebrew_owner': 'm-dzianishchyts',
+                'homebrew_tap': 'homebrew-formulas',
+                'github_token': '123',
+                'install': 'bin.install "tool"',
+                'repositories': [
+                    {'github_owner': 'm-dzianishchyts', 'github_repo': 'foo', 'version': 'v1.0.0'},
+                    {
+                        'github_owner': 'm-dzianishchyts',
+                        'github_repo': 'bar',
+                        'install': 'bin.install "bar"',
+                        'targets': {'darwin_arm64': True},
+                    },
+                ],
+            }
+        )
+    )
+
+    foo, bar = Config.from_batch_file(str(batch_file))
+
+    assert (foo.github_repo, foo.homebrew_tap, foo.version, foo.install) == (
+        'foo',
+        'homebrew-formulas',
+        'v1.0.0',
+        'bin.install "tool"',
+    )
+    assert (bar.install, bar.targets, bar.github_token) == ('bin.install "bar"', {'darwin_arm64': True}, '123')
+    assert (foo.work_dir, bar.work_dir) == ('foo', 'bar')
+
+
+def test_from_batch_file_unknown_option(tmp_path):
+    batch_file = tmp_path / 'batch.json'
+    batch_file.write_text(json.dumps({'repositories': [{'github_owner': 'm-dzianishchyts', 'github_rpeo': 'foo'}]}))
+
+    with pytest.raises(SystemExit) as error:
+        Config.from_batch_file(str(batch_file))
+
+    assert str(error.value) == f'Unknown options in the batch file {batch_file}: github_rpeo.'
+
+
+def test_from_batch_file_missing():
+    batch_file = os.path.join('test', 'missing.json')
+
+    with pytest.raises(SystemExit) as error:
+        Config.from_batch_file(batch_file)
+
+    assert str(error.value).startswith(f'Could not read the batch file {batch_file}:')
+
+
+def test_parse_json_list():
+    assert Config.parse_json_list('', 'additional_taps') == []
+    assert Config.parse_json_list('[{"homebrew_tap": "homebrew-internal"}]', 'additional_taps') == [
+        {'homebrew_tap': 'homebrew-internal'}
+    ]
+
+
+@pytest.mark.parametrize('additional_taps', ['homebrew-internal', '{"homebrew_tap": "homebrew-internal"}'])
+def test_parse_json_list_invalid(additional_taps):
+    with pytest.raises(SystemExit):
+        Config.parse_json_list(additional_taps, 'additional_taps')
+
+
+def test_parse_json_object():
+    assert Config.parse_json_object('', 'resources') == {}
+    assert Config.parse_json_object('{"man": "man.tar.gz"}', 'resources') == {'man': 'man.tar.gz'}
+
+
+@pytest.mark.parametrize('resources', ['man.tar.gz', '["man.tar.gz"]', '{"man": 1}', '{"man": ""}'])
+def test_parse_json_object_invalid(resources):
+    with pytest.raises(SystemExit):
+        Config.parse_json_object(resources, 'resources')
@@ -2,6 +2,7 @@ import inspect
 import os
 from unittest.mock import patch
 
+from brewtap.checksum import ArchiveChecksum
 from brewtap.formula import Formula
 
 
@@ -80,13 +81,12 @@ def test_generate_formula():
         repository=repository,
         version='1.1.1',
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -163,13 +163,12 @@ def test_generate_formula_no_article_description():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -203,13 +202,12 @@ def test_generate_formula_formula_name_starts_description():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -241,13 +239,12 @@ def test_generate_formula_no_depends_on():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -279,13 +276,12 @@ def test_generate_formula_no_test():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -298,10 +294,6 @@ def test_generate_formula_no_test():
     assert 'test do' not in formula
 
 
-@patch('brewtap.formula.TARGET_DARWIN_AMD64', True)
-@patch('brewtap.formula.TARGET_DARWIN_ARM64', True)
-@patch('brewtap.formula.TARGET_LINUX_AMD64', True)
-@patch('brewtap.formula.TARGET_LINUX_ARM64', True)
 def test_generate_formula_complete_matrix():
     """Tests that we generate the formula content correctly when we provide a complete OS matrix.
 
@@ -321,41 +313,36 @@ def test_generate_formula_complete_matrix():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                'test-generate-formula-complete-matrix.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-generate-formula-complete-matrix',  # noqa
-                    'type': 'default',
-                },
-            },
-            {
-                'test-formula-0.1.0-darwin-amd64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-amd64.tar.gz',  # noqa
-                    'type': 'darwin_amd64',
-                },
-            },
-            {
-                'test-formula-0.1.0-darwin-arm64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
-                    'type': 'darwin_arm64',
-                },
-            },
-            {
-                'test-formula-0.1.0-linux-amd64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
-                    'type': 'linux_amd64',
-                },
-            },
-            {
-                'test-formula-0.1.0-linux-arm64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
-                    'type': 'linux_arm64',
-                },
-            },
+            ArchiveChecksum(
+                filename='test-generate-formula-complete-matrix.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-generate-formula-complete-matrix',  # noqa
+                target='default',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-amd64.tar.gz',  # noqa
+                target='darwin_amd64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
+                target='darwin_arm64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
+                target='linux_amd64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
+                target='linux_arm64',
+            ),
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -373,8 +360,6 @@ def test_generate_formula_complete_matrix():
     assert 'on_arm' in formula
 
 
-@patch('brewtap.formula.TARGET_DARWIN_AMD64', True)
-@patch('brewtap.formula.TARGET_DARWIN_ARM64', True)
 def test_generate_formula_darwin_matrix():
     """Tests that we generate the formula content correctly when we provide a Darwin matrix.
 
@@ -394,27 +379,24 @@ def test_generate_formula_darwin_matrix():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                'test-generate-formula-darwin-matrix.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-generate-formula-darwin-matrix.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            },
-            {
-                'test-formula-0.1.0-darwin-amd64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-amd64.tar.gz',  # noqa
-                    'type': 'darwin_amd64',
-                },
-            },
-            {
-                'test-formula-0.1.0-darwin-arm64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
-                    'type': 'darwin_arm64',
-                },
-            },
+            ArchiveChecksum(
+                filename='test-generate-formula-darwin-matrix.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-generate-formula-darwin-matrix.tar.gz',  # noqa
+                target='default',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-amd64.tar.gz',  # noqa
+                target='darwin_amd64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
+                target='darwin_arm64',
+            ),
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -430,8 +412,6 @@ def test_generate_formula_darwin_matrix():
     assert 'on_arm' in formula
 
 
-@patch('brewtap.formula.TARGET_LINUX_AMD64', True)
-@patch('brewtap.formula.TARGET_LINUX_ARM64', True)
 def test_generate_formula_linux_matrix():
     """Tests that we generate the formula content correctly when we provide a Linux matrix.
 
@@ -451,27 +431,24 @@ def test_generate_formula_linux_matrix():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                'test-generate-formula-linux-matrix.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-generate-formula-linux-matrix.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            },
-            {
-                'test-formula-0.1.0-linux-amd64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
-                    'type': 'linux_amd64',
-                },
-            },
-            {
-                'test-formula-0.1.0-linux-arm64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
-                    'type': 'linux_arm64',
-                },
-            },
+            ArchiveChecksum(
+                filename='test-generate-formula-linux-matrix.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-generate-formula-linux-matrix.tar.gz',  # noqa
+                target='default',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
+                target='linux_amd64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
+                target='linux_arm64',
+            ),
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -487,8 +464,6 @@ def test_generate_formula_linux_matrix():
     assert 'on_arm' in formula
 
 
-@patch('brewtap.formula.TARGET_DARWIN_ARM64', True)
-@patch('brewtap.formula.TARGET_LINUX_AMD64', True)
 def test_one_of_each_matrix():
     """Tests that we generate the formula content correctly when we specify only one arch from each OS.
     This test helps ensure that we properly spaces the `on_` functions correctly when only one is present.
@@ -509,27 +484,24 @@ def test_one_of_each_matrix():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            },
-            {
-                'test-formula-0.1.0-darwin-arm64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
-                    'type': 'darwin_arm64',
-                },
-            },
-            {
-                'test-formula-0.1.0-linux-amd64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
-                    'type': 'linux_amd64',
-                },
-            },
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
+                target='darwin_arm64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
+                target='linux_amd64',
+            ),
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -545,6 +517,59 @@ def test_one_of_each_matrix():
     assert 'on_arm' in formula
 
 
+def test_generate_formula_universal_matrix():
+    """Tests that we generate the formula content correctly when a target serves every architecture of its OS.
+    Such targets (eg: `darwin_universal`) have their `url`/`sha256` placed directly in the OS block.
+
+    NOTE: See docstring in `record_formula` for more details on how recording formulas works.
+    """
+    formula_filename = f'{inspect.stack()[0][3]}.rb'
+    mock_repo_name = formula_filename.replace('_', '-').replace('.rb', '')
+    mock_tar_url = f'https://github.com/{USERNAME}/{mock_repo_name}/archive/refs/tags/v0.1.0.tar.gz'
+
+    repository = {
+        'description': DESCRIPTION,
+        'license': LICENSE,
+    }
+
+    formula = Formula.generate_formula_data(
+        owner=USERNAME,
+        repo_name=mock_repo_name,
+        repository=repository,
+        checksums=[
+            ArchiveChecksum(
+                filename='test-generate-formula-universal-matrix.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-generate-formula-universal-matrix.tar.gz',  # noqa
+                target='default',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
+                target='linux_arm64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-universal.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-universal.tar.gz',  # noqa
+                target='darwin_universal',
+            ),
+        ],
+        install=INSTALL,
+        tar_url=mock_tar_url,
+        depends_on=None,
+        test=None,
+    )
+
+    record_formula(formula_path, formula_filename, formula)
+
+    # Blocks follow the order of `TARGETS`, not the order the checksums were resolved in
+    assert formula.index('on_macos') < formula.index('on_linux')
+    assert 'on_intel' not in formula
+    assert 'on_arm' in formula
+
+
 @patch.dict(os.environ, {'INPUT_TARGET_DARWIN_AMD64': 'false'})
 @patch.dict(os.environ, {'INPUT_TARGET_DARWIN_ARM64': 'false'})
 @patch.dict(os.environ, {'INPUT_TARGET_LINUX_AMD64': 'false'})
@@ -569,13 +594,12 @@ def test_generate_formula_string_false_configs():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -609,13 +633,12 @@ def test_generate_formula_empty_fields():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -629,10 +652,6 @@ def test_generate_formula_empty_fields():
     assert 'license' not in formula
 
 
-@patch('brewtap.formula.TARGET_DARWIN_AMD64', True)
-@patch('brewtap.formula.TARGET_DARWIN_ARM64', True)
-@patch('brewtap.formula.TARGET_LINUX_AMD64', True)
-@patch('brewtap.formula.TARGET_LINUX_ARM64', True)
 def test_generate_formula_download_strategy():
     """Tests that we generate the formula content correctly when there a custom download strategy specified.
 
@@ -652,41 +671,36 @@ def test_generate_formula_download_strategy():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            },
-            {
-                'test-formula-0.1.0-darwin-amd64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-amd64.tar.gz',  # noqa
-                    'type': 'darwin_amd64',
-                },
-            },
-            {
-                'test-formula-0.1.0-darwin-arm64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
-                    'type': 'darwin_arm64',
-                },
-            },
-            {
-                'test-formula-0.1.0-linux-amd64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
-                    'type': 'linux_amd64',
-                },
-            },
-            {
-                'test-formula-0.1.0-linux-arm64.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
-                    'type': 'linux_arm64',
-                },
-            },
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-amd64.tar.gz',  # noqa
+                target='darwin_amd64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
+                target='darwin_arm64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
+                target='linux_amd64',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
+                target='linux_arm64',
+            ),
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -721,13 +735,12 @@ def test_generate_formula_override_version():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -758,13 +771,12 @@ def test_generate_formula_formula_includes():
         repo_name=mock_repo_name,
         repository=repository,
         checksums=[
-            {
-                f'{mock_repo_name}.tar.gz': {
-                    'checksum': CHECKSUM,
-                    'url': f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
-                    'type': 'default',
-                },
-            }
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=f'https://github.com/m-dzianishchyts/{mock_repo_name}/releases/download/{VERSION}/{mock_repo_name}-{VERSION}.tar.gz',  # noqa
+                target='default',
+            )
         ],
         install=INSTALL,
         tar_url=mock_tar_url,
@@ -774,3 +786,293 @@ def test_generate_formula_formula_includes():
     record_formula(formula_path, formula_filename, formula)
 
     assert 'include Language::Python::Virtualenv' in formula
+
+
+def test_generate_formula_versioned():
+    """Tests that we generate the formula content correctly for a versioned formula (eg: `foo@1.2`).
+
+    NOTE: See docstring in `record_formula` for more details on how recording formulas works.
+    """
+    formula_filename = f'{inspect.stack()[0][3]}.rb'
+    mock_repo_name = formula_filename.replace('_', '-').replace('.rb', '')
+    mock_tar_url = f'https://github.com/{USERNAME}/{mock_repo_name}/archive/refs/tags/v1.2.3.tar.gz'
+
+    repository = {
+        'description': DESCRIPTION,
+        'license': LICENSE,
+    }
+
+    formula = Formula.generate_formula_data(
+        owner=USERNAME,
+        repo_name=mock_repo_name,
+        repository=repository,
+        checksums=[
+            ArchiveChecksum(
+                filename=f'{mock_repo_name}.tar.gz',
+                checksum=CHECKSUM,
+                url=mock_tar_url,
+                target='default',
+            )
+        ],
+        install=INSTALL,
+        tar_url=mock_tar_url,
+        depends_on=DEPENDS_ON,
+        version='1.2.3',
+        formula_name=f'{mock_repo_name}@1.2',
+        keg_only=':versioned_formula',
+    )
+
+    record_formula(formula_path, formula_filename, formula)
+
+    assert 'class TestGenerateFormulaVersionedAT12 < Formula' in formula
+
+
+@patch('chevron.tokenizer.tokenize')
+def test_generate_formula_uses_pretokenized_template(mock_tokenize):
+    """Tests that rendering a formula does not tokenize the template again."""
+    formula = Formula.generate_formula_data(
+        owner=USERNAME,
+        repo_name='mock-repo',
+        repository={'description': DESCRIPTION, 'license': LICENSE},
+        checksums=[ArchiveChecksum('mock-repo.tar.gz', CHECKSUM, 'mock-url')],
+        install=INSTALL,
+        tar_url='https://github.com/m-dzianishchyts/mock-repo/archive/refs/tags/v0.1.0.tar.gz',
+    )
+
+    mock_tokenize.assert_not_called()
+    assert '\n\n\n' not in formula
+
+
+def _patch_checksums(targets):
+    """Builds the checksums of a new `1.0.0` release for `Formula.patch_formula_data`."""
+    return [
+        ArchiveChecksum(
+            filename=f'test-formula-1.0.0-{target}.tar.gz',
+            checksum='1' * 64,
+            url=f'https://github.com/m-dzianishchyts/test-formula/releases/download/1.0.0/test-formula-1.0.0-{target.replace("_", "-")}.tar.gz',  # noqa
+            target=target,
+        )
+        for target in targets
+    ]
+
+
+def test_patch_formula():
+    """Tests that patching only rewrites the `url` and `sha256` stanzas, including the platform blocks."""
+    with open(os.path.join(formula_path, 'test_generate_formula_complete_matrix.rb')) as formula_file:
+        formula = formula_file.read()
+    tar_url = 'https://github.com/m-dzianishchyts/test-generate-formula-complete-matrix/archive/refs/tags/v1.0.0.tar.gz'
+
+    patched_formula = Formula.patch_formula_data(
+        formula,
+        checksums=_patch_checksums(['default', 'darwin_amd64', 'darwin_arm64', 'linux_amd64', 'linux_arm64']),
+        tar_url=tar_url,
+    )
+
+    changed_lines = [
+        (old.strip(), new.strip())
+        for old, new in zip(formula.splitlines(), patched_formula.splitlines())  # type: ignore
+        if old != new
+    ]
+    assert len(formula.splitlines()) == len(patched_formula.splitlines())  # type: ignore
+    assert len(changed_lines) == 10
+    assert changed_lines[0] == (f'url "{tar_url.replace("v1.0.0", "v0.1.0")}"', f'url "{tar_url}"')
+    assert changed_lines[1] == (f'sha256 "{CHECKSUM}"', f'sha256 "{"1" * 64}"')
+    assert (
+        '''
+    on_arm do
+      url "https://github.com/m-dzianishchyts/test-formula/releases/download/1.0.0/test-formula-1.0.0-linux-arm64.tar.gz"
+      sha256 "1111111111111111111111111111111111111111111111111111111111111111"
+    end
+  end'''  # noqa
+        in patched_formula  # type: ignore
+    )
+
+
+def test_patch_formula_version():
+    """Tests that the `version` stanza is patched when a version is given."""
+    with open(os.path.join(formula_path, 'test_generate_formula_override_version.rb')) as formula_file:
+        formula = formula_file.read()
+
+    patched_formula = Formula.patch_formula_data(
+        formula, checksums=_patch_checksums(['default']), tar_url='mock-tar-url', version='9.9.9'
+    )
+
+    assert 'version "9.9.9"' in patched_formula  # type: ignore
+    assert 'url "mock-tar-url"' in patched_formula  # type: ignore
+    assert Formula.patch_formula_data(formula, checksums=_patch_checksums(['default']), tar_url='mock') is None
+
+
+def test_patch_formula_structure_mismatch():
+    """Tests that we refuse to patch a formula whose targets differ from the requested ones."""
+    with open(os.path.join(formula_path, 'test_one_of_each_matrix.rb')) as formula_file:
+        formula = formula_file.read()
+
+    patched_formula = Formula.patch_formula_data(
+        formula, checksums=_patch_checksums(['default', 'darwin_arm64']), tar_url='mock-tar-url'
+    )
+
+    assert patched_formula is None
+
+
+def test_patch_formula_keeps_hand_tuning():
+    """Tests that comments, heredocs and stanzas nested in other blocks are left alone."""
+    formula = '''class MockRepo < Formula
+  desc "Things to do"
+  # url "commented-out-url"
+  url "old-url", using: CurlDownloadStrategy
+  sha256 "old-checksum"
+
+  resource "completions" do
+    url "resource-url"
+    sha256 "resource-checksum"
+  end
+
+  def caveats
+    <<~EOS
+      url "heredoc-url"
+    EOS
+  end
+end
+'''
+
+    patched_formula = Formula.patch_formula_data(formula, checksums=_patch_checksums(['default']), tar_url='new-url')
+
+    assert patched_formula == formula.replace('"old-url"', '"new-url"').replace('"old-checksum"', f'"{"1" * 64}"')
+
+
+def test_generate_formula_mirror():
+    """Tests that mirrored archives get a `mirror` stanza right after their `url`.
+
+    NOTE: See docstring in `record_formula` for more details on how recording formulas works.
+    """
+    formula_filename = f'{inspect.stack()[0][3]}.rb'
+    mock_repo_name = formula_filename.replace('_', '-').replace('.rb', '')
+    mock_tar_url = f'https://github.com/{USERNAME}/{mock_repo_name}/archive/refs/tags/v0.1.0.tar.gz'
+    mirror_url = f'https://mirror.example.com/{USERNAME}/{mock_repo_name}/{CHECKSUM}'
+
+    formula = Formula.generate_formula_data(
+        owner=USERNAME,
+        repo_name=mock_repo_name,
+        repository={'description': DESCRIPTION, 'license': LICENSE},
+        checksums=[
+            ArchiveChecksum('v0.1.0.tar.gz', CHECKSUM, mock_tar_url, 'default', f'{mirror_url}/v0.1.0.tar.gz'),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-darwin-arm64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-darwin-arm64.tar.gz',  # noqa
+                target='darwin_arm64',
+                mirror=f'{mirror_url}/test-formula-0.1.0-darwin-arm64.tar.gz',
+            ),
+            ArchiveChecksum(
+                filename='test-formula-0.1.0-linux-amd64.tar.gz',
+                checksum=CHECKSUM,
+                url='https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-amd64.tar.gz',  # noqa
+                target='linux_amd64',
+            ),
+        ],
+        install=INSTALL,
+        tar_url=mock_tar_url,
+    )
+
+    record_formula(formula_path, formula_filename, formula)
+
+    assert f'  url "{mock_tar_url}"\n  mirror "{mirror_url}/v0.1.0.tar.gz"\n' in formula
+    assert formula.count('mirror "') == 2
+
+
+def test_patch_formula_mirror():
+    """Tests that `mirror` stanzas are patched along with their `url`, and that adding one renders the formula."""
+    with open(os.path.join(formula_path, 'test_generate_formula_mirror.rb')) as formula_file:
+        formula = formula_file.read()
+    checksums = [
+        ArchiveChecksum('mock.tar.gz', '1' * 64, 'mock-url', target, f'mock-mirror-{target}')
+        for target in ('default', 'darwin_arm64')
+    ]
+    checksums.append(ArchiveChecksum('mock.tar.gz', '1' * 64, 'mock-url', 'linux_amd64'))
+
+    patched_formula = Formula.patch_formula_data(formula, checksums=checksums, tar_url='mock-tar-url')
+
+    assert 'mirror "mock-mirror-default"' in patched_formula  # type: ignore
+    assert 'mirror "mock-mirror-darwin_arm64"' in patched_formula  # type: ignore
+    checksums[2] = ArchiveChecksum('mock.tar.gz', '1' * 64, 'mock-url', 'linux_amd64', 'mock-mirror-linux_amd64')
+    assert Formula.patch_formula_data(formula, checksums=checksums, tar_url='mock-tar-url') is None
+
+
+def test_generate_formula_bottles():
+    """Tests that bottles get a `bottle` block sorted and aligned like `brew style` wants it.
+
+    NOTE: See docstring in `record_formula` for more details on how recording formulas works.
+    """
+    formula_filename = f'{inspect.stack()[0][3]}.rb'
+    mock_repo_name = formula_filename.replace('_', '-').replace('.rb', '')
+    mock_tar_url = f'https://github.com/{USERNAME}/{mock_repo_name}/archive/refs/tags/v0.1.0.tar.gz'
+    download_url = f'https://github.com/{USERNAME}/{mock_repo_name}/releases/download/v0.1.0'
+
+    formula = Formula.generate_formula_data(
+        owner=USERNAME,
+        repo_name=mock_repo_name,
+        repository={'description': DESCRIPTION, 'license': LICENSE},
+        checksums=[ArchiveChecksum('v0.1.0.tar.gz', CHECKSUM, mock_tar_url)]
+        + [
+            ArchiveChecksum(
+                f'{mock_repo_name}-0.1.0.{tag}.bottle.tar.gz',
+                str(index) * 64,
+                f'{download_url}/{mock_repo_name}-0.1.0.{tag}.bottle.tar.gz',
+                f'bottle:{tag}',
+            )
+            for index, tag in enumerate(['x86_64_linux', 'ventura', 'arm64_ventura', 'arm64_sonoma', 'sonoma'])
+        ],
+        install=INSTALL,
+        tar_url=mock_tar_url,
+        depends_on=DEPENDS_ON,
+    )
+
+    record_formula(formula_path, formula_filename, formula)
+
+    assert f'    root_url "{download_url}"\n' in formula
+    assert [line.split(',')[1].split(':')[0].strip() for line in formula.splitlines() if 'cellar:' in line] == [
+        'arm64_sonoma',
+        'arm64_ventura',
+        'sonoma',
+        'ventura',
+        'x86_64_linux',
+    ]
+    assert f'    sha256 cellar: :any_skip_relocation, sonoma:        "{"4" * 64}"\n' in formula
+    bottles = [ArchiveChecksum('mock.tar.gz', CHECKSUM, f'{download_url}/mock.tar.gz', 'bottle:sonoma')]
+    assert Formula.bottle_block(bottles, '/opt/homebrew/Cellar')['items'][0]['cellar'] == '"/opt/homebrew/Cellar"'
+    assert Formula.patch_formula_data(formula, bottles, mock_tar_url) is None
+
+
+def test_generate_formula_resources():
+    """Tests that resources get a `resource` block each, after the platform blocks.
+
+    NOTE: See docstring in `record_formula` for more details on how recording formulas works.
+    """
+    formula_filename = f'{inspect.stack()[0][3]}.rb'
+    mock_repo_name = formula_filename.replace('_', '-').replace('.rb', '')
+    mock_tar_url = f'https://github.com/{USERNAME}/{mock_repo_name}/archive/refs/tags/v0.1.0.tar.gz'
+    download_url = f'https://github.com/{USERNAME}/{mock_repo_name}/releases/download/v0.1.0'
+
+    formula = Formula.generate_formula_data(
+        owner=USERNAME,
+        repo_name=mock_repo_name,
+        repository={'description': DESCRIPTION, 'license': LICENSE},
+        checksums=[
+            ArchiveChecksum('v0.1.0.tar.gz', CHECKSUM, mock_tar_url),
+            ArchiveChecksum('darwin-arm64.tar.gz', CHECKSUM, f'{download_url}/darwin-arm64.tar.gz', 'darwin_arm64'),
+            ArchiveChecksum(
+                'completions.tar.gz', '1' * 64, f'{download_url}/completions.tar.gz', 'resource:completions'
+            ),
+            ArchiveChecksum('man.tar.gz', '2' * 64, 'https://example.com/man.tar.gz', 'resource:man'),
+        ],
+        install=INSTALL,
+        tar_url=mock_tar_url,
+    )
+
+    record_formula(formula_path, formula_filename, formula)
+
+    assert '  end\n\n  resource "completions" do\n' in formula
+    assert f'  resource "man" do\n    url "https://example.com/man.tar.gz"\n    sha256 "{"2" * 64}"\n  end\n' in formula
+    assert '\n\n\n' not in formula
+    resources = [ArchiveChecksum('man.tar.gz', CHECKSUM, 'https://example.com/man.tar.gz', 'resource:man')]
+    assert Formula.patch_formula_data(formula, resources, mock_tar_url) is None
@@ -0,0 +1,155 @@
+import os
+from unittest.mock import patch
+
+from brewtap.formula_parser import FormulaParser
+
+
+FORMULAS_FOLDER = os.path.join('test', 'formulas')
+CHECKSUM = '0000000000000000000000000000000000000000000000000000000000000000'
+
+
+def test_parse():
+    """Tests that we parse the metadata of a formula generated by Brewtap."""
+    with open(os.path.join(FORMULAS_FOLDER, 'test_generate_formula_complete_matrix.rb'), 'r') as formula:
+        record = FormulaParser.parse(formula.read())
+
+    assert record.class_name == 'TestGenerateFormulaCompleteMatrix'
+    assert record.name == 'test-generate-formula-complete-matrix'
+    assert record.desc == 'Release scripts, binaries, and executables to github'
+    assert record.homepage == 'https://github.com/m-dzianishchyts/test-generate-formula-complete-matrix'
+    assert record.url == f'{record.homepage}/archive/refs/tags/v0.1.0.tar.gz'
+    assert record.sha256 == CHECKSUM
+    assert record.version is None
+    assert record.license == 'MIT'
+    assert list(record.platforms) == [
+        ('on_macos', 'on_intel'),
+        ('on_macos', 'on_arm'),
+        ('on_linux', 'on_intel'),
+        ('on_linux', 'on_arm'),
+    ]
+    assert record.platforms[('on_linux', 'on_arm')] == {
+        'url': 'https://github.com/m-dzianishchyts/test-formula/releases/download/0.1.0/test-formula-0.1.0-linux-arm64.tar.gz',  # noqa
+        'sha256': CHECKSUM,
+    }
+
+
+def test_parse_skips_nested_blocks():
+    """Tests that we only pick up stanzas of the formula class itself, not of comments, heredocs or other blocks."""
+    record = FormulaParser.parse(
+        '# desc "Commented out"\n'
+        'class FooBarFoo < Formula\n'
+        '  desc "Say \\"hi\\""\n'
+        '  url "https://example.com/foo.tar.gz"\n'
+        '  version "1.0.0"\n'
+        '\n'
+        '  resource "six" do\n'
+        '    url "https://example.com/six.tar.gz"\n'
+        '  end\n'
+        '\n'
+        '  on_macos do\n'
+        '    url "https://example.com/foo-macos.tar.gz"\n'
+        '  end\n'
+        '\n'
+        '  def caveats\n'
+        '    <<~EOS\n'
+        '      url "https://example.com/heredoc.tar.gz"\n'
+        '    EOS\n'
+        '  end\n'
+        'end\n'
+    )
+
+    assert record.name == 'foo-bar-foo'
+    assert record.desc == 'Say "hi"'
+    assert record.url == 'https://example.com/foo.tar.gz'
+    assert record.version == '1.0.0'
+    assert record.homepage == ''
+    assert record.platforms == {('on_macos',): {'url': 'https://example.com/foo-macos.tar.gz'}}
+
+
+def test_parse_versioned_name(tmp_path):
+    """Tests that a versioned formula is named after its file, its class lacking the dots of its version."""
+    formula_path = tmp_path / 'foo-bar@1.2.rb'
+    formula_path.write_text('class FooBarAT12 < Formula\nend\n')
+
+    assert FormulaParser.parse_file(str(formula_path)).name == 'foo-bar@1.2'
+    assert FormulaParser.parse('class FooBarAT12 < Formula\nend\n').name == 'foo-bar@12'
+
+
+def test_parse_file_cached(tmp_path):
+    """Tests that we only parse a formula file again once it changed."""
+    formula_path = tmp_path / 'foo.rb'
+    formula_path.write_text('class Foo < Formula\n  desc "Foo"\nend\n')
+
+    with patch('brewtap.formula_parser.FormulaParser.parse', wraps=FormulaParser.parse) as mock_parse:
+        first_record = FormulaParser.parse_file(str(formula_path))
+        assert FormulaParser.parse_file(str(formula_path)) is first_record
+
+        formula_path.write_text('class Foo < Formula\n  desc "Foo, now longer"\nend\n')
+
+        assert FormulaParser.parse_file(str(formula_path)).desc == 'Foo, now longer'
+        assert mock_parse.call_count == 2
+
+
+def test_parse_folder():
+    """Tests that we parse every Ruby file of a folder in filename order."""
+    records = FormulaParser.parse_folder(FORMULAS_FOLDER)
+
+    assert len(records) == 19
+    assert records[0].name == 'test-generate-formula'
+
+
+def test_parse_folder_processes():
+    """Tests that parsing in a pool of processes gives the same records, in order, and fills the cache."""
+    FormulaParser.clear_cache()
+    records = FormulaParser.parse_folder(FORMULAS_FOLDER, processes=True)
+
+    assert records == [FormulaParser.read_file(path) for path in FormulaParser.list_formulas(FORMULAS_FOLDER)]
+    with patch('brewtap.formula_parser.ProcessPoolExecutor') as mock_executor:
+        cached_records = FormulaParser.parse_folder(FORMULAS_FOLDER, processes=True)
+
+    mock_executor.assert_not_called()
+    assert all(cached is record for cached, record in zip(cached_records, records))
+
+
+def test_list_formulas_sharded(tmp_path):
+    """Tests that we list the formulas of sharded subfolders too, sorted by filename."""
+    for formula_path in ('b/bar.rb', 'lib/libfoo.rb', 'a/abc.rb', 'b/README.md'):
+        (tmp_path / formula_path).parent.mkdir(exist_ok=True)
+        (tmp_path / formula_path).write_text('')
+
+    formula_paths = FormulaParser.list_formulas(str(tmp_path))
+
+    assert [os.path.relpath(path, tmp_path) for path in formula_paths] == [
+        os.path.join('a', 'abc.rb'),
+        os.path.join('b', 'bar.rb'),
+        os.path.join('lib', 'libfoo.rb'),
+    ]
+
+
+def test_parse_summary_stops_reading():
+    """Tests that a summary parse does not consume lines past the class name, `desc` and `homepage`."""
+
+    def formula_lines():
+        yield 'class Foo < Formula\n'
+        yield '  desc "Foo"\n'
+        yield '  homepage "https://foo.dev"\n'
+        raise AssertionError('Read past the summary')
+
+    record = FormulaParser.parse(formula_lines(), summary_only=True)
+
+    assert (record.name, record.desc, record.homepage) == ('foo', 'Foo', 'https://foo.dev')
+
+
+def test_parse_file_summary_cached(tmp_path):
+    """Tests that a cached summary is parsed again when the whole record is needed, but not the other way around."""
+    formula_path = tmp_path / 'foo.rb'
+    formula_path.write_text(
+        'class Foo < Formula\n  desc "Foo"\n  homepage "https://foo.dev"\n  url "https://foo.dev/1.0.0.tar.gz"\nend\n'
+    )
+
+    summary = FormulaParser.parse_file(str(formula_path), summary_only=True)
+    record = FormulaParser.parse_file(str(formula_path))
+
+    assert summary.url is None
+    assert record.url == 'https://foo.dev/1.0.0.tar.gz'
+    assert FormulaParser.parse_file(str(formula_path), summary_only=True) is record
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from brewtap.fragments import ChecksumFragment
+
+
+def test_from_file(tmp_path):
+    """Tests that an asset is hashed into a fragment that `ChecksumFragment.load` reads back by filename."""
+    asset = tmp_path / 'mock-repo-1.0.0-darwin-arm64.tar.gz'
+    asset.write_bytes(b'mock-asset')
+
+    fragment = ChecksumFragment.from_file(str(asset), 'darwin_arm64')
+    (tmp_path / 'darwin_arm64.json').write_text(fragment.to_json())
+
+    assert fragment.sha256 == '9ac8d75a897d3f12101d4231692ec432824fe4ce6528f132c8a27c83fb8c9bea'
+    assert (fragment.filename, fragment.size, fragment.signature) == ('mock-repo-1.0.0-darwin-arm64.tar.gz', 10, None)
+    assert ChecksumFragment.load(str(tmp_path / '*.json')) == {fragment.filename: fragment}
+
+
+def test_from_file_unknown_target(tmp_path):
+    with pytest.raises(SystemExit):
+        ChecksumFragment.from_file(str(tmp_path / 'asset.tar.gz'), 'amiga_m68k')
+
+
+def test_load_signed(tmp_path):
+    """Tests that fragments must be signed with the secret when one is set."""
+    asset = tmp_path / 'asset.tar.gz'
+    asset.write_bytes(b'mock-asset')
+    fragment = ChecksumFragment.from_file(str(asset), 'default', 'mock-secret')
+    (tmp_path / 'signed.json').write_text(fragment.to_json())
+
+    assert ChecksumFragment.load(str(tmp_path / '*.json'), 'mock-secret') == {'asset.tar.gz': fragment}
+
+    (tmp_path / 'signed.json').write_text(json.dumps({**json.loads(fragment.to_json()), 'sha256': '0' * 64}))
+    with pytest.raises(SystemExit) as error:
+        ChecksumFragment.load(str(tmp_path / '*.json'), 'mock-secret')
+
+    assert 'is not signed with the fragment secret' in str(error.value)
+
+
+def test_load_no_fragments(tmp_path):
+    with pytest.raises(SystemExit):
+        ChecksumFragment.load(str(tmp_path / '*.json'))
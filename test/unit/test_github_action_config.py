@@ -8,12 +8,12 @@ from brewtap.app import App
 @patch.dict(os.environ, {'INPUT_SKIP_COMMIT': 'false'})
 @patch('brewtap.readme_updater.ReadmeUpdater.update_readme')
 @patch('brewtap.checksum.Checksum.upload_checksum_file')
-@patch('brewtap.app.HOMEBREW_TAP', '123')
+@patch('brewtap.config.HOMEBREW_TAP', '123')
 @patch('woodchips.get')
-@patch('brewtap.git.Git.setup')
-@patch('brewtap.git.Git.add')
-@patch('brewtap.git.Git.commit')
-@patch('brewtap.git.Git.push')
+@patch('brewtap.git.Git.setup_async')
+@patch('brewtap.git.Git.add_async')
+@patch('brewtap.git.Git.commit_async')
+@patch('brewtap.git.Git.push_async')
 @patch('brewtap.utils.Utils.write_file')
 @patch('brewtap.formula.Formula.generate_formula_data')
 @patch('brewtap.checksum.Checksum.get_checksum', return_value=('123', 'mock-repo'))
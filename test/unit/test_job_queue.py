@@ -0,0 +1,57 @@
+from brewtap.job_queue import JobQueue
+
+
+def test_enqueue_coalesces_releases():
+    """Tests that queuing a release supersedes the releases of the same repository still waiting."""
+    job_queue = JobQueue()
+    job_queue.enqueue('owner/foo', 'v1.2.1', ['homebrew-formulas'])
+    job_queue.enqueue('owner/foo', 'v1.2.2', ['homebrew-formulas'])
+
+    jobs = job_queue.claim()
+
+    assert [(job.repository, job.tag) for job in jobs] == [('owner/foo', 'v1.2.2')]
+    assert job_queue.stats()['superseded'] == 1
+
+
+def test_claim_groups_jobs_per_tap():
+    """Tests that the single-tap jobs of a tap are claimed together, and that busy taps are skipped."""
+    job_queue = JobQueue()
+    job_queue.enqueue('owner/foo', 'v1.0.0', ['homebrew-formulas'])
+    job_queue.enqueue('owner/bar', 'v2.0.0', ['homebrew-other'])
+    job_queue.enqueue('owner/baz', 'v3.0.0', ['homebrew-formulas'])
+    job_queue.enqueue('owner/qux', 'v4.0.0', ['homebrew-formulas', 'homebrew-other'])
+
+    formulas_jobs = job_queue.claim()
+    other_jobs = job_queue.claim(busy_taps={'homebrew-formulas'})
+
+    assert [job.repository for job in formulas_jobs] == ['owner/foo', 'owner/baz']
+    assert [job.repository for job in other_jobs] == ['owner/bar']
+    assert job_queue.claim(busy_taps={'homebrew-formulas', 'homebrew-other'}) == []
+    assert [job.repository for job in job_queue.claim()] == ['owner/qux']
+
+
+def test_finish_and_stats():
+    job_queue = JobQueue()
+    job_queue.enqueue('owner/foo', 'v1.0.0', ['homebrew-formulas'])
+    job_queue.enqueue('owner/bar', 'v1.0.0', ['homebrew-other'])
+    job_queue.enqueue('owner/baz', 'v1.0.0', ['homebrew-third'])
+
+    job_queue.finish(job_queue.claim())
+    job_queue.finish(job_queue.claim(), 'mock-error')
+    stats = job_queue.stats()
+
+    assert (stats['depth'], stats['running'], stats['done'], stats['failed']) == (1, 0, 1, 1)
+    assert stats['oldest_wait'] >= 0 and stats['wait_time'] >= 0 and stats['duration'] >= 0
+
+
+def test_requeue_running_jobs(tmp_path):
+    """Tests that jobs left running by a stopped process are queued again."""
+    queue_file = str(tmp_path / 'queue.sqlite3')
+    job_queue = JobQueue(queue_file)
+    job_queue.enqueue('owner/foo', 'v1.0.0', ['homebrew-formulas'])
+    job_queue.claim()
+    job_queue.close()
+
+    jobs = JobQueue(queue_file).claim()
+
+    assert [(job.repository, job.tag) for job in jobs] == [('owner/foo', 'v1.0.0')]
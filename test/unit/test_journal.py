@@ -0,0 +1,50 @@
+from dataclasses import replace
+
+from brewtap.config import Config
+from brewtap.journal import RunJournal
+
+
+CONFIG = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas', resume=True)
+
+
+def test_journal_round_trip(tmp_path):
+    """Tests that the phases of a run are read back by the next run of the same inputs."""
+    config = replace(CONFIG, work_dir=str(tmp_path))
+    journal = RunJournal.open(config)
+    journal.start(1)
+    journal.record('mock-sha', 'taps', 'homebrew-formulas', 'commit')
+
+    resumed = RunJournal.open(replace(config, github_token='new-token', debug=True))
+    resumed.start(1)
+
+    assert resumed.get('taps', 'homebrew-formulas', 'commit') == 'mock-sha'
+    assert resumed.get('taps', 'homebrew-other', 'commit') is None
+
+    resumed.complete()
+
+    assert not (tmp_path / '.brewtap-journal.json').exists()
+
+
+def test_journal_discarded(tmp_path):
+    """Tests that the journal of other inputs or of another release is not resumed."""
+    config = replace(CONFIG, work_dir=str(tmp_path))
+    journal = RunJournal.open(config)
+    journal.start(1)
+    journal.record({'version': 'v1.0.0'}, 'hashed')
+
+    other_inputs = RunJournal.open(replace(config, install='bin.install "other"'))
+    other_release = RunJournal.open(config)
+    other_release.start(2)
+
+    assert other_inputs.get('hashed') is None
+    assert other_release.get('hashed') is None
+
+
+def test_journal_disabled(tmp_path):
+    """Tests that nothing is written without `resume`."""
+    journal = RunJournal.open(replace(CONFIG, work_dir=str(tmp_path), resume=False))
+    journal.start(1)
+    journal.record(True, 'checksum_uploaded')
+
+    assert not journal.enabled
+    assert list(tmp_path.iterdir()) == []
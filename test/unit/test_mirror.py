@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import re
+import threading
+from datetime import (
+    datetime,
+    timezone,
+)
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from unittest.mock import patch
+from urllib.parse import (
+    parse_qs,
+    unquote,
+    urlsplit,
+)
+
+import pytest
+
+from brewtap.app import App
+from brewtap.config import Config
+from brewtap.fragments import ChecksumFragment
+from brewtap.mirror import AssetMirror
+
+
+class MockS3Handler(BaseHTTPRequestHandler):
+    """A local stand-in of an S3-compatible store (like MinIO), computing `ETag`s the way S3 does."""
+
+    server: 'MockS3Server'
+
+    def do_HEAD(self):
+        stored = self.server.objects.get(self.key())
+        if stored is None:
+            return self.respond(404)
+        self.respond(200, {'ETag': f'"{stored["etag"]}"', 'x-amz-meta-sha256': stored['sha256'] or ''})
+
+    def do_PUT(self):
+        query = self.query()
+        body = self.body()
+        if 'uploadId' in query:
+            self.server.uploads[query['uploadId']]['parts'][int(query['partNumber'])] = body
+            return self.respond(200, {'ETag': f'"{hashlib.md5(body).hexdigest()}"'})
+        if self.server.truncate:
+            body = body[:-1]
+        self.server.objects[self.key()] = {
+            'body': body,
+            'etag': hashlib.md5(body).hexdigest(),
+            'sha256': self.headers.get('x-amz-meta-sha256'),
+        }
+        self.respond(200)
+
+    def do_POST(self):
+        query = self.query()
+        body = self.body()
+        if 'uploads' in query:
+            upload_id = f'upload-{len(self.server.uploads)}'
+            self.server.uploads[upload_id] = {'parts': {}, 'sha256': self.headers.get('x-amz-meta-sha256')}
+            return self.respond(200, body=f'<UploadId>{upload_id}</UploadId>'.encode())
+        upload = self.server.uploads.pop(query['uploadId'])
+        part_numbers = [int(number) for number in re.findall(r'<PartNumber>(\d+)</PartNumber>', body.decode())]
+        parts = [upload['parts'][number] for number in part_numbers]
+        part_digests = b''.join(hashlib.md5(part).digest() for part in parts)
+        self.server.objects[self.key()] = {
+            'body': b''.join(parts),
+            'etag': f'{hashlib.md5(part_digests).hexdigest()}-{len(parts)}',
+            'sha256': upload['sha256'],
+        }
+        self.respond(200)
+
+    def do_DELETE(self):
+        self.server.uploads.pop(self.query().get('uploadId', ''), None)
+        self.respond(204)
+
+    def key(self) -> str:
+        return unquote(urlsplit(self.path).path).removeprefix('/bucket/')
+
+    def query(self):
+        return {name: values[0] for name, values in parse_qs(urlsplit(self.path).query, keep_blank_values=True).items()}
+
+    def body(self) -> bytes:
+        assert self.headers['Authorization'].startswith('AWS4-HMAC-SHA256 Credential=mock-access-key/')
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def respond(self, status: int, headers=None, body: bytes = b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), MockS3Handler)
+        self.objects = {}
+        self.uploads = {}
+        self.truncate = False  # Whether objects lose their last byte on the way, like a broken upload
+
+
+@pytest.fixture
+def s3_server():
+    server = MockS3Server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def mock_mirror(server: MockS3Server) -> AssetMirror:
+    return AssetMirror(
+        f'http://127.0.0.1:{server.server_port}/bucket',
+        'https://mirror.example.com',
+        access_key='mock-access-key',
+        secret_key='mock-secret-key',
+    )
+
+
+def write_archive(tmp_path, content: bytes):
+    archive_path = tmp_path / 'mock-repo.tar.gz'
+    archive_path.write_bytes(content)
+
+    return str(archive_path), hashlib.sha256(content).hexdigest()
+
+
+def test_mirror_file(s3_server, tmp_path):
+    """Tests that an archive is uploaded once under its checksum and served from the public URL."""
+    mirror = mock_mirror(s3_server)
+    archive_path, checksum = write_archive(tmp_path, b'mock archive')
+    key = AssetMirror.object_key('m-dzianishchyts', 'mock-repo', checksum, 'mock-repo.tar.gz')
+
+    assert not mirror.mirrored(key, checksum)
+
+    mirror.mirror_file(key, archive_path, checksum)
+
+    assert s3_server.objects[key]['body'] == b'mock archive'
+    assert mirror.mirrored(key, checksum)
+    assert mirror.object_url(key, public=True) == f'https://mirror.example.com/{key}'
+
+
+@patch('brewtap.mirror.PART_SIZE', 5)
+def test_mirror_file_multipart(s3_server, tmp_path):
+    """Tests that large archives are uploaded in parts and verified against the multipart `ETag`."""
+    mirror = mock_mirror(s3_server)
+    archive_path, checksum = write_archive(tmp_path, b'mock archive in parts')
+
+    mirror.mirror_file('mock-key', archive_path, checksum)
+
+    assert s3_server.objects['mock-key']['body'] == b'mock archive in parts'
+    assert s3_server.objects['mock-key']['etag'].endswith('-5')
+    assert not s3_server.uploads
+
+
+@patch('brewtap.mirror.PART_SIZE', 5)
+def test_mirror_file_changed(s3_server, tmp_path):
+    """Tests that an archive whose bytes do not match its checksum is not mirrored, nor left half uploaded."""
+    mirror = mock_mirror(s3_server)
+    archive_path, _ = write_archive(tmp_path, b'mock archive in parts')
+
+    with pytest.raises(SystemExit, match='changed since it was hashed'):
+        mirror.mirror_file('mock-key', archive_path, '0' * 64)
+
+    assert not s3_server.objects
+    assert not s3_server.uploads
+
+
+def test_mirror_file_etag_mismatch(s3_server, tmp_path):
+    """Tests that the stored object is verified by its `ETag`."""
+    mirror = mock_mirror(s3_server)
+    archive_path, checksum = write_archive(tmp_path, b'mock archive')
+
+    s3_server.truncate = True
+
+    with pytest.raises(SystemExit, match='does not match the archive'):
+        mirror.mirror_file('mock-key', archive_path, checksum)
+
+
+def test_sign():
+    """Tests that requests are signed with the scope of the bucket region."""
+    mirror = AssetMirror('https://s3.example.com/bucket', region='eu-west-1', access_key='key', secret_key='secret')
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    headers = mirror.sign('GET', 'https://s3.example.com/bucket/a%20b?uploads', {}, now)
+    signature = headers['authorization']
+
+    assert signature.startswith('AWS4-HMAC-SHA256 Credential=key/20240101/eu-west-1/s3/aws4_request, ')
+    assert 'SignedHeaders=host;x-amz-content-sha256;x-amz-date, ' in signature
+    assert mirror.sign('GET', 'https://s3.example.com/bucket/a%20b?uploads', {}, now) == headers
+    assert mirror.sign('GET', 'https://s3.example.com/bucket/a%20c?uploads', {}, now) != headers
+    assert AssetMirror('https://s3.example.com/bucket').sign('GET', 'https://s3.example.com/bucket', {}) == {}
+
+
+@patch('brewtap.checksum.Checksum.get_checksum')
+@patch('brewtap.app.App.download_archive')
+def test_checksum_archive_mirror(mock_download_archive, mock_get_checksum, s3_server, tmp_path):
+    """Tests that hashed archives are mirrored once and get the public URL of their copy."""
+    archive_path, checksum = write_archive(tmp_path, b'mock archive')
+    mock_download_archive.return_value = archive_path
+    mock_get_checksum.return_value = checksum
+    archive_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/mock-repo.tar.gz'
+    config = Config(
+        'm-dzianishchyts',
+        'mock-repo',
+        'm-dzianishchyts',
+        'homebrew-formulas',
+        mirror_url=f'http://127.0.0.1:{s3_server.server_port}/bucket',
+        mirror_public_url='https://mirror.example.com',
+    )
+
+    with (
+        patch('brewtap.app.MIRROR_ACCESS_KEY', 'mock-access-key'),
+        patch('brewtap.app.MIRROR_SECRET_KEY', 'mock-secret-key'),
+    ):
+        for _ in range(2):
+            archive_checksum = asyncio.run(App._checksum_archive('darwin_arm64', archive_url, archive_url, config))
+            assert archive_checksum.mirror == (
+                f'https://mirror.example.com/m-dzianishchyts/mock-repo/{checksum}/mock-repo.tar.gz'
+            )
+
+    assert len(s3_server.objects) == 1
+
+
+@patch('brewtap.app.App.download_archive')
+def test_fragment_checksum_mirror(mock_download_archive, s3_server, tmp_path):
+    """Tests that archives hashed by a checksum fragment are mirrored too, downloading them only once."""
+    archive_path, checksum = write_archive(tmp_path, b'mock archive')
+    mock_download_archive.return_value = archive_path
+    archive_url = 'https://github.com/m-dzianishchyts/mock-repo/releases/download/v1.0.0/mock-repo.tar.gz'
+    asset_url = 'https://api.github.com/repos/m-dzianishchyts/mock-repo/releases/assets/1'
+    assets = [{'url': asset_url, 'browser_download_url': archive_url}]
+    fragment = ChecksumFragment('darwin_arm64', 'mock-repo.tar.gz', 12, checksum)
+    config = Config(
+        'm-dzianishchyts',
+        'mock-repo',
+        'm-dzianishchyts',
+        'homebrew-formulas',
+        mirror_url=f'http://127.0.0.1:{s3_server.server_port}/bucket',
+        mirror_public_url='https://mirror.example.com',
+    )
+
+    with (
+        patch('brewtap.app.MIRROR_ACCESS_KEY', 'mock-access-key'),
+        patch('brewtap.app.MIRROR_SECRET_KEY', 'mock-secret-key'),
+    ):
+        for _ in range(2):
+            archive_checksum = asyncio.run(
+                App._fragment_checksum('darwin_arm64', archive_url, fragment, config, assets)
+            )
+            assert archive_checksum.mirror == (
+                f'https://mirror.example.com/m-dzianishchyts/mock-repo/{checksum}/mock-repo.tar.gz'
+            )
+
+    mock_download_archive.assert_called_once()
+    assert mock_download_archive.call_args.args[0] == asset_url
+    assert len(s3_server.objects) == 1
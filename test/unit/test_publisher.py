@@ -0,0 +1,115 @@
+import asyncio
+import subprocess
+from unittest.mock import patch
+
+from brewtap.config import Config
+from brewtap.publisher import Publisher
+
+
+def test_release_config():
+    """Tests that each release gets its own work dir and reuses the clone of the tap."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas', work_dir='mock-repo')
+
+    release_config = Publisher.release_config(config, 'v1.2.0')
+
+    assert (release_config.version, release_config.work_dir, release_config.reuse_clone) == (
+        'v1.2.0',
+        'mock-repo/v1.2.0',
+        True,
+    )
+    assert config.version is None
+
+
+def test_enqueue_taps_by_owner():
+    """Tests that the taps of different owners sharing a name are neither serialized nor batched together."""
+    configs = [
+        Config('m-dzianishchyts', 'foo', 'm-dzianishchyts', 'homebrew-formulas'),
+        Config('m-dzianishchyts', 'bar', 'other-owner', 'homebrew-formulas'),
+    ]
+    publisher = Publisher(configs)
+    for config in configs:
+        publisher.enqueue(config, 'v1.0.0')
+
+    foo_jobs = publisher.job_queue.claim()
+    bar_jobs = publisher.job_queue.claim(foo_jobs[0].taps)
+
+    assert [(job.repository, job.taps) for job in foo_jobs + bar_jobs] == [
+        ('m-dzianishchyts/foo', ['m-dzianishchyts/homebrew-formulas']),
+        ('m-dzianishchyts/bar', ['other-owner/homebrew-formulas']),
+    ]
+
+
+@patch('brewtap.app.App.run_batch_async')
+def test_publish_batches_jobs(mock_run_batch):
+    """Tests that the jobs claimed together for a tap are published in a single batch."""
+    configs = [
+        Config('m-dzianishchyts', repo, 'm-dzianishchyts', 'homebrew-formulas', work_dir=repo)
+        for repo in ('foo', 'bar')
+    ]
+    publisher = Publisher(configs)
+    for config in configs:
+        publisher.enqueue(config, 'v1.0.0')
+
+    asyncio.run(publisher.publish(publisher.job_queue.claim()))
+
+    published_configs = mock_run_batch.call_args.args[0]
+    assert [(config.github_repo, config.version) for config in published_configs] == [
+        ('foo', 'v1.0.0'),
+        ('bar', 'v1.0.0'),
+    ]
+    assert publisher.job_queue.stats()['done'] == 2
+
+
+@patch('brewtap.app.App.run_github_action_async')
+def test_work_publishes_queued_jobs(mock_run_github_action):
+    """Tests that the workers publish the jobs queued before they started, one per tap."""
+    configs = [
+        Config('m-dzianishchyts', 'foo', 'm-dzianishchyts', 'homebrew-formulas'),
+        Config('m-dzianishchyts', 'bar', 'm-dzianishchyts', 'homebrew-other'),
+    ]
+
+    async def run():
+        publisher = Publisher(configs, workers=2)
+        publisher.enqueue(configs[0], 'v1.0.0')
+        publisher.enqueue(configs[1], 'v2.0.0')
+        await publisher.start()
+        while publisher.job_queue.stats()['done'] < 2:
+            await asyncio.sleep(0.01)
+        await publisher.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+    assert {call.args[0].github_repo for call in mock_run_github_action.call_args_list} == {'foo', 'bar'}
+
+
+@patch('logging.Logger.error')
+@patch('brewtap.app.App.run_github_action_async')
+def test_work_survives_failed_publish(mock_run_github_action, mock_logger):
+    """Tests that a publish failing with any error (eg: a rejected push) marks its job `failed` and the worker
+    goes on with the next jobs.
+    """
+    mock_run_github_action.side_effect = [
+        subprocess.CalledProcessError(1, ['git', 'push'], 'rejected'),
+        TimeoutError(),
+        None,
+    ]
+    configs = [Config('m-dzianishchyts', repo, 'm-dzianishchyts', f'homebrew-{repo}') for repo in ('foo', 'bar', 'baz')]
+
+    async def run():
+        publisher = Publisher(configs, workers=1)
+        for config in configs:
+            publisher.enqueue(config, 'v1.0.0')
+        await publisher.start()
+        stats = publisher.job_queue.stats()
+        while stats['done'] + stats['failed'] < 3:
+            await asyncio.sleep(0.01)
+            stats = publisher.job_queue.stats()
+        alive = not any(worker.done() for worker in publisher.workers)
+        await publisher.stop()
+
+        return stats, alive
+
+    stats, alive = asyncio.run(asyncio.wait_for(run(), 5))
+
+    assert (stats['failed'], stats['done'], stats['running'], alive) == (2, 1, 0, True)
+    assert mock_logger.call_count == 2
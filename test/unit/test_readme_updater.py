@@ -1,3 +1,4 @@
+import os
 from unittest.mock import (
     mock_open,
     patch,
@@ -5,54 +6,277 @@ from unittest.mock import (
 
 import pytest
 
+from brewtap.formula_parser import FormulaParser
 from brewtap.readme_updater import ReadmeUpdater
 
 
+README_CONTENT = """# Tap
+
+<!-- project_table_start -->
+old table
+<!-- project_table_end -->
+
+## Footer
+"""
+
+
 @patch('brewtap.readme_updater.ReadmeUpdater.format_formula_data')
-@patch('brewtap.readme_updater.ReadmeUpdater.generate_table')
-@patch('brewtap.readme_updater.ReadmeUpdater.retrieve_old_table', return_value=['', True])
-@patch('brewtap.readme_updater.ReadmeUpdater.read_current_readme')
-@patch('brewtap.readme_updater.ReadmeUpdater.replace_table_contents')
-def test_update_readme(
-    mock_replace_table_contents,
-    mock_read_current_readme,
-    mock_retrieve_old_table,
-    mock_generate_table,
-    mock_format_formula_data,
-):
+@patch('brewtap.readme_updater.ReadmeUpdater.generate_table', return_value='new table\n')
+def test_update_readme(mock_generate_table, mock_format_formula_data, tmp_path):
     """Tests that we update the README table when we can find the old table correctly."""
-    ReadmeUpdater.update_readme('./')
+    (tmp_path / 'README.md').write_text(README_CONTENT)
+
+    ReadmeUpdater.update_readme(str(tmp_path))
 
     mock_format_formula_data.assert_called_once()
     mock_generate_table.assert_called_once()
-    mock_retrieve_old_table.assert_called_once()
-    mock_read_current_readme.assert_called_once()
-    mock_replace_table_contents.assert_called_once()
+    assert (tmp_path / 'README.md').read_text() == '# Tap\n\nnew table\n\n## Footer\n'
 
 
 @patch('brewtap.readme_updater.ReadmeUpdater.format_formula_data')
 @patch('brewtap.readme_updater.ReadmeUpdater.generate_table')
-@patch('brewtap.readme_updater.ReadmeUpdater.retrieve_old_table', return_value=['', False])
-@patch('brewtap.readme_updater.ReadmeUpdater.read_current_readme')
-@patch('brewtap.readme_updater.ReadmeUpdater.replace_table_contents')
-def test_update_readme_cannot_find_old_table(
-    mock_replace_table_contents,
-    mock_read_current_readme,
-    mock_retrieve_old_table,
-    mock_generate_table,
-    mock_format_formula_data,
-):
+def test_update_readme_cannot_find_old_table(mock_generate_table, mock_format_formula_data, tmp_path):
     """Tests that when we cannot retrieve the old table that we skip updating with new details."""
-    ReadmeUpdater.update_readme('./')
+    readme_content = README_CONTENT.replace('<!-- project_table_end -->', '')
+    (tmp_path / 'README.md').write_text(readme_content)
 
-    # We should try to get the old table
-    mock_retrieve_old_table.assert_called_once()
+    ReadmeUpdater.update_readme(str(tmp_path))
 
     # We should fail at doing anything with the new table
     mock_format_formula_data.assert_not_called()
     mock_generate_table.assert_not_called()
-    mock_read_current_readme.assert_not_called()
-    mock_replace_table_contents.assert_not_called()
+    assert (tmp_path / 'README.md').read_text() == readme_content
+    assert os.listdir(tmp_path) == ['README.md']
+
+
+@patch('logging.Logger.error')
+def test_update_readme_no_readme(mock_logger, tmp_path):
+    """Tests that we don't update anything when the project has no README."""
+    ReadmeUpdater.update_readme(str(tmp_path))
+
+    mock_logger.assert_called_once_with('Could not find a valid README in this project to update.')
+    assert os.listdir(tmp_path) == []
+
+
+def test_rewrite_table(tmp_path):
+    """Tests that we hand the old table (tags included) over and keep the rest of the README as is."""
+    readme = tmp_path / 'README.md'
+    readme.write_text(README_CONTENT)
+    readme.chmod(0o644)
+    old_tables = []
+
+    table_replaced = ReadmeUpdater.rewrite_table(
+        str(readme), lambda old_table: old_tables.append(old_table) or 'new table\n'
+    )
+
+    assert table_replaced is True
+    assert old_tables == ['<!-- project_table_start -->\nold table\n<!-- project_table_end -->\n']
+    assert readme.read_text() == '# Tap\n\nnew table\n\n## Footer\n'
+    assert readme.stat().st_mode & 0o777 == 0o644
+
+
+def test_rewrite_table_build_error(tmp_path):
+    """Tests that the README is left untouched when building the new table fails midway."""
+    readme = tmp_path / 'README.md'
+    readme.write_text(README_CONTENT)
+
+    def build_table(old_table):
+        raise ValueError('mock error')
+
+    with pytest.raises(ValueError):
+        ReadmeUpdater.rewrite_table(str(readme), build_table)
+
+    assert readme.read_text() == README_CONTENT
+    assert os.listdir(tmp_path) == ['README.md']
+
+
+def _write_tap(tap_path, formulas):
+    """Writes a tap with a README table listing `formulas` and a formula file for each of them."""
+    formula_folder = tap_path / 'Formula'
+    formula_folder.mkdir()
+    for name in formulas:
+        class_name = ''.join(piece.capitalize() for piece in name.split('-'))
+        (formula_folder / f'{name}.rb').write_text(
+            f'class {class_name} < Formula\n'
+            f'  desc "{name} description"\n'
+            f'  homepage "https://github.com/user/{name}"\n'
+            'end\n'
+        )
+    rows = [
+        {'name': name, 'desc': f'{name} description', 'homepage': f'https://github.com/user/{name}'}
+        for name in formulas
+    ]
+    (tap_path / 'README.md').write_text('# Tap\n\n' + ReadmeUpdater.generate_table(rows, 'user', 'homebrew-tap'))
+
+    return formula_folder
+
+
+def _read_table(tap_path):
+    """The README of a tap from its table start tag on."""
+    readme = (tap_path / 'README.md').read_text()
+    table_start = readme.index('<!-- project_table_start -->')
+
+    return readme[table_start:]
+
+
+def test_update_readme_incremental(tmp_path):
+    """Tests that we only update the row of the formula that changed, in sorted position."""
+    formula_folder = _write_tap(tmp_path, ['alpha', 'gamma'])
+    (formula_folder / 'beta.rb').write_text('class Beta < Formula\n  desc "New"\n  homepage "https://beta.dev"\nend\n')
+    (formula_folder / 'gamma.rb').write_text(
+        'class Gamma < Formula\n  desc "Changed"\n  homepage "https://gamma.dev"\nend\n'
+    )
+
+    with patch('brewtap.formula_parser.FormulaParser.parse_files') as mock_parse_files:
+        ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'beta.rb'))
+        ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'gamma.rb'))
+
+    mock_parse_files.assert_not_called()
+    # The result is the same as rebuilding the table from every formula
+    full_table = ReadmeUpdater.generate_table(
+        ReadmeUpdater.format_formula_data(str(tmp_path), 'Formula'), 'user', str(tmp_path)
+    )
+    assert (tmp_path / 'README.md').read_text() == '# Tap\n\n' + full_table
+    assert 'beta.dev' in full_table
+
+
+def test_update_readme_incremental_matches_full_rebuild(tmp_path):
+    """Tests that an incremental update orders rows like a full rebuild, even when names and filenames sort apart."""
+    formula_folder = _write_tap(tmp_path, ['foo'])
+    (formula_folder / 'foo-bar.rb').write_text(
+        'class FooBar < Formula\n  desc "Foo bar"\n  homepage "https://foo-bar.dev"\nend\n'
+    )
+
+    ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'foo-bar.rb'))
+    incremental_readme = (tmp_path / 'README.md').read_text()
+    ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', full_rebuild=True)
+
+    assert (tmp_path / 'README.md').read_text() == incremental_readme
+    assert [row['name'] for row in ReadmeUpdater.parse_table_rows(incremental_readme)] == ['foo', 'foo-bar']
+
+
+def test_update_readme_incremental_removed_formula(tmp_path):
+    """Tests that we remove the row of a formula whose file is gone."""
+    formula_folder = _write_tap(tmp_path, ['alpha', 'beta'])
+    (formula_folder / 'beta.rb').unlink()
+
+    ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'beta.rb'))
+
+    old_table = _read_table(tmp_path)
+    assert [row['name'] for row in ReadmeUpdater.parse_table_rows(old_table)] == ['alpha']
+
+
+@pytest.mark.parametrize(
+    'table, full_rebuild',
+    [
+        ('<!-- project_table_start -->\nTABLE HERE\n<!-- project_table_end -->\n', False),
+        ('<!-- project_table_start -->\n| a | b |\n| - | - |\n| not | ours |\n<!-- project_table_end -->\n', False),
+        (None, True),
+    ],
+)
+def test_update_readme_full_rebuild(tmp_path, table, full_rebuild):
+    """Tests that we rebuild the table from every formula when asked to or when the old table has no rows of ours."""
+    formula_folder = _write_tap(tmp_path, ['alpha', 'beta'])
+    if table:
+        (tmp_path / 'README.md').write_text(table)
+
+    with patch('brewtap.formula_parser.FormulaParser.parse_files', wraps=FormulaParser.parse_files) as mock_parse_files:
+        ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'beta.rb'), full_rebuild)
+
+    mock_parse_files.assert_called_once()
+    old_table = _read_table(tmp_path)
+    assert [row['name'] for row in ReadmeUpdater.parse_table_rows(old_table)] == ['alpha', 'beta']
+
+
+def test_update_readme_shards(tmp_path):
+    """Tests that we split the table by first letter and only regenerate the shard of the changed formula."""
+    formula_folder = _write_tap(tmp_path, ['alpha', 'beta', '2fa'])
+
+    ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', layout='shards')
+    readme = (tmp_path / 'README.md').read_text()
+
+    assert readme.index('### 0-9') < readme.index('### A') < readme.index('### B')
+    old_table = _read_table(tmp_path)
+    shards = ReadmeUpdater.parse_shards(old_table)
+    assert list(shards) == ['0-9', 'a', 'b']
+    assert ReadmeUpdater.parse_table_rows(shards['a'])[0]['name'] == 'alpha'
+
+    # A hand edit in another shard survives, proving that shard was copied instead of regenerated
+    (tmp_path / 'README.md').write_text(readme.replace('beta description', 'beta, edited'))
+    (formula_folder / 'apple.rb').write_text(
+        'class Apple < Formula\n  desc "Apple"\n  homepage "https://apple.dev"\nend\n'
+    )
+    ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'apple.rb'), layout='shards')
+
+    old_table = _read_table(tmp_path)
+    shards = ReadmeUpdater.parse_shards(old_table)
+    assert [row['name'] for row in ReadmeUpdater.parse_table_rows(shards['a'])] == ['alpha', 'apple']
+    assert ReadmeUpdater.parse_table_rows(shards['b'])[0]['desc'] == 'beta, edited'
+
+
+def test_update_readme_shards_malformed_shard(tmp_path):
+    """Tests that we rebuild every shard when the table of the changed formula's shard can't be parsed."""
+    formula_folder = _write_tap(tmp_path, ['alpha', 'avocado', 'beta'])
+    ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', layout='shards')
+    readme = (tmp_path / 'README.md').read_text()
+    (tmp_path / 'README.md').write_text(readme.replace('| [avocado]', '| avocado, edited by hand |'))
+
+    with patch('brewtap.formula_parser.FormulaParser.parse_files', wraps=FormulaParser.parse_files) as mock_parse_files:
+        ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'alpha.rb'), layout='shards')
+
+    mock_parse_files.assert_called_once()
+    assert (tmp_path / 'README.md').read_text() == readme
+
+
+def test_update_readme_pages(tmp_path):
+    """Tests that we write a page per shard indexed from the README and only rewrite the page of the changed formula."""
+    formula_folder = _write_tap(tmp_path, ['alpha', 'beta'])
+
+    ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', layout='pages')
+
+    assert sorted(os.listdir(tmp_path / 'docs')) == ['formulas-a.md', 'formulas-b.md']
+    assert (tmp_path / 'README.md').read_text() == (
+        '# Tap\n\n'
+        '<!-- project_table_start -->\n'
+        '- [A](docs/formulas-a.md)\n'
+        '- [B](docs/formulas-b.md)\n'
+        '<!-- project_table_end -->\n'
+    )
+    page_a = (tmp_path / 'docs' / 'formulas-a.md').read_text()
+    assert page_a.startswith('# A\n\n<!-- project_table_start -->\n')
+    assert [row['name'] for row in ReadmeUpdater.parse_table_rows(page_a)] == ['alpha']
+
+    (formula_folder / 'beta.rb').unlink()
+    with patch('brewtap.utils.Utils.write_atomically') as mock_write_atomically:
+        ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', str(formula_folder / 'beta.rb'), layout='pages')
+
+    mock_write_atomically.assert_not_called()
+    assert os.listdir(tmp_path / 'docs') == ['formulas-a.md']
+    assert '- [B]' not in (tmp_path / 'README.md').read_text()
+
+
+def test_update_readme_from_tap_index(tmp_path):
+    """Tests that we rebuild the table from the tap index instead of the formula files when asked to."""
+    _write_tap(tmp_path, ['alpha'])
+    (tmp_path / 'index.jsonl').write_text('{"name":"beta","desc":"Beta","homepage":"https://beta.dev"}\n')
+
+    with patch('brewtap.formula_parser.FormulaParser.parse_files') as mock_parse_files:
+        ReadmeUpdater.update_readme(str(tmp_path), 'Formula', 'user', full_rebuild=True, from_tap_index=True)
+
+    mock_parse_files.assert_not_called()
+    old_table = _read_table(tmp_path)
+    assert ReadmeUpdater.parse_table_rows(old_table) == [
+        {'name': 'beta', 'desc': 'Beta', 'homepage': 'https://beta.dev'}
+    ]
+
+
+def test_format_table():
+    """Tests that we pad every column to its widest cell and fill in empty cells."""
+    table = ReadmeUpdater.format_table(['A', 'Longer'], [['wide cell', None], ['x', 'y']])
+
+    assert table == (
+        '| A         | Longer |\n' '| --------- | ------ |\n' '| wide cell | NA     |\n' '| x         | y      |'
+    )
 
 
 @patch('brewtap.readme_updater.FORMULA_FOLDER', 'test/unit')
@@ -75,7 +299,7 @@ def test_format_formula_data():
     """
     formulas = ReadmeUpdater.format_formula_data('./test')
 
-    assert len(formulas) == 14
+    assert len(formulas) == 19
     assert formulas[0] == {
         'name': 'test-generate-formula',
         'desc': 'Tool to release scripts, binaries, and executables to github',
@@ -116,87 +340,6 @@ def test_generate_table():
     # fmt: on
 
 
-def test_retrieve_old_table_not_found():
-    """Tests that we set the `table_found` variable to False when we can't find opening/closing README tags."""
-    old_table, old_table_found = ReadmeUpdater.retrieve_old_table('./')
-
-    assert old_table == ''
-    assert old_table_found is False
-
-
-@pytest.mark.parametrize(
-    'table_content',
-    [
-        """<!-- project_table_start -->
-here is some mock data...
-<!-- project_table_end -->""",
-        """<!-- project_table_start -->
-<!-- project_table_end -->""",
-        """<!-- project_table_start -->
-
-<!-- project_table_end -->""",
-    ],
-)
-def test_retrieve_old_table(table_content):
-    """Tests that we retrieve only the old table data when start and end tags exist.
-
-    We ensure that regardless of table content (null, filled, or newline) that this works."""
-    with patch('builtins.open', mock_open(read_data=table_content)):
-        old_table, old_table_found = ReadmeUpdater.retrieve_old_table('./')
-
-    assert old_table == table_content
-    assert old_table_found is True
-
-
-@patch('logging.Logger.error')
-def test_retrieve_old_table_no_readme(mock_logger):
-    """Tests that we retrieve only the old table data when start and end tags exist."""
-    old_table, old_table_found = ReadmeUpdater.retrieve_old_table('./test')
-
-    mock_logger.assert_called_once_with('Could not find a valid README in this project to update.')
-    assert old_table == ''
-    assert old_table_found is False
-
-
-def test_read_current_readme_does_not_exist():
-    """Tests that the file contents of a README that doesn't exist is empty."""
-    readme = ReadmeUpdater.read_current_readme('./test')
-
-    assert readme is None
-
-
-def test_read_current_readme():
-    """Tests that the content of a README found is returned."""
-    readme = ReadmeUpdater.read_current_readme('./')
-
-    assert '# Brewtap' in readme
-
-
-def test_replace_table_contents():
-    """Test that we add the new README changes to git."""
-    with patch('builtins.open', mock_open()):
-        ReadmeUpdater.replace_table_contents(
-            file_content='mock file contents',
-            old_table='old table contents',
-            new_table='new table contents',
-            homebrew_tap='./',
-        )
-
-
-@patch('logging.Logger.debug')
-@patch('brewtap.git.Git.add')
-def test_replace_table_contents_no_readme(mock_git_add, mock_logger):
-    """Tests that we do not run through the update readme block when there is no readme."""
-    ReadmeUpdater.replace_table_contents(
-        file_content='mock file contents',
-        old_table='old table contents',
-        new_table='new table contents',
-        homebrew_tap='./test',
-    )
-
-    mock_logger.assert_not_called()
-
-
 def test_does_readme_exist():
     """Tests that we can find a README in a directory."""
     readme = ReadmeUpdater.does_readme_exist('./')
@@ -0,0 +1,73 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from brewtap.config import Config
+from brewtap.releaser import main
+from brewtap.utils import BrewtapError
+
+
+@patch('brewtap.app.App.setup_logger')
+@patch('brewtap.app.App.run_batch_async')
+@patch('brewtap.config.Config.from_batch_file')
+def test_main_batch(mock_from_batch_file, mock_run_batch, mock_setup_logger):
+    """Tests that the `batch` subcommand publishes the configs of the batch file."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')
+    mock_from_batch_file.return_value = [config]
+
+    main(['--debug', 'batch', 'batch.json', '--skip-commit'])
+
+    mock_setup_logger.assert_called_once_with(True)
+    mock_from_batch_file.assert_called_once_with('batch.json')
+    mock_run_batch.assert_called_once_with([config])
+    assert config.skip_commit
+
+
+@patch('brewtap.app.App.setup_logger')
+@patch('brewtap.app.App.run_batch_async', side_effect=BrewtapError('mock-error'))
+@patch('brewtap.config.Config.from_batch_file', return_value=[])
+def test_main_batch_error(mock_from_batch_file, mock_run_batch, mock_setup_logger):
+    with pytest.raises(SystemExit) as error:
+        main(['batch', 'batch.json'])
+
+    assert str(error.value) == 'mock-error'
+
+
+def test_main_requires_command():
+    with pytest.raises(SystemExit):
+        main([])
+
+
+@patch('brewtap.app.App.setup_logger')
+@patch.dict('os.environ', {'BREWTAP_WEBHOOK_SECRET': ''})
+def test_main_serve_requires_secret(mock_setup_logger):
+    with pytest.raises(SystemExit) as error:
+        main(['serve', 'config.json'])
+
+    assert 'BREWTAP_WEBHOOK_SECRET' in str(error.value)
+
+
+def test_main_hash(tmp_path, capsys):
+    """Tests that the `hash` subcommand prints and writes the fragment of an asset."""
+    asset = tmp_path / 'mock-repo-1.0.0-linux-amd64.tar.gz'
+    asset.write_bytes(b'mock-asset')
+
+    main(['hash', str(asset), '--target', 'linux_amd64', '--output', str(tmp_path / 'fragment.json')])
+
+    fragment = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert (fragment['target'], fragment['filename']) == ('linux_amd64', 'mock-repo-1.0.0-linux-amd64.tar.gz')
+    assert json.loads((tmp_path / 'fragment.json').read_text()) == fragment
+
+
+@patch('brewtap.app.App.setup_logger')
+@patch('brewtap.app.App.run_github_action_async')
+@patch('brewtap.config.Config.from_batch_file')
+def test_main_assemble(mock_from_batch_file, mock_run_github_action, mock_setup_logger):
+    """Tests that the `assemble` subcommand publishes with the checksums of the fragments."""
+    mock_from_batch_file.return_value = [Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')]
+
+    main(['assemble', 'repositories.json', 'fragments/*.json'])
+
+    config = mock_run_github_action.call_args.args[0]
+    assert (config.checksum_fragments, config.skip_commit) == ('fragments/*.json', False)
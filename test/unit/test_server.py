@@ -0,0 +1,82 @@
+import hashlib
+import hmac
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from brewtap.config import Config
+from brewtap.server import WebhookServer
+
+
+SECRET = 'mock-secret'
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def webhook_server():
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas', work_dir='mock-repo')
+    server = WebhookServer(('127.0.0.1', 0), [config], SECRET)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post_webhook(server: WebhookServer, payload: dict, event: str = 'release', signature: str | None = None):
+    body = json.dumps(payload).encode()
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{server.server_port}/',
+        data=body,
+        headers={'X-GitHub-Event': event, 'X-Hub-Signature-256': signature or sign(body)},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def release_payload(repository: str = 'm-dzianishchyts/mock-repo', **release) -> dict:
+    return {
+        'action': 'published',
+        'release': {'tag_name': 'v1.2.0', 'draft': False, 'prerelease': False, **release},
+        'repository': {'full_name': repository},
+    }
+
+
+def test_verify_signature():
+    assert WebhookServer.verify_signature(SECRET, b'{}', sign(b'{}'))
+    assert not WebhookServer.verify_signature(SECRET, b'{}', sign(b'{}', 'other-secret'))
+    assert not WebhookServer.verify_signature(SECRET, b'{}', None)
+
+
+@patch('brewtap.app.App.run_github_action_async')
+def test_release_webhook(mock_run_github_action, webhook_server):
+    """Tests that a signed release webhook publishes the release it notifies of."""
+    published = threading.Event()
+    mock_run_github_action.side_effect = lambda config: published.set()
+
+    assert post_webhook(webhook_server, release_payload()) == 202
+    assert published.wait(5)
+
+    config = mock_run_github_action.call_args.args[0]
+    assert (config.github_repo, config.version, config.reuse_clone) == ('mock-repo', 'v1.2.0', True)
+
+
+@patch('brewtap.app.App.run_github_action_async')
+def test_release_webhook_ignored(mock_run_github_action, webhook_server):
+    """Tests that unsigned, unconfigured and unpublished releases are not published."""
+    assert post_webhook(webhook_server, release_payload(), signature=sign(b'{}')) == 401
+    assert post_webhook(webhook_server, release_payload('m-dzianishchyts/other-repo')) == 404
+    assert post_webhook(webhook_server, release_payload(prerelease=True)) == 202
+    assert post_webhook(webhook_server, {'zen': 'Keep it simple.'}, event='ping') == 200
+
+    mock_run_github_action.assert_not_called()
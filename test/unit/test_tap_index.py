@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+
+from brewtap.checksum import ArchiveChecksum
+from brewtap.formula_parser import FormulaRecord
+from brewtap.tap_index import TapIndex
+
+
+FORMULAS_FOLDER = os.path.join('test', 'formulas')
+CHECKSUM = '0000000000000000000000000000000000000000000000000000000000000000'
+NEW_FORMULA = '''class Brewtap < Formula
+  desc "Release scripts to Homebrew"
+  homepage "https://github.com/m-dzianishchyts/brewtap"
+  url "https://github.com/m-dzianishchyts/brewtap/archive/refs/tags/v1.0.0.tar.gz"
+  sha256 "1111111111111111111111111111111111111111111111111111111111111111"
+end
+'''
+
+
+def _write_tap(tap_path):
+    """Writes a tap with a couple of our recorded formulas."""
+    formula_folder = tap_path / 'Formula'
+    formula_folder.mkdir()
+    for filename in ('test_generate_formula_linux_matrix.rb', 'test_generate_formula_override_version.rb'):
+        shutil.copy(os.path.join(FORMULAS_FOLDER, filename), formula_folder / filename)
+
+    return formula_folder
+
+
+def test_update_builds_index(tmp_path):
+    """Tests that we build the index from every formula of the tap when it does not exist yet."""
+    formula_folder = _write_tap(tmp_path)
+
+    TapIndex.update(
+        str(tmp_path),
+        str(formula_folder / 'brewtap.rb'),
+        NEW_FORMULA,
+        'v1.0.0',
+        [ArchiveChecksum('brewtap-1.0.0-linux-arm64.tar.gz', '2' * 64, 'https://mock-url', 'linux_arm64')],
+        'Formula',
+    )
+
+    entries = TapIndex.read(str(tmp_path))
+    assert [entry['name'] for entry in entries] == [
+        'brewtap',
+        'test-generate-formula-linux-matrix',
+        'test-generate-formula-override-version',
+    ]
+    assert entries[0] == {
+        'name': 'brewtap',
+        'version': '1.0.0',
+        'url': 'https://github.com/m-dzianishchyts/brewtap/archive/refs/tags/v1.0.0.tar.gz',
+        'sha256': '1' * 64,
+        'targets': {'linux_arm64': {'url': 'https://mock-url', 'sha256': '2' * 64}},
+        'desc': 'Release scripts to Homebrew',
+        'homepage': 'https://github.com/m-dzianishchyts/brewtap',
+        'license': None,
+        'path': os.path.join('Formula', 'brewtap.rb'),
+    }
+    # Existing formulas get their targets from their `on_*` blocks and versions from their URL if needed
+    assert list(entries[1]['targets']) == ['linux_amd64', 'linux_arm64']
+    assert entries[1]['version'] == '0.1.0'
+    assert entries[1]['sha256'] == CHECKSUM
+
+
+def test_update_existing_index(tmp_path):
+    """Tests that we only replace the line of the published formula in an existing index."""
+    index_path = tmp_path / 'index.jsonl'
+    other_line = json.dumps({'name': 'zsh-tool', 'version': 'hand edited'}) + '\n'
+    index_path.write_text(json.dumps({'name': 'brewtap', 'version': '0.9.0'}) + '\n' + other_line)
+
+    TapIndex.update(str(tmp_path), str(tmp_path / 'Formula' / 'brewtap.rb'), NEW_FORMULA, 'v1.0.0', [])
+
+    lines = index_path.read_text().splitlines(keepends=True)
+    assert len(lines) == 2
+    assert json.loads(lines[0])['version'] == '1.0.0'
+    assert lines[1] == other_line
+
+
+def test_lookup(tmp_path):
+    """Tests that we can look up a formula by name."""
+    (tmp_path / 'index.jsonl').write_text(
+        ''.join(TapIndex.dump_entry({'name': name, 'version': '1.0.0'}) for name in ('alpha', 'beta', 'gamma'))
+    )
+
+    assert TapIndex.lookup(str(tmp_path), 'beta') == {'name': 'beta', 'version': '1.0.0'}
+    assert TapIndex.lookup(str(tmp_path), 'delta') is None
+    assert TapIndex.lookup(str(tmp_path), 'zeta') is None
+
+
+def test_build_entry_version():
+    """Tests that we fall back to the `version` stanza, then to the version in the URL."""
+    record = FormulaRecord(class_name='Foo', url='https://github.com/user/foo/releases/download/v2.1.0/foo.tar.gz')
+
+    assert TapIndex.build_entry(record, 'Formula/foo.rb')['version'] == '2.1.0'
+    assert TapIndex.build_entry(FormulaRecord(class_name='Foo', version='3.0'), 'Formula/foo.rb')['version'] == '3.0'
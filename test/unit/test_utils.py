@@ -1,3 +1,5 @@
+import asyncio
+import time
 from unittest.mock import (
     mock_open,
     patch,
@@ -7,10 +9,13 @@ import pytest
 import requests
 
 from brewtap.constants import GITHUB_HEADERS
-from brewtap.utils import Utils
+from brewtap.utils import (
+    BrewtapError,
+    Utils,
+)
 
 
-@patch('requests.get')
+@patch('brewtap.utils.HTTP_SESSION.get')
 def test_make_github_get_request(mock_request):
     url = 'https://api.github.com/repos/m-dzianishchyts/brewtap'
     Utils.make_github_get_request(url=url)
@@ -24,7 +29,7 @@ def test_make_github_get_request(mock_request):
     )
 
 
-@patch('requests.get')
+@patch('brewtap.utils.HTTP_SESSION.get')
 def test_make_github_get_request_stream(mock_request):
     """Tests that we setup a request correctly when we enable streaming."""
     url = 'https://api.github.com/repos/m-dzianishchyts/brewtap'
@@ -42,7 +47,7 @@ def test_make_github_get_request_stream(mock_request):
     )
 
 
-@patch('requests.get', side_effect=requests.exceptions.RequestException('mock-error'))
+@patch('brewtap.utils.HTTP_SESSION.get', side_effect=requests.exceptions.RequestException('mock-error'))
 def test_make_github_get_request_exception(mock_request):
     url = 'https://api.github.com/repos/m-dzianishchyts/brewtap'
     with pytest.raises(SystemExit) as error:
@@ -69,3 +74,67 @@ def test_get_filename_from_path():
     filename = Utils.get_filename_from_path(path)
 
     assert filename == 'filename.txt'
+
+
+def test_trap_exit():
+    """Tests that a `SystemExit` of a synchronous helper is raised as a `BrewtapError`."""
+    with patch('brewtap.utils.Utils.write_file', side_effect=SystemExit('mock-error')):
+        with pytest.raises(BrewtapError) as error:
+            Utils.trap_exit(Utils.write_file, 'mock-file', 'mock-content')
+
+    assert str(error.value) == 'mock-error'
+
+
+def test_run_blocking():
+    result = asyncio.run(Utils.run_blocking(Utils.get_filename_from_path, '/mock/path/to/filename.txt'))
+
+    assert result == 'filename.txt'
+
+
+def test_run_blocking_timeout():
+    with pytest.raises(BrewtapError) as error:
+        asyncio.run(Utils.run_blocking(time.sleep, 0.5, timeout=0.01))
+
+    assert str(error.value) == 'sleep did not finish within 0.01 seconds.'
+
+
+def test_run_concurrently():
+    """Tests that results come back in the order the coroutines were given."""
+
+    async def delayed(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    results = asyncio.run(Utils.run_concurrently(delayed('first', 0.02), delayed('second', 0)))
+
+    assert results == ['first', 'second']
+
+
+def test_run_concurrently_cancels_on_error():
+    """Tests that one failure cancels its siblings and is raised unwrapped."""
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def failing():
+        raise BrewtapError('mock-error')
+
+    with pytest.raises(BrewtapError) as error:
+        asyncio.run(Utils.run_concurrently(slow(), failing()))
+
+    assert str(error.value) == 'mock-error'
+    assert cancelled == [True]
+
+
+def test_read_file():
+    with patch('builtins.open', mock_open(read_data='mock-content')):
+        assert Utils.read_file('mock-file') == 'mock-content'
+
+
+def test_read_file_missing():
+    assert Utils.read_file('mock-missing-file') is None
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+from brewtap.config import Config
+from brewtap.publisher import Publisher
+from brewtap.watcher import (
+    MAX_POLL_INTERVAL,
+    MIN_POLL_INTERVAL,
+    ReleaseWatcher,
+)
+
+
+def mock_response(status_code: int = 200, tag: str = 'v1.0.0', etag: str = '"etag-1"', remaining: str = '4000'):
+    response = Mock(status_code=status_code, headers={'ETag': etag, 'X-RateLimit-Remaining': remaining})
+    response.headers['X-RateLimit-Reset'] = '2000000000'
+    response.json.return_value = {'tag_name': tag, 'published_at': '2024-01-01T00:00:00Z'}
+
+    return response
+
+
+def test_poll_interval():
+    """Tests that recently released repositories are polled more often than dormant ones."""
+    published_at = '2024-01-01T00:00:00Z'
+    released = 1704067200
+
+    assert ReleaseWatcher.poll_interval(None) == MIN_POLL_INTERVAL
+    assert ReleaseWatcher.poll_interval(published_at, released + 60) == MIN_POLL_INTERVAL
+    assert ReleaseWatcher.poll_interval(published_at, released + 24 * 60 * 60) == 60 * 60
+    assert ReleaseWatcher.poll_interval(published_at, released + 365 * 24 * 60 * 60) == MAX_POLL_INTERVAL
+
+
+@patch('brewtap.utils.Utils.make_github_get_request')
+def test_poll_publishes_new_tags(mock_make_github_get_request, tmp_path):
+    """Tests that the first poll records the latest tag, and that only a new tag is published."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas', github_token='123')
+    state_file = tmp_path / 'watch.json'
+    publisher = Publisher([config])
+    watcher = ReleaseWatcher([config], publisher, str(state_file))
+
+    mock_make_github_get_request.side_effect = [
+        mock_response(),
+        mock_response(304),
+        mock_response(tag='v1.1.0', etag='"etag-2"'),
+    ]
+    for _ in range(3):
+        asyncio.run(watcher.poll(config))
+
+    assert [call.kwargs['etag'] for call in mock_make_github_get_request.call_args_list] == [
+        None,
+        '"etag-1"',
+        '"etag-1"',
+    ]
+    assert [(job.repository, job.tag) for job in publisher.job_queue.claim()] == [
+        ('m-dzianishchyts/mock-repo', 'v1.1.0')
+    ]
+    assert json.loads(state_file.read_text())['m-dzianishchyts/mock-repo']['etag'] == '"etag-2"'
+
+
+@patch('brewtap.utils.Utils.make_github_get_request', return_value=mock_response(remaining='0'))
+def test_poll_rate_limited(mock_make_github_get_request, tmp_path):
+    """Tests that polls are held back until the rate limit resets once it runs low."""
+    config = Config('m-dzianishchyts', 'mock-repo', 'm-dzianishchyts', 'homebrew-formulas')
+    watcher = ReleaseWatcher([config], Publisher([config]), str(tmp_path / 'watch.json'))
+
+    asyncio.run(watcher.poll(config))
+
+    assert watcher.rate_limit_reset == 2000000000